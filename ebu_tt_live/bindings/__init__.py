@@ -11,11 +11,14 @@ from . import _ttm as ttm
 from . import _ttp as ttp
 from . import _tts as tts
 from .pyxb_utils import xml_parsing_context, get_xml_parsing_context
+from .serializer import serialize, StreamingSerializer
+from .parser import IncrementalParser, parse_document, get_parser_backend, set_parser_backend, \
+    PARSER_BACKEND_PYXB, PARSER_BACKEND_SAX
 from .validation.base import SemanticDocumentMixin, SemanticValidationMixin, IDMixin
 from ebu_tt_live.bindings.validation.presentation import SizingValidationMixin, StyledElementMixin, RegionedElementMixin
 from ebu_tt_live.bindings.validation.timing import TimingValidationMixin, BodyTimingValidationMixin
 from ebu_tt_live.bindings.validation.content import SubtitleContentContainer, ContentContainerMixin
-from .validation.validator import SemanticValidator
+from .validation.validator import SemanticValidator, TimingValidator
 from ebu_tt_live.errors import SemanticValidationError, OutsideSegmentError
 from ebu_tt_live.strings import ERR_SEMANTIC_VALIDATION_MISSING_ATTRIBUTES, \
     ERR_SEMANTIC_VALIDATION_INVALID_ATTRIBUTES, ERR_SEMANTIC_STYLE_CIRCLE, ERR_SEMANTIC_STYLE_MISSING, \
@@ -46,9 +49,12 @@ namespace_prefix_map = {
 
 def CreateFromDocument(*args, **kwargs):
     """
-    Resetting the parsing context on start
+    Resetting the parsing context on start. The document is parsed by the backend selected with
+    :py:func:`set_parser_backend`.
     :return:
     """
+    if get_parser_backend() == PARSER_BACKEND_SAX:
+        return parse_document(*args, **kwargs)
     with xml_parsing_context():
         result = raw.CreateFromDocument(*args, **kwargs)
     return result
@@ -154,15 +160,44 @@ class tt_type(SemanticDocumentMixin, raw.tt_type):
             element_name=element_name
         )
 
-    def toxml(self, encoding=None, bds=None, root_only=False, element_name=None):
-        dom = self.toDOM(self.__check_bds(bds), element_name=element_name)
+    def toxml(self, encoding=None, bds=None, root_only=False, element_name=None, pretty=True):
+        if bds is None:
+            # The streaming serializer produces the same output without building the DOM tree
+            return serialize(
+                self,
+                pretty=pretty,
+                encoding=encoding,
+                root_only=root_only,
+                element_name=element_name,
+                namespace_prefix_map=namespace_prefix_map
+            )
+        dom = self.toDOM(bds, element_name=element_name)
         if root_only:
             dom = dom.documentElement
+        if not pretty:
+            return dom.toxml(encoding)
         return dom.toprettyxml(
             encoding=encoding,
             indent='  '
         )
 
+    def write_xml(self, output, encoding=None, root_only=False, pretty=True):
+        """
+        Write the document to a file-like object.
+        :param output: file-like object
+        :param encoding: if given the output is encoded and the encoding is declared in the XML declaration
+        :param root_only: leave out the XML declaration
+        :param pretty: indent the document or write it compactly
+        """
+        serialize(
+            self,
+            output=output,
+            pretty=pretty,
+            encoding=encoding,
+            root_only=root_only,
+            namespace_prefix_map=namespace_prefix_map
+        )
+
     def _semantic_after_subtree_copy(self, copied_instance, dataset, element_content=None):
         # This one does not have another parent to link with but it can make itself an element
         copied_instance._setElement(raw.tt)
@@ -237,7 +272,7 @@ class tt_type(SemanticDocumentMixin, raw.tt_type):
         if self.extent is not None and not isinstance(self.extent, ebuttdt.pixelExtentType):
             raise SimpleTypeValueError(type(self.extent), self.extent)
 
-    def _semantic_before_traversal(self, dataset, element_content=None):
+    def _semantic_timing_before_traversal(self, dataset, element_content=None):
         # The tt element adds itself to the semantic dataset to help classes lower down the line to locate constraining
         # attributes.
         dataset['timing_begin_stack'] = []
@@ -246,6 +281,9 @@ class tt_type(SemanticDocumentMixin, raw.tt_type):
         dataset['timing_end_limit'] = None
         dataset['timing_begin_limit'] = None
         dataset['tt_element'] = self
+
+    def _semantic_before_traversal(self, dataset, element_content=None):
+        self._semantic_timing_before_traversal(dataset=dataset, element_content=element_content)
         dataset['styles_stack'] = []
         self._elements_by_id = {}
         dataset['elements_by_id'] = self._elements_by_id
@@ -262,6 +300,16 @@ class tt_type(SemanticDocumentMixin, raw.tt_type):
         # Save this for id lookup.
         self._elements_by_id = dataset['elements_by_id']
 
+    def recompute_timing(self, **extra_kwargs):
+        """
+        Recompute the computed times of the timed elements without repeating the syntactic and the rest of the
+        semantic validation. The binding must have passed validateBinding before.
+        :return: the semantic dataset of the timing traversal
+        """
+        if self._elements_by_id is None:
+            raise SemanticValidationError(ERR_SEMANTIC_VALIDATION_EXPECTED)
+        return TimingValidator(root_element=self).proceed(**extra_kwargs)
+
     def get_element_by_id(self, elem_id, elem_type=None):
         """
         Lookup an element and return it. Optionally type is checked as well.
@@ -555,10 +603,12 @@ class body_type(StyledElementMixin, BodyTimingValidationMixin, SemanticValidatio
         return copied_body
 
     @classmethod
-    def _merge_deconflict_ids(cls, element, dest, ids):
+    def _merge_deconflict_ids(cls, element, dest, ids, keep_ids=False):
         """
         Deconflict ids of body elements
         :param element:
+        :param ids: IDAllocator
+        :param keep_ids: the ids are unique already, e.g. the body merged into, they are only reserved
         :return:
         """
 
@@ -574,14 +624,12 @@ class body_type(StyledElementMixin, BodyTimingValidationMixin, SemanticValidatio
             elif isinstance(item, ElementContent):
                 copied_elem = copy.copy(item.value)
                 copied_elem._resetContent()
-                cls._merge_deconflict_ids(item.value, copied_elem, ids)
-                if isinstance(copied_elem, IDMixin):
-                    if copied_elem.id is not None and copied_elem.id in ids:
-                        next_try = copied_elem.id
-                        while next_try in ids:
-                            next_try = '{}.1'.format(next_try)
-                        copied_elem.id = next_try
-                    ids.add(copied_elem.id)
+                cls._merge_deconflict_ids(item.value, copied_elem, ids, keep_ids=keep_ids)
+                if isinstance(copied_elem, IDMixin) and copied_elem.id is not None:
+                    if keep_ids:
+                        ids.reserve(copied_elem.id)
+                    else:
+                        copied_elem.id = ids.allocate(copied_elem.id)
                 output.append(copied_elem)
 
         for item in output:
@@ -598,7 +646,7 @@ class body_type(StyledElementMixin, BodyTimingValidationMixin, SemanticValidatio
         # The same recursive ID collision issue... DAMN!
         ids = dataset['ids']
 
-        self._merge_deconflict_ids(element=self, dest=merged_body, ids=ids)
+        self._merge_deconflict_ids(element=self, dest=merged_body, ids=ids, keep_ids=True)
         self._merge_deconflict_ids(element=other_elem, dest=merged_body, ids=ids)
 
         return merged_body
@@ -737,12 +785,11 @@ class styling(SemanticValidationMixin, raw.styling):
     def merge(self, other_elem, dataset):
         style_ids = dataset['ids']
         for item in self.orderedContent():
-            style_ids.add(item.value.id)
+            style_ids.reserve(item.value.id)
         if other_elem:
             for item in other_elem.orderedContent():
                 copied_style = copy.copy(item.value)
-                if item.value.id in style_ids:
-                    copied_style.id = '{}.1'.format(copied_style.id)
+                copied_style.id = style_ids.allocate(copied_style.id)
                 self.append(copied_style)
 
         return self
@@ -750,15 +797,17 @@ class styling(SemanticValidationMixin, raw.styling):
     def _semantic_after_subtree_copy(self, copied_instance, dataset, element_content=None):
         # The styles are not ordered by inheritance so they need an extra step here
         # to get their style ID resolutions sorted
+        instance_mapping = dataset['instance_mapping']
         for style_elem in \
                 [
                     item.value
                     for item in self.orderedContent()
                     if isinstance(item, ElementContent) and isinstance(item.value, style_type)
+                    and item.value in instance_mapping
                 ]:
             style_elem_styles = style_elem._semantic_deconflicted_ids(attr_name='style', dataset=dataset)
             if style_elem_styles:
-                style_elem.style = style_elem_styles
+                instance_mapping[style_elem].style = style_elem_styles
 
 
 raw.styling._SetSupersedingClass(styling)
@@ -804,13 +853,11 @@ class layout(SemanticValidationMixin, raw.layout):
     def merge(self, other_elem, dataset):
         region_ids = dataset['ids']
         for item in self.orderedContent():
-            region_ids.add(item.value.id)
+            region_ids.reserve(item.value.id)
         if other_elem:
             for item in other_elem.orderedContent():
                 copied_region = copy.copy(item.value)
-                if copied_region.id in region_ids:
-                    copied_region.id = '{}.1'.format(copied_region.id)
-                    region_ids.add(copied_region.id)
+                copied_region.id = region_ids.allocate(copied_region.id)
                 self.append(copied_region)
         return self
 
@@ -832,23 +879,53 @@ class d_tt_type(raw.d_tt_type):
             )
 
     def toDOM(self, bds=None, parent=None, element_name=None):
-        xml_dom = super(d_tt_type, self).toDOM(
+        if element_name is None:
+            # The root element is named tt from the start so that a streaming serializer writes the right start tag
+            element_name = raw.tt.name()
+        return super(d_tt_type, self).toDOM(
             bds=self.__check_bds(bds),
             parent=parent,
             element_name=element_name
         )
-        xml_dom.documentElement.tagName = 'tt:tt'
-        return xml_dom
 
-    def toxml(self, encoding=None, bds=None, root_only=False, element_name=None):
-        dom = self.toDOM(self.__check_bds(bds), element_name=element_name)
+    def toxml(self, encoding=None, bds=None, root_only=False, element_name=None, pretty=True):
+        if bds is None:
+            # The streaming serializer produces the same output without building the DOM tree
+            return serialize(
+                self,
+                pretty=pretty,
+                encoding=encoding,
+                root_only=root_only,
+                element_name=element_name,
+                namespace_prefix_map=namespace_prefix_map
+            )
+        dom = self.toDOM(bds, element_name=element_name)
         if root_only:
             dom = dom.documentElement
+        if not pretty:
+            return dom.toxml(encoding)
         return dom.toprettyxml(
             encoding=encoding,
             indent='  '
         )
 
+    def write_xml(self, output, encoding=None, root_only=False, pretty=True):
+        """
+        Write the document to a file-like object.
+        :param output: file-like object
+        :param encoding: if given the output is encoded and the encoding is declared in the XML declaration
+        :param root_only: leave out the XML declaration
+        :param pretty: indent the document or write it compactly
+        """
+        serialize(
+            self,
+            output=output,
+            pretty=pretty,
+            encoding=encoding,
+            root_only=root_only,
+            namespace_prefix_map=namespace_prefix_map
+        )
+
     def _validateBinding_vx(self):
         if self.timeBase != 'media':
             raise SimpleTypeValueError(type(self.timeBase), self.timeBase)
@@ -0,0 +1,412 @@
+"""
+This module contains the compact binary encoding of the bindings used between the nodes of the toolkit. The
+encoding carries the same information as the XML document (elements, attributes and text) but refers to namespaces,
+element and attribute names and repeated attribute values through a string table. The table starts with the names
+of EBU-TT Live so most names take up a single byte. Every payload is self-contained: the strings that are not in the
+static table are defined on first use within the payload.
+
+The encoder receives the calls PyXB makes to build a DOM tree and the decoder drives PyXB's SAX content handler, so
+neither the XML text nor a DOM tree is built on either end.
+
+Payload layout::
+
+    magic, version, then a sequence of records:
+    START_ELEMENT namespace local_name attribute_count (namespace local_name value)*
+    TEXT length utf-8
+    END_ELEMENT
+
+where namespace, local_name and value are string references: 0 followed by the length and the UTF-8 bytes of a new
+string or the index of a known string plus one. Integers are unsigned LEB128.
+"""
+
+import logging
+import xml.dom
+import xml.dom.minidom
+import xml.sax.xmlreader
+import pyxb
+import pyxb.namespace
+import pyxb.utils.saxdom
+from pyxb.utils import six
+from pyxb.utils.domutils import BindingDOMSupport
+from . import raw
+from .parser import EBUTTSAXHandler, _no_parsing_context
+from .pyxb_utils import xml_parsing_context
+
+log = logging.getLogger(__name__)
+
+COMPACT_MAGIC = b'\x00EBT'
+COMPACT_VERSION = 1
+
+_START_ELEMENT = 1
+_TEXT = 2
+_END_ELEMENT = 3
+
+_XMLNS_URI = 'http://www.w3.org/2000/xmlns/'
+
+# The static part of the string table. The order is part of the wire format: add names at the end and increase
+# COMPACT_VERSION when the table changes.
+STATIC_STRINGS = (
+    '',
+    'http://www.w3.org/ns/ttml',
+    'http://www.w3.org/ns/ttml#parameter',
+    'http://www.w3.org/ns/ttml#styling',
+    'http://www.w3.org/ns/ttml#metadata',
+    'urn:ebu:tt:metadata',
+    'urn:ebu:tt:parameters',
+    'urn:ebu:tt:style',
+    'urn:ebu:tt:datatypes',
+    'http://www.w3.org/XML/1998/namespace',
+    # Elements
+    'tt', 'head', 'body', 'div', 'p', 'span', 'br', 'metadata', 'styling', 'style', 'layout', 'region',
+    'documentMetadata', 'documentEbuttVersion', 'documentTotalNumberOfSubtitles',
+    'documentMaximumNumberOfDisplayableCharacterInAnyRow', 'documentCountryOfOrigin', 'documentOriginalProgrammeTitle',
+    'documentCopyright', 'authoringDelay', 'facet', 'trace', 'action', 'generatedBy', 'sourceId',
+    # Attributes
+    'id', 'lang', 'space', 'begin', 'end', 'dur', 'timeBase', 'clockMode', 'cellResolution', 'frameRate',
+    'frameRateMultiplier', 'dropMode', 'markerMode', 'sequenceIdentifier', 'sequenceNumber',
+    'authorsGroupIdentifier', 'authorsGroupControlToken', 'authorsGroupControlRequest', 'referenceClockIdentifier',
+    'color', 'backgroundColor', 'fontFamily', 'fontSize', 'fontStyle', 'fontWeight', 'lineHeight', 'textAlign',
+    'displayAlign', 'origin', 'extent', 'padding', 'writingMode', 'showBackground', 'linePadding', 'multiRowAlign',
+    'wrapOption', 'overflow', 'unicodeBidi', 'direction', 'textDecoration', 'opacity', 'zIndex', 'agent', 'role',
+    # Values
+    'en', 'en-GB', 'clock', 'media', 'smpte', 'local', 'gps', 'utc', 'preserve', 'default', 'white', 'black',
+    'yellow', 'center', 'left', 'right', 'start', 'before', 'after', 'normal', 'bold', 'italic'
+)
+
+_STATIC_INDEX = dict((string, index) for index, string in enumerate(STATIC_STRINGS))
+
+
+def is_compact(data):
+    """
+    Check if the payload is in the compact encoding. XML documents can not start with the magic number.
+    :param data: the payload
+    :return: bool
+    """
+    return isinstance(data, six.binary_type) and data[:len(COMPACT_MAGIC)] == COMPACT_MAGIC
+
+
+class _Writer(object):
+
+    _output = None
+    _strings = None
+
+    def __init__(self):
+        self._output = bytearray(COMPACT_MAGIC)
+        self._output.append(COMPACT_VERSION)
+        self._strings = {}
+
+    def integer(self, value):
+        output = self._output
+        while value > 0x7F:
+            output.append((value & 0x7F) | 0x80)
+            value >>= 7
+        output.append(value)
+
+    def literal(self, value):
+        data = value.encode('utf-8')
+        self.integer(len(data))
+        self._output.extend(data)
+
+    def string(self, value):
+        index = _STATIC_INDEX.get(value)
+        if index is None:
+            index = self._strings.get(value)
+        if index is None:
+            self._strings[value] = len(STATIC_STRINGS) + len(self._strings)
+            self._output.append(0)
+            self.literal(value)
+        else:
+            self.integer(index + 1)
+
+    def start_element(self, namespace_uri, local_name, attributes):
+        self._output.append(_START_ELEMENT)
+        self.string(namespace_uri or '')
+        self.string(local_name)
+        self.integer(len(attributes))
+        # Sorted so that the same content always gives the same payload
+        for attribute_namespace_uri, attribute_name, value in sorted(
+                attributes, key=lambda attribute: (attribute[0] or '', attribute[1])):
+            self.string(attribute_namespace_uri or '')
+            self.string(attribute_name)
+            self.string(value)
+
+    def text(self, value):
+        self._output.append(_TEXT)
+        self.literal(value)
+
+    def end_element(self):
+        self._output.append(_END_ELEMENT)
+
+    def getvalue(self):
+        return bytes(self._output)
+
+
+class _TextNode(object):
+
+    __slots__ = ('data',)
+
+    nodeType = xml.dom.Node.TEXT_NODE
+
+    def __init__(self, data):
+        self.data = data
+
+
+class _Document(object):
+
+    documentElement = None
+
+    def createTextNode(self, data):
+        return _TextNode(data)
+
+
+class _Element(object):
+
+    __slots__ = ('encoder', 'namespace_uri', 'local_name', 'attributes', 'started')
+
+    nodeType = xml.dom.Node.ELEMENT_NODE
+
+    def __init__(self, encoder, namespace_uri, local_name):
+        self.encoder = encoder
+        self.namespace_uri = namespace_uri
+        self.local_name = local_name
+        self.attributes = []
+        self.started = False
+
+    def appendChild(self, child):
+        return self.encoder.appendChild(child, self)
+
+    def setAttributeNS(self, namespace_uri, name, value):
+        if namespace_uri != _XMLNS_URI:
+            self.attributes.append((namespace_uri, name.rpartition(':')[2], value))
+
+
+class CompactEncoder(BindingDOMSupport):
+    """
+    A BindingDOMSupport that writes the compact encoding instead of building a DOM tree. The start of an element is
+    written when its first child arrives or when it is closed since PyXB sets the attributes of an element before it
+    creates the children.
+    """
+
+    _writer = None
+    _stack = None
+    _root = None
+    _encoder_document = None
+
+    def __init__(self, **kwargs):
+        self._writer = _Writer()
+        self._stack = []
+        self._encoder_document = _Document()
+        super(CompactEncoder, self).__init__(**kwargs)
+
+    def document(self):
+        return self._encoder_document
+
+    def finalize(self):
+        # Namespaces are written with every name so there are no declarations to add
+        return self._encoder_document
+
+    def createChildElement(self, expanded_name, parent=None):
+        if isinstance(expanded_name, six.string_types):
+            expanded_name = pyxb.namespace.ExpandedName(None, expanded_name)
+        namespace = expanded_name.namespace()
+        element = _Element(self, namespace is not None and namespace.uri() or None, expanded_name.localName())
+
+        if parent is None:
+            parent = self._root
+        if parent is None:
+            self._root = element
+            self._encoder_document.documentElement = element
+        else:
+            self._child_added(parent)
+        self._stack.append(element)
+        return element
+
+    def appendChild(self, child, parent):
+        if isinstance(child, _TextNode):
+            self._child_added(parent)
+            self._writer.text(child.data)
+            return child
+        if isinstance(child, (pyxb.utils.saxdom.Node, xml.dom.minidom.Node)):
+            # Wildcard content kept as DOM by the parser
+            self._child_added(parent)
+            self._write_dom(child)
+            return child
+        raise pyxb.LogicError('Unexpected child {}'.format(child))
+
+    def appendTextChild(self, text, parent):
+        self._child_added(parent)
+        self._writer.text(self.valueAsText(text))
+
+    def _write_dom(self, node):
+        if node.nodeType == xml.dom.Node.ELEMENT_NODE:
+            attributes = []
+            for index in range(node.attributes.length):
+                attribute = node.attributes.item(index)
+                if attribute.namespaceURI != _XMLNS_URI and attribute.name.partition(':')[0] != 'xmlns':
+                    attributes.append((attribute.namespaceURI, attribute.localName, attribute.value))
+            self._writer.start_element(node.namespaceURI, node.localName, attributes)
+            for child in node.childNodes:
+                self._write_dom(child)
+            self._writer.end_element()
+        elif node.nodeType in (xml.dom.Node.TEXT_NODE, xml.dom.Node.CDATA_SECTION_NODE):
+            self._writer.text(node.data)
+
+    def _start(self, element):
+        if not element.started:
+            element.started = True
+            self._writer.start_element(element.namespace_uri, element.local_name, element.attributes)
+
+    def _child_added(self, parent):
+        while self._stack[-1] is not parent:
+            self._close_element(self._stack.pop())
+        self._start(parent)
+
+    def _close_element(self, element):
+        self._start(element)
+        self._writer.end_element()
+
+    def close(self):
+        """
+        Complete the payload.
+        :return: the compact encoding of the document
+        """
+        while self._stack:
+            self._close_element(self._stack.pop())
+        return self._writer.getvalue()
+
+
+def encode(binding, element_name=None):
+    """
+    Encode a binding in the compact encoding.
+    :param binding: the root binding of the document
+    :param element_name: passed to toDOM
+    :return: the payload
+    """
+    encoder = CompactEncoder()
+    binding.toDOM(bds=encoder, element_name=element_name)
+    return encoder.close()
+
+
+class _Reader(object):
+
+    _data = None
+    _position = None
+    _strings = None
+
+    def __init__(self, data):
+        if not is_compact(data):
+            raise ValueError('Not a compact payload')
+        self._data = bytearray(data)
+        self._position = len(COMPACT_MAGIC)
+        version = self._data[self._position]
+        if version != COMPACT_VERSION:
+            raise ValueError('Unsupported compact payload version: {}'.format(version))
+        self._position += 1
+        self._strings = list(STATIC_STRINGS)
+
+    def at_end(self):
+        return self._position >= len(self._data)
+
+    def byte(self):
+        value = self._data[self._position]
+        self._position += 1
+        return value
+
+    def integer(self):
+        data = self._data
+        value = 0
+        shift = 0
+        while True:
+            byte = data[self._position]
+            self._position += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def literal(self):
+        length = self.integer()
+        end = self._position + length
+        if end > len(self._data):
+            raise ValueError('Truncated compact payload')
+        value = bytes(self._data[self._position:end]).decode('utf-8')
+        self._position = end
+        return value
+
+    def string(self):
+        index = self.integer()
+        if index == 0:
+            value = self.literal()
+            self._strings.append(value)
+            return value
+        return self._strings[index - 1]
+
+
+def read_root_attributes(data):
+    """
+    Read the attributes of the root element without decoding the rest of the payload.
+    :param data: the payload
+    :return: dictionary of the attribute values by (namespace URI, local name) tuples
+    """
+    reader = _Reader(data)
+    try:
+        if reader.byte() != _START_ELEMENT:
+            raise ValueError('Invalid compact payload: no root element')
+        reader.string()
+        reader.string()
+        attributes = {}
+        for _ in range(reader.integer()):
+            attribute_name = (reader.string() or None, reader.string())
+            attributes[attribute_name] = reader.string()
+        return attributes
+    except IndexError:
+        raise ValueError('Truncated compact payload')
+
+
+def decode(data, root_element_renames=None, default_namespace=None, location_base=None, use_parsing_context=True):
+    """
+    Create the binding of a document from its compact encoding. The parameters other than the payload are the same
+    as the ones of :py:func:`ebu_tt_live.bindings.parser.parse_document`.
+    :param data: the payload
+    :return: the binding of the root element
+    """
+    if default_namespace is None:
+        default_namespace = raw.Namespace.fallbackNamespace()
+    handler = EBUTTSAXHandler(
+        root_element_renames=root_element_renames,
+        fallback_namespace=default_namespace,
+        location_base=location_base
+    )
+    reader = _Reader(data)
+
+    if use_parsing_context:
+        context = xml_parsing_context()
+    else:
+        context = _no_parsing_context()
+    names = []
+    with context:
+        handler.startDocument()
+        try:
+            while not reader.at_end():
+                record = reader.byte()
+                if record == _START_ELEMENT:
+                    name = (reader.string() or None, reader.string())
+                    attributes = {}
+                    for _ in range(reader.integer()):
+                        attribute_name = (reader.string() or None, reader.string())
+                        attributes[attribute_name] = reader.string()
+                    names.append(name)
+                    handler.startElementNS(name, None, xml.sax.xmlreader.AttributesNSImpl(attributes, {}))
+                elif record == _TEXT:
+                    handler.characters(reader.literal())
+                elif record == _END_ELEMENT:
+                    handler.endElementNS(names.pop(), None)
+                else:
+                    raise ValueError('Invalid compact payload record: {}'.format(record))
+        except IndexError:
+            raise ValueError('Truncated compact payload')
+        if names:
+            raise ValueError('Truncated compact payload')
+        handler.endDocument()
+        return handler.rootObject()
+
@@ -0,0 +1,164 @@
+"""
+This module contains the incremental parser backend of the bindings. It drives PyXB's SAX content handler with the
+events of an expat parser that is fed chunk by chunk so a document can be parsed as it arrives from the carriage
+mechanism without keeping the complete text or an intermediate DOM tree around.
+"""
+
+import logging
+import threading
+import pyxb
+import pyxb.binding.saxer
+from pyxb.utils import six
+from . import raw
+from .pyxb_utils import xml_parsing_context
+
+log = logging.getLogger(__name__)
+
+PARSER_BACKEND_PYXB = 'pyxb'
+PARSER_BACKEND_SAX = 'sax'
+
+__parser_backend = threading.local()
+
+
+def get_parser_backend():
+    """
+    :return: the name of the parser backend CreateFromDocument uses in the current thread
+    """
+    return getattr(__parser_backend, 'name', PARSER_BACKEND_PYXB)
+
+
+def set_parser_backend(name):
+    """
+    Select the parser backend CreateFromDocument uses in the current thread.
+    :param name: PARSER_BACKEND_PYXB or PARSER_BACKEND_SAX
+    """
+    if name not in (PARSER_BACKEND_PYXB, PARSER_BACKEND_SAX):
+        raise ValueError(name)
+    __parser_backend.name = name
+
+
+class _no_parsing_context(object):
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class EBUTTSAXHandler(pyxb.binding.saxer.PyXBSAXHandler):
+    """
+    PyXB's SAX content handler extended with the renaming of the root element. The EBU-TT-D bindings use a separate
+    root element identity (ttd) for the tt element, which used to require a DOM tree to rename it before parsing.
+    """
+
+    _root_element_renames = None
+    _depth = 0
+
+    def __init__(self, root_element_renames=None, **kwargs):
+        self._root_element_renames = root_element_renames or {}
+        super(EBUTTSAXHandler, self).__init__(**kwargs)
+
+    def reset(self):
+        self._depth = 0
+        return super(EBUTTSAXHandler, self).reset()
+
+    def startElementNS(self, name, qname, attrs):
+        if self._depth == 0:
+            name = self._root_element_renames.get(name, name)
+        self._depth += 1
+        return super(EBUTTSAXHandler, self).startElementNS(name, qname, attrs)
+
+    def endElementNS(self, name, qname):
+        self._depth -= 1
+        if self._depth == 0:
+            name = self._root_element_renames.get(name, name)
+        return super(EBUTTSAXHandler, self).endElementNS(name, qname)
+
+
+class IncrementalParser(object):
+    """
+    Parse a document from consecutive chunks of XML. The timeBase dependent type choices of the bindings rely on
+    the parsing context so the parser keeps its own context and reinstates it for every chunk. This makes it
+    possible to interleave several incremental parsers in the same thread.
+
+    The parser can be reused: after close returned the binding the next feed starts a new document.
+
+    :param root_element_renames: dictionary mapping (namespace URI, local name) tuples of the root element to the
+        name it should be parsed as
+    :param use_parsing_context: the EBU-TT-D bindings have a fixed media timeBase and do not take part in the
+        timeBase dependent type choices so they are parsed without a parsing context
+    """
+
+    _parser = None
+    _handler = None
+    _context = None
+    _use_parsing_context = None
+
+    def __init__(self, root_element_renames=None, default_namespace=None, location_base=None,
+                 use_parsing_context=True):
+        if default_namespace is None:
+            default_namespace = raw.Namespace.fallbackNamespace()
+        self._parser = pyxb.binding.saxer.make_parser(
+            fallback_namespace=default_namespace,
+            location_base=location_base,
+            content_handler_constructor=EBUTTSAXHandler,
+            root_element_renames=root_element_renames
+        )
+        self._handler = self._parser.getContentHandler()
+        self._context = {}
+        self._use_parsing_context = use_parsing_context
+
+    def _parsing_context(self):
+        if self._use_parsing_context:
+            return xml_parsing_context(context=self._context)
+        return _no_parsing_context()
+
+    def feed(self, data):
+        """
+        Parse the next chunk of the document.
+        :param data: str or unicode chunk of XML
+        """
+        if isinstance(data, six.text_type):
+            data = data.encode(pyxb._InputEncoding)
+        with self._parsing_context():
+            self._parser.feed(data)
+
+    def close(self):
+        """
+        Finish the document.
+        :return: the binding of the root element
+        """
+        try:
+            with self._parsing_context():
+                self._parser.close()
+                return self._handler.rootObject()
+        finally:
+            self._context = {}
+
+    def reset(self):
+        """
+        Drop the partially parsed document.
+        """
+        self._parser.reset()
+        self._context = {}
+
+    def parse(self, xml_text):
+        self.feed(xml_text)
+        return self.close()
+
+
+def parse_document(xml_text, root_element_renames=None, default_namespace=None, location_base=None,
+                   use_parsing_context=True):
+    """
+    Parse a complete document with the incremental parser backend. See :py:class:`IncrementalParser` for the
+    parameters.
+    :param xml_text: the XML document
+    :return: the binding of the root element
+    """
+    return IncrementalParser(
+        root_element_renames=root_element_renames,
+        default_namespace=default_namespace,
+        location_base=location_base,
+        use_parsing_context=use_parsing_context
+    ).parse(xml_text)
@@ -31,9 +31,9 @@ def get_xml_parsing_context():
     return __xml_parsing_context.context
 
 
-def reset_xml_parsing_context(parsing=False):
+def reset_xml_parsing_context(parsing=False, context=None):
     log.debug('Resetting xml_parsing_context: {}'.format(__xml_parsing_context))
-    __xml_parsing_context.context = {}
+    __xml_parsing_context.context = context if context is not None else {}
     __xml_parsing_context.parsing = parsing
 
 
@@ -42,10 +42,18 @@ class xml_parsing_context(object):
     This context manager is helpful to inject a thread local parsing context into the XML parser to be able to control
     its type choices based on semantic rules. The context manager makes sure the context is renewed every time a new
     document is parsed. This prevents unwanted correlation between documents.
+
+    An incremental parser receives its document in several chunks so it passes in its own context object to be
+    reinstated for every chunk.
     """
 
+    _context = None
+
+    def __init__(self, context=None):
+        self._context = context
+
     def __enter__(self):
-        reset_xml_parsing_context(True)
+        reset_xml_parsing_context(True, context=self._context)
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         reset_xml_parsing_context()
@@ -0,0 +1,343 @@
+"""
+This module contains the streaming serializer of the bindings. PyXB generates XML by building a DOM tree which
+is then pretty printed by minidom. The serializer below receives the same calls PyXB makes to build that tree but
+writes the markup as the calls arrive, so no DOM tree is built for the binding content. The document returned is
+identical to what minidom's toprettyxml (pretty mode) or toxml (compact mode) would produce from the DOM tree. The
+document written to a file only differs in where the namespaces are declared.
+"""
+
+import logging
+import xml.dom
+import xml.dom.minidom
+import pyxb
+import pyxb.namespace
+import pyxb.utils.saxdom
+from pyxb.utils import six
+from pyxb.utils.domutils import BindingDOMSupport
+
+log = logging.getLogger(__name__)
+
+PRETTY_INDENT = '  '
+PRETTY_NEWLINE = '\n'
+
+
+def _escape(data):
+    # Same escaping as minidom applies to both text and attribute values
+    return data.replace('&', '&amp;').replace('<', '&lt;').replace('"', '&quot;').replace('>', '&gt;')
+
+
+class _TextNode(object):
+    """
+    Stands in for the text nodes PyXB creates through the document of the BindingDOMSupport.
+    """
+
+    __slots__ = ('data',)
+
+    nodeType = xml.dom.Node.TEXT_NODE
+
+    def __init__(self, data):
+        self.data = data
+
+
+class _Document(object):
+    """
+    Stands in for the DOM document PyXB expects the BindingDOMSupport to build.
+    """
+
+    documentElement = None
+
+    def createTextNode(self, data):
+        return _TextNode(data)
+
+
+class _Element(object):
+    """
+    An open element of the output. It only lives until the element is closed.
+    """
+
+    __slots__ = ('serializer', 'tagName', 'attributes', 'depth', 'child_count', 'pending_text', 'declarations')
+
+    nodeType = xml.dom.Node.ELEMENT_NODE
+
+    def __init__(self, serializer, tag_name, depth):
+        self.serializer = serializer
+        self.tagName = tag_name
+        self.attributes = {}
+        self.depth = depth
+        self.child_count = 0
+        self.pending_text = None
+        self.declarations = None
+
+    def appendChild(self, child):
+        return self.serializer.appendChild(child, self)
+
+    def setAttributeNS(self, namespace_uri, name, value):
+        self.attributes[name] = value
+
+
+class _Writer(object):
+
+    __slots__ = ('write',)
+
+    def __init__(self, write):
+        self.write = write
+
+
+class StreamingSerializer(BindingDOMSupport):
+    """
+    A BindingDOMSupport that writes the document instead of building it. PyXB creates the attributes of an element
+    before its children and the children in document order so an element is complete once an event arrives for
+    one of its ancestors.
+
+    The namespace declarations are only known after the whole document has been processed. Without a write
+    callable the chunks are collected and the start tag of the root element is completed last, which gives the
+    output of the DOM path. With a write callable every chunk is written as soon as it is complete. Only the start
+    tag of the root element is held back until the content of the root begins. It declares the namespaces of the
+    prefix map and the ones referenced so far. A namespace referenced for the first time after that is declared on
+    the element that needs it.
+
+    :param pretty: indent the output like toprettyxml if True, produce compact output like toxml otherwise
+    :param namespace_prefix_map: passed to BindingDOMSupport
+    :param write: callable receiving the chunks of the document as they are complete. If None the chunks are
+        returned by close.
+    """
+
+    _write = None
+    _chunks = None
+    _stack = None
+    _root = None
+    _root_start_index = None
+    _stream_document = None
+    _indent = None
+    _newline = None
+    _namespace_prefix_map = None
+    _referenced = None
+    _in_scope = None
+    _pending = None
+
+    def __init__(self, pretty=True, namespace_prefix_map=None, write=None, **kwargs):
+        if write is None:
+            self._chunks = []
+            self._write = self._chunks.append
+        else:
+            self._write = write
+        self._stack = []
+        self._namespace_prefix_map = namespace_prefix_map
+        self._referenced = set()
+        self._pending = []
+        self._stream_document = _Document()
+        if pretty:
+            self._indent = PRETTY_INDENT
+            self._newline = PRETTY_NEWLINE
+        else:
+            self._indent = ''
+            self._newline = ''
+        super(StreamingSerializer, self).__init__(namespace_prefix_map=namespace_prefix_map, **kwargs)
+
+    def document(self):
+        return self._stream_document
+
+    def finalize(self):
+        # PyXB finalizes after every element it converts. The namespace declarations are added in close.
+        return self._stream_document
+
+    def namespacePrefix(self, namespace, enable_default_namespace=True):
+        if isinstance(namespace, six.string_types):
+            namespace = pyxb.namespace.NamespaceForURI(namespace, create_if_missing=True)
+        prefix = super(StreamingSerializer, self).namespacePrefix(
+            namespace, enable_default_namespace=enable_default_namespace
+        )
+        if prefix is not None:
+            declaration = (namespace, prefix)
+            self._referenced.add(declaration)
+            if self._in_scope is not None and declaration not in self._in_scope:
+                # The root start tag is written already. The next start tag is the one of the element that
+                # references the namespace or of one of its ancestors.
+                self._in_scope.add(declaration)
+                self._pending.append(declaration)
+        return prefix
+
+    def createChildElement(self, expanded_name, parent=None):
+        if isinstance(expanded_name, six.string_types):
+            expanded_name = pyxb.namespace.ExpandedName(None, expanded_name)
+        if not isinstance(expanded_name, pyxb.namespace.ExpandedName):
+            raise pyxb.LogicError('Invalid type %s for expanded name' % (type(expanded_name),))
+
+        if parent is None:
+            parent = self._root
+        if parent is not None:
+            # The previous siblings are closed before the name of the element references its namespace
+            self._child_added(parent)
+
+        name = expanded_name.localName()
+        if expanded_name.namespace() is not None:
+            name = self.qnameAsText(expanded_name)
+
+        if parent is None:
+            self._root = _Element(self, name, 0)
+            self._stream_document.documentElement = self._root
+            self._stack.append(self._root)
+            return self._root
+
+        element = _Element(self, name, parent.depth + 1)
+        self._stack.append(element)
+        return element
+
+    def appendChild(self, child, parent):
+        if isinstance(child, _TextNode):
+            self._text_added(parent, child.data)
+            return child
+        self._child_added(parent)
+        if isinstance(child, (pyxb.utils.saxdom.Node, xml.dom.minidom.Node)):
+            # Wildcard content kept as DOM by the parser. Cloning registers its namespaces the same way the DOM
+            # path does.
+            child = self.cloneIntoImplementation(child)
+        declarations = self._pending
+        if declarations:
+            self._pending = []
+            for namespace, prefix in declarations:
+                self.addXMLNSDeclaration(child, namespace, prefix)
+        child.writexml(
+            _Writer(self._write), self._indent * (parent.depth + 1), self._indent, self._newline
+        )
+        if declarations:
+            self._in_scope.difference_update(declarations)
+        return child
+
+    def appendTextChild(self, text, parent):
+        self._text_added(parent, self.valueAsText(text))
+
+    def _close_until(self, parent):
+        while self._stack[-1] is not parent:
+            self._close_element(self._stack.pop())
+
+    def _declare_namespaces(self, element):
+        namespace = self.defaultNamespace()
+        if namespace is not None:
+            self.addXMLNSDeclaration(element, namespace, '')
+        for namespace, prefix in self._referenced:
+            self.addXMLNSDeclaration(element, namespace, prefix)
+
+    def _write_start_tag(self, element):
+        if element is not self._root:
+            self._write(self._start_tag(element))
+        elif self._chunks is not None:
+            # Filled in by close
+            self._root_start_index = len(self._chunks)
+            self._write(None)
+        else:
+            if self._namespace_prefix_map:
+                for namespace in self._namespace_prefix_map.values():
+                    self.namespacePrefix(namespace)
+            self._declare_namespaces(element)
+            self._in_scope = set(self._referenced)
+            self._write(self._start_tag(element))
+
+    def _start_tag(self, element):
+        if self._pending:
+            element.declarations = self._pending
+            self._pending = []
+            for namespace, prefix in element.declarations:
+                self.addXMLNSDeclaration(element, namespace, prefix)
+        chunks = [self._indent * element.depth, '<', element.tagName]
+        for name in sorted(element.attributes.keys()):
+            chunks.extend((' ', name, '="', _escape(element.attributes[name]), '"'))
+        return ''.join(chunks)
+
+    def _open_content(self, element):
+        self._write_start_tag(element)
+        self._write('>' + self._newline)
+        if element.pending_text is not None:
+            self._write_text(element, element.pending_text)
+            element.pending_text = None
+
+    def _write_text(self, parent, data):
+        self._write(_escape(self._indent * (parent.depth + 1) + data + self._newline))
+
+    def _child_added(self, parent):
+        self._close_until(parent)
+        if parent.child_count == 0 or parent.pending_text is not None:
+            self._open_content(parent)
+        parent.child_count += 1
+
+    def _text_added(self, parent, data):
+        self._close_until(parent)
+        if parent.child_count == 0:
+            # It might be the only child. In that case it goes on the line of the element.
+            parent.pending_text = data
+        else:
+            if parent.pending_text is not None:
+                self._open_content(parent)
+            self._write_text(parent, data)
+        parent.child_count += 1
+
+    def _close_element(self, element):
+        if element.child_count == 0:
+            self._write_start_tag(element)
+            self._write('/>' + self._newline)
+        elif element.pending_text is not None:
+            self._write_start_tag(element)
+            self._write('>' + _escape(element.pending_text) + '</' + element.tagName + '>' + self._newline)
+        else:
+            self._write(self._indent * element.depth + '</' + element.tagName + '>' + self._newline)
+        if element.declarations is not None:
+            self._in_scope.difference_update(element.declarations)
+
+    def close(self):
+        """
+        Complete the document.
+        :return: the list of the text chunks of the document if no write callable was given
+        """
+        self._close_until(self._root)
+        self._stack.pop()
+        self._close_element(self._root)
+        if self._chunks is None:
+            return None
+        self._declare_namespaces(self._root)
+        self._chunks[self._root_start_index] = self._start_tag(self._root)
+        return self._chunks
+
+
+def serialize(binding, output=None, pretty=True, encoding=None, root_only=False, element_name=None,
+              namespace_prefix_map=None):
+    """
+    Serialize a binding without building a DOM tree.
+    :param binding: the root binding of the document
+    :param output: file-like object the document is written to chunk by chunk. The root element also declares the
+        namespaces of namespace_prefix_map then. If None the document is returned.
+    :param pretty: indent the document as toprettyxml does or write it compactly as toxml does
+    :param encoding: if given the output is encoded and the encoding is declared in the XML declaration
+    :param root_only: leave out the XML declaration
+    :param element_name: passed to toDOM
+    :param namespace_prefix_map: preferred prefixes of the namespaces
+    :return: the document if no output was given
+    """
+    newline = pretty and PRETTY_NEWLINE or ''
+    if root_only:
+        declaration = None
+    elif encoding is None:
+        declaration = '<?xml version="1.0" ?>' + newline
+    else:
+        declaration = '<?xml version="1.0" encoding="%s"?>%s' % (encoding, newline)
+
+    if output is None:
+        serializer = StreamingSerializer(pretty=pretty, namespace_prefix_map=namespace_prefix_map)
+        binding.toDOM(bds=serializer, element_name=element_name)
+        chunks = serializer.close()
+        if declaration is not None:
+            chunks.insert(0, declaration)
+        result = ''.join(chunks)
+        if encoding is not None:
+            result = result.encode(encoding)
+        return result
+
+    if encoding is None:
+        write = output.write
+    else:
+        def write(chunk):
+            output.write(chunk.encode(encoding))
+    if declaration is not None:
+        write(declaration)
+    serializer = StreamingSerializer(pretty=pretty, namespace_prefix_map=namespace_prefix_map, write=write)
+    binding.toDOM(bds=serializer, element_name=element_name)
+    serializer.close()
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from datetime import timedelta
+import os
+import pytest
+import time
+from ebu_tt_live.bindings import compact, div_type, p_type, span_type, br_type, ebuttdt
+from ebu_tt_live.documents import EBUTT3Document
+
+
+package_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+example_sequences_dir = os.path.join(package_dir, '..', 'testing', 'example-sequences')
+
+
+def _example_xml():
+    result = []
+    for dir_name in sorted(os.listdir(example_sequences_dir)):
+        dir_path = os.path.join(example_sequences_dir, dir_name)
+        for file_name in sorted(os.listdir(dir_path)):
+            if file_name.endswith('.xml'):
+                with open(os.path.join(dir_path, file_name), 'r') as xml_file:
+                    result.append(xml_file.read())
+    return result
+
+
+def _constructed_document():
+    document = EBUTT3Document(
+        time_base='media',
+        lang='en-GB',
+        sequence_identifier='TestSeq1',
+        sequence_number=1
+    )
+    document.add_div(div_type(
+        p_type(
+            span_type(
+                u'Fish & chips <with> "quotes" é',
+                br_type(),
+                'in 2 lines.'
+            ),
+            id='ID001',
+            begin=ebuttdt.FullClockTimingType(timedelta(seconds=1)),
+            end=ebuttdt.FullClockTimingType(timedelta(seconds=3))
+        ),
+        p_type(
+            'Only text',
+            id='ID002'
+        )
+    ))
+    document.validate()
+    return document
+
+
+class TestCompactRoundTrip(TestCase):
+
+    def _assert_round_trip(self, document):
+        payload = document.get_compact()
+        self.assertTrue(compact.is_compact(payload))
+        decoded = EBUTT3Document.create_from_compact(payload)
+        # PyXB checks the content model of the decoded document while serializing it
+        self.assertEqual(decoded.get_xml(), document.get_xml())
+        self.assertEqual(decoded.computed_begin_time, document.computed_begin_time)
+        self.assertEqual(compact.encode(decoded.binding), payload)
+        return payload
+
+    def test_example_sequences(self):
+        for xml in _example_xml():
+            payload = self._assert_round_trip(EBUTT3Document.create_from_xml(xml))
+            self.assertLess(len(payload), len(xml) / 2)
+
+    def test_constructed_document(self):
+        self._assert_round_trip(_constructed_document())
+
+    def test_empty_document(self):
+        self._assert_round_trip(EBUTT3Document(
+            time_base='clock',
+            lang='en-GB',
+            sequence_identifier='TestSeq1',
+            sequence_number=1
+        ))
+
+    def test_unknown_strings(self):
+        document = _constructed_document()
+        document.sequence_identifier = 'UnknownSequence'
+        payload = self._assert_round_trip(document)
+        self.assertIn(u'é'.encode('utf-8'), payload)
+        self.assertEqual(payload.count(b'UnknownSequence'), 1)
+        # Defined once, referenced afterwards
+        self.assertEqual(payload.count(b'ID00'), 2)
+
+    def test_cached_payload(self):
+        document = _constructed_document()
+        payload = document.get_compact()
+        self.assertIs(document.get_compact(), payload)
+        document.sequence_number = 2
+        self.assertNotEqual(document.get_compact(), payload)
+        self.assertEqual(EBUTT3Document.create_from_compact(document.get_compact()).sequence_number, 2)
+
+    def test_is_compact(self):
+        self.assertFalse(compact.is_compact(_constructed_document().get_encoded_xml()))
+        self.assertFalse(compact.is_compact(u'\x00EBT'))
+
+    def test_invalid_payloads(self):
+        payload = _constructed_document().get_compact()
+        self.assertRaises(ValueError, compact.decode, payload[4:])
+        self.assertRaises(ValueError, compact.decode, payload[:4] + b'\x7f' + payload[5:])
+        self.assertRaises(ValueError, compact.decode, payload[:-1])
+        self.assertRaises(ValueError, compact.decode, payload[:len(payload) // 2])
+
+
+@pytest.mark.benchmark
+class TestCompactHopBenchmark(TestCase):
+    """
+    Reports the cost of a hop between two nodes: the sender encodes the document and the receiver decodes and
+    validates it.
+    """
+
+    repeat = 2
+
+    def _hop_rate(self, documents, encode, create):
+        start = time.time()
+        for _ in range(self.repeat):
+            for document in documents:
+                document.invalidate_serialized()
+                create(encode(document), availability_time=timedelta())
+        return len(documents) * self.repeat / (time.time() - start)
+
+    def test_benchmark(self):
+        documents = [EBUTT3Document.create_from_xml(xml) for xml in _example_xml()]
+        xml_rate = self._hop_rate(
+            documents, lambda document: document.get_encoded_xml(), EBUTT3Document.create_from_xml
+        )
+        compact_rate = self._hop_rate(
+            documents, lambda document: document.get_compact(), EBUTT3Document.create_from_compact
+        )
+        xml_size = sum(len(document.get_encoded_xml()) for document in documents)
+        compact_size = sum(len(document.get_compact()) for document in documents)
+        print('XML hop: {:.1f} docs/second, {} bytes; compact hop: {:.1f} docs/second, {} bytes'.format(
+            xml_rate, xml_size, compact_rate, compact_size
+        ))
@@ -0,0 +1,177 @@
+from unittest import TestCase
+from datetime import timedelta
+from mock import patch
+import os
+import pytest
+import time
+from ebu_tt_live import bindings
+from ebu_tt_live.bindings import IncrementalParser, parse_document, set_parser_backend, get_parser_backend, \
+    PARSER_BACKEND_PYXB, PARSER_BACKEND_SAX, ebuttdt, tt_type, d_tt_type
+from ebu_tt_live.clocks.media import MediaClock
+from ebu_tt_live.documents import EBUTT3Document, EBUTTDDocument
+from ebu_tt_live.documents.converters import ebutt3_to_ebuttd
+
+
+package_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+example_sequences_dir = os.path.join(package_dir, '..', 'testing', 'example-sequences')
+
+media_document_template = '''<?xml version="1.0" ?>
+<tt:tt ebuttp:sequenceIdentifier="MediaSequence" ebuttp:sequenceNumber="1" ttp:timeBase="{time_base}" xml:lang="en-GB"
+    xmlns:ebuttm="urn:ebu:tt:metadata" xmlns:ebuttp="urn:ebu:tt:parameters" xmlns:tt="http://www.w3.org/ns/ttml"
+    xmlns:ttp="http://www.w3.org/ns/ttml#parameter">
+  <tt:head>
+    <tt:metadata>
+      <ebuttm:documentMetadata/>
+    </tt:metadata>
+  </tt:head>
+  <tt:body begin="{begin}">
+    <tt:div>
+      <tt:p xml:id="ID001" end="{end}">Text</tt:p>
+    </tt:div>
+  </tt:body>
+</tt:tt>'''
+
+
+def _example_documents():
+    documents = []
+    for dir_name in sorted(os.listdir(example_sequences_dir)):
+        dir_path = os.path.join(example_sequences_dir, dir_name)
+        for file_name in sorted(os.listdir(dir_path)):
+            if file_name.endswith('.xml'):
+                with open(os.path.join(dir_path, file_name), 'r') as xml_file:
+                    documents.append(xml_file.read())
+    with open(os.path.join(package_dir, 'carriage', 'test', 'test_data', 'testSeq_1.xml'), 'r') as xml_file:
+        documents.append(xml_file.read())
+    with open(os.path.join(package_dir, 'documents', 'test', 'converter_ericsson1.xml'), 'r') as xml_file:
+        documents.append(xml_file.read())
+    return documents
+
+
+class TestParserParity(TestCase):
+
+    def setUp(self):
+        self.documents = _example_documents()
+
+    def test_bindings_match(self):
+        for xml in self.documents:
+            expected = bindings.CreateFromDocument(xml)
+            result = parse_document(xml)
+            self.assertIsInstance(result, tt_type)
+            self.assertEqual(result.toxml(), expected.toxml())
+            self.assertEqual(type(result.body.begin), type(expected.body.begin))
+
+    def test_computed_times_match(self):
+        for xml in self.documents:
+            expected = EBUTT3Document.create_from_raw_binding(bindings.CreateFromDocument(xml))
+            result = EBUTT3Document.create_from_raw_binding(parse_document(xml))
+            self.assertEqual(result.computed_begin_time, expected.computed_begin_time)
+            self.assertEqual(result.computed_end_time, expected.computed_end_time)
+            self.assertEqual(
+                [(item.computed_begin_time, item.computed_end_time) for item in result.lookup_range_on_timeline()],
+                [(item.computed_begin_time, item.computed_end_time) for item in expected.lookup_range_on_timeline()]
+            )
+
+    def test_parse_errors_match(self):
+        self.assertRaises(Exception, bindings.CreateFromDocument, '<tt:tt')
+        self.assertRaises(Exception, parse_document, '<tt:tt')
+
+
+class TestIncrementalParser(TestCase):
+
+    def test_chunked_feed(self):
+        xml = _example_documents()[0]
+        expected = parse_document(xml).toxml()
+        parser = IncrementalParser()
+        for chunk_size in (1, 7, 256):
+            for index in range(0, len(xml), chunk_size):
+                parser.feed(xml[index:index + chunk_size])
+            self.assertEqual(parser.close().toxml(), expected)
+
+    def test_interleaved_time_bases(self):
+        # The timing types depend on the timeBase of the document each parser is working on
+        clock_xml = media_document_template.format(time_base='clock', begin='01:00:00.0', end='01:00:02.0')
+        media_xml = media_document_template.format(time_base='media', begin='100:00:00.0', end='100:00:02.0')
+        clock_parser = IncrementalParser()
+        media_parser = IncrementalParser()
+        half = len(clock_xml) / 2
+        clock_parser.feed(clock_xml[:half])
+        media_parser.feed(media_xml[:half])
+        clock_parser.feed(clock_xml[half:])
+        media_parser.feed(media_xml[half:])
+        clock_binding = clock_parser.close()
+        media_binding = media_parser.close()
+        self.assertIsInstance(clock_binding.body.begin, ebuttdt.LimitedClockTimingType)
+        self.assertIsInstance(media_binding.body.begin, ebuttdt.FullClockTimingType)
+        self.assertEqual(media_binding.body.begin.timedelta, timedelta(hours=100))
+
+    def test_reset(self):
+        xml = _example_documents()[0]
+        parser = IncrementalParser()
+        parser.feed(xml[:100])
+        parser.reset()
+        parser.feed(xml)
+        self.assertEqual(parser.close().toxml(), parse_document(xml).toxml())
+
+
+class TestParserBackendSwitch(TestCase):
+
+    def tearDown(self):
+        set_parser_backend(PARSER_BACKEND_PYXB)
+
+    def test_default(self):
+        self.assertEqual(get_parser_backend(), PARSER_BACKEND_PYXB)
+
+    def test_switch(self):
+        xml = _example_documents()[0]
+        set_parser_backend(PARSER_BACKEND_SAX)
+        with patch('ebu_tt_live.bindings.parse_document', side_effect=parse_document) as sax_parse:
+            document = EBUTT3Document.create_from_xml(xml)
+        self.assertTrue(sax_parse.called)
+        self.assertIsInstance(document.binding, tt_type)
+
+    def test_invalid_backend(self):
+        self.assertRaises(ValueError, set_parser_backend, 'dom')
+
+
+class TestEBUTTDDocumentParsing(TestCase):
+
+    def test_create_from_xml(self):
+        with open(os.path.join(package_dir, 'documents', 'test', 'converter_ericsson1.xml'), 'r') as xml_file:
+            ebutt3_document = EBUTT3Document.create_from_xml(xml_file.read())
+        media_clock = MediaClock()
+        media_clock.adjust_time(timedelta(), ebuttdt.LimitedClockTimingType('12:11:50.000').timedelta)
+        ebuttd_document = ebutt3_to_ebuttd(ebutt3_document, media_clock)
+        xml = ebuttd_document.get_xml()
+
+        parsed_document = EBUTTDDocument.create_from_xml(xml)
+        self.assertIsInstance(parsed_document._ebuttd_content, d_tt_type)
+        parsed_document.validate()
+        # Pretty printing adds whitespace to the mixed content of p elements on every round
+        self.assertEqual(''.join(parsed_document.get_xml().split()), ''.join(xml.split()))
+
+
+@pytest.mark.benchmark
+class TestParserThroughput(TestCase):
+    """
+    Compares the two parser backends on the example sequences. Both are expected to build the same bindings so the
+    figures are only reported.
+    """
+
+    repeat = 2
+
+    def _documents_per_second(self, parse, documents):
+        start = time.time()
+        for _ in range(self.repeat):
+            for xml in documents:
+                parse(xml)
+        return len(documents) * self.repeat / (time.time() - start)
+
+    def test_throughput(self):
+        documents = _example_documents()
+        incremental_parser = IncrementalParser()
+        pyxb_rate = self._documents_per_second(bindings.CreateFromDocument, documents)
+        sax_rate = self._documents_per_second(parse_document, documents)
+        reused_rate = self._documents_per_second(incremental_parser.parse, documents)
+        print('PyXB: {:.1f} docs/second, SAX: {:.1f} docs/second, reused SAX parser: {:.1f} docs/second'.format(
+            pyxb_rate, sax_rate, reused_rate
+        ))
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from datetime import timedelta
+from mock import patch
+from StringIO import StringIO
+from xml.etree import ElementTree
+import os
+import pytest
+import time
+from pyxb.utils.domutils import BindingDOMSupport
+from ebu_tt_live import bindings
+from ebu_tt_live.bindings import namespace_prefix_map, serialize, StreamingSerializer, div_type, p_type, span_type, br_type, ebuttdt
+from ebu_tt_live.clocks.media import MediaClock
+from ebu_tt_live.documents import EBUTT3Document
+from ebu_tt_live.documents.converters import ebutt3_to_ebuttd
+
+
+package_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+example_sequences_dir = os.path.join(package_dir, '..', 'testing', 'example-sequences')
+
+
+def _dom_xml(binding, encoding=None, root_only=False, pretty=True):
+    """
+    The reference output: minidom serializing the DOM tree PyXB builds.
+    """
+    dom = binding.toDOM(BindingDOMSupport(namespace_prefix_map=namespace_prefix_map))
+    if root_only:
+        dom = dom.documentElement
+    if pretty:
+        return dom.toprettyxml(encoding=encoding, indent='  ')
+    return dom.toxml(encoding)
+
+
+def _example_bindings():
+    result = []
+    for dir_name in sorted(os.listdir(example_sequences_dir)):
+        dir_path = os.path.join(example_sequences_dir, dir_name)
+        for file_name in sorted(os.listdir(dir_path)):
+            if file_name.endswith('.xml'):
+                with open(os.path.join(dir_path, file_name), 'r') as xml_file:
+                    result.append(bindings.CreateFromDocument(xml_file.read()))
+    return result
+
+
+def _constructed_document():
+    document = EBUTT3Document(
+        time_base='media',
+        lang='en-GB',
+        sequence_identifier='TestSeq1',
+        sequence_number=1
+    )
+    document.add_div(div_type(
+        p_type(
+            span_type(
+                u'Fish & chips <with> "quotes" é',
+                br_type(),
+                'in 2 lines.'
+            ),
+            id='ID001',
+            begin=ebuttdt.FullClockTimingType(timedelta(seconds=1)),
+            end=ebuttdt.FullClockTimingType(timedelta(seconds=3))
+        ),
+        p_type(
+            'Only text',
+            id='ID002'
+        ),
+        p_type(
+            '',
+            id='ID003'
+        )
+    ))
+    document.validate()
+    return document
+
+
+def _canonical(xml_text):
+    return ElementTree.tostring(ElementTree.fromstring(xml_text))
+
+
+class TestSerializerEquivalence(TestCase):
+
+    def _assert_equivalent(self, binding):
+        self.assertEqual(binding.toxml(), _dom_xml(binding))
+        self.assertEqual(binding.toxml(encoding='utf-8'), _dom_xml(binding, encoding='utf-8'))
+        self.assertEqual(binding.toxml(root_only=True), _dom_xml(binding, root_only=True))
+        self.assertEqual(binding.toxml(pretty=False), _dom_xml(binding, pretty=False))
+        output = StringIO()
+        binding.write_xml(output, encoding='utf-8')
+        # Only the namespace declarations differ
+        self.assertEqual(_canonical(output.getvalue()), _canonical(_dom_xml(binding, encoding='utf-8')))
+
+    def test_example_sequences(self):
+        for binding in _example_bindings():
+            self._assert_equivalent(binding)
+
+    def test_constructed_document(self):
+        self._assert_equivalent(_constructed_document().binding)
+
+    def test_empty_document(self):
+        document = EBUTT3Document(
+            time_base='clock',
+            lang='en-GB',
+            sequence_identifier='TestSeq1',
+            sequence_number=1
+        )
+        self._assert_equivalent(document.binding)
+
+    def test_ebuttd_document(self):
+        media_clock = MediaClock()
+        for binding in _example_bindings()[:3]:
+            document = EBUTT3Document.create_from_raw_binding(binding)
+            media_clock.adjust_time(timedelta(), document.computed_begin_time)
+            ebuttd_document = ebutt3_to_ebuttd(document, media_clock)
+            self._assert_equivalent(ebuttd_document._ebuttd_content)
+        ebuttd_document = ebutt3_to_ebuttd(_constructed_document(), MediaClock())
+        self._assert_equivalent(ebuttd_document._ebuttd_content)
+
+    def test_reparse(self):
+        for binding in _example_bindings():
+            compact = serialize(binding, pretty=False, namespace_prefix_map=namespace_prefix_map)
+            self.assertEqual(
+                bindings.CreateFromDocument(compact).toxml(pretty=False),
+                compact
+            )
+
+
+class TestStreamingOutput(TestCase):
+
+    def test_chunks_written_before_close(self):
+        binding = _example_bindings()[0]
+        output = StringIO()
+        written_before_close = []
+        close = StreamingSerializer.close
+
+        def recording_close(serializer):
+            written_before_close.append(output.getvalue())
+            return close(serializer)
+
+        with patch.object(StreamingSerializer, 'close', recording_close):
+            serialize(binding, output=output, namespace_prefix_map=namespace_prefix_map)
+        # Only the elements still open at the end of the document are left to close
+        self.assertIn('</tt:head>', written_before_close[0])
+        self.assertIn('</tt:span>', written_before_close[0])
+        self.assertEqual(_canonical(output.getvalue()), _canonical(binding.toxml()))
+
+    def test_namespace_declarations(self):
+        output = StringIO()
+        _example_bindings()[0].write_xml(output)
+        lines = output.getvalue().splitlines()
+        # The root declares the namespaces of the prefix map, the namespaces of the wildcard content are declared
+        # where they are used
+        for prefix, namespace in namespace_prefix_map.items():
+            self.assertIn('xmlns:{}="{}"'.format(prefix, namespace.uri()), lines[1])
+        self.assertNotIn('http://www.bbc.co.uk/ns/bbctt', lines[1])
+        self.assertIn('<ns1:metadata xmlns:ns1="http://www.bbc.co.uk/ns/bbctt">', [line.strip() for line in lines])
+
+
+@pytest.mark.benchmark
+class TestSerializerBenchmark(TestCase):
+    """
+    Reports the serialization rate of the DOM path and the streaming serializer.
+    """
+
+    repeat = 2
+
+    def _documents_per_second(self, serialize_function, documents):
+        start = time.time()
+        for _ in range(self.repeat):
+            for binding in documents:
+                serialize_function(binding)
+        return len(documents) * self.repeat / (time.time() - start)
+
+    def test_benchmark(self):
+        documents = _example_bindings()
+        dom_rate = self._documents_per_second(_dom_xml, documents)
+        pretty_rate = self._documents_per_second(lambda binding: binding.toxml(), documents)
+        compact_rate = self._documents_per_second(lambda binding: binding.toxml(pretty=False), documents)
+        print('DOM: {:.1f} docs/second, streaming pretty: {:.1f} docs/second, streaming compact: {:.1f} '
+              'docs/second'.format(dom_rate, pretty_rate, compact_rate))
@@ -6,6 +6,7 @@ import logging
 import re
 
 from ebu_tt_live.errors import SemanticValidationError
+from ebu_tt_live.utils import IDAllocator
 from ebu_tt_live.strings import DOC_SYNTACTIC_VALIDATION_SUCCESSFUL, ERR_SEMANTIC_ID_UNIQUENESS
 from pyxb.binding.basis import NonElementContent, ElementContent
 
@@ -48,6 +49,22 @@ class SemanticValidationMixin(object):
         """
         pass
 
+    def _semantic_timing_before_traversal(self, dataset, element_content=None):
+        """
+        Timing recomputation preprocess hook. Only called by the TimingValidator.
+        :param dataset: semantic context object
+        :param element_content: the element itself
+        """
+        pass
+
+    def _semantic_timing_after_traversal(self, dataset, element_content=None):
+        """
+        Timing recomputation postprocess hook. Only called by the TimingValidator.
+        :param dataset: semantic context object
+        :param element_content: the element itself
+        """
+        pass
+
     def _do_link_copy_with_copied_parent(self, dataset, element_content, parent_binding):
         celem = dataset['instance_mapping'][self]
         # Link with parent
@@ -185,14 +202,17 @@ class IDMixin(object):
     """
 
     _re_ebu_id_deconflict = re.compile('SEQ([0-9]+)\.(.*)')
-    _tp_ebu_id_deconflict = 'SEQ{sequence_number}.{original_id}'
 
-    def deconflict_id(self, seq_num):
+    def deconflict_id(self, seq_num, id_allocator=None):
+        """
+        Qualify the ID with the sequence number of the document.
+        :param seq_num:
+        :param id_allocator: IDAllocator remembering the qualified IDs, e.g. the one of the document
+        """
         if self.id is not None:
-            self.id = self._tp_ebu_id_deconflict.format(
-                sequence_number=seq_num,
-                original_id=self.id
-            )
+            if id_allocator is None:
+                id_allocator = IDAllocator()
+            self.id = id_allocator.sequence_id(self.id, seq_num)
 
     def _semantic_register_id(self, dataset):
         ebid = dataset['elements_by_id']
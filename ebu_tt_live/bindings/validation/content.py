@@ -42,3 +42,8 @@ class SubtitleContentContainer(
 
     def is_empty(self):
         return not self.contains_subtitles()
+
+    def _semantic_timing_after_traversal(self, dataset, element_content=None):
+        super(SubtitleContentContainer, self)._semantic_timing_after_traversal(
+            dataset=dataset, element_content=element_content)
+        self._semantic_manage_timeline(dataset=dataset, element_content=element_content)
@@ -247,6 +247,12 @@ class TimingValidationMixin(object):
                         )
                     )
 
+    def _semantic_timing_before_traversal(self, dataset, element_content=None):
+        self._semantic_preprocess_timing(dataset=dataset, element_content=element_content)
+
+    def _semantic_timing_after_traversal(self, dataset, element_content=None):
+        self._semantic_postprocess_timing(dataset=dataset, element_content=element_content)
+
     def _semantic_manage_timeline(self, dataset, element_content):
         # Get the document instance
         doc = dataset['document']
@@ -1,6 +1,7 @@
 
 from ..pyxb_utils import RecursiveOperation
-from .base import SemanticValidationMixin
+from .base import SemanticValidationMixin, SemanticDocumentMixin
+from .timing import TimingValidationMixin
 from pyxb.binding.basis import NonElementContent
 
 
@@ -40,3 +41,44 @@ class SemanticValidator(RecursiveOperation):
         self._semantic_dataset.update(kwargs)
         super(SemanticValidator, self).proceed(**kwargs)
         return self._semantic_dataset
+
+
+class TimingValidator(RecursiveOperation):
+    """
+    This validator only recomputes the timing of a document that already passed semantic validation. It is meant for
+    changes that only affect the computed times, such as a new availability time. The ID, style and region
+    validation is not repeated and the branches without timed elements (i.e. head) are not traversed at all.
+    """
+
+    _semantic_dataset = None
+
+    def __init__(self, root_element):
+        super(TimingValidator, self).__init__(
+            root_element=root_element,
+            filter=self._timing_validation_filter
+        )
+        self._semantic_dataset = {}
+
+    def _timing_validation_filter(self, value, element):
+        if isinstance(value, (TimingValidationMixin, SemanticDocumentMixin)):
+            return True
+        else:
+            return False
+
+    def _before_element(self, value, element=None, parent_binding=None, **kwargs):
+        value._semantic_timing_before_traversal(dataset=self._semantic_dataset, element_content=element)
+
+    def _process_element(self, value, element=None, parent_binding=None, **kwargs):
+        return None
+
+    def _after_element(self, value, element=None, parent_binding=None, **kwargs):
+        value._semantic_timing_after_traversal(dataset=self._semantic_dataset, element_content=element)
+
+    def _process_non_element(self, value, non_element, parent_binding=None, **kwargs):
+        return None
+
+    def proceed(self, **kwargs):
+        self._semantic_dataset = {}
+        self._semantic_dataset.update(kwargs)
+        super(TimingValidator, self).proceed(**kwargs)
+        return self._semantic_dataset
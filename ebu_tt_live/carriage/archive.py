@@ -0,0 +1,201 @@
+"""
+Segmented storage of documents. Instead of a file per document, the documents are appended to segment files that
+are rotated by size or by age.
+
+A segment starts with SEGMENT_MAGIC followed by records. A record is the length of the name of the document and the
+length of the document as little-endian unsigned 16 and 32 bit integers, then the name and the document. The
+segments can be replayed on their own; the manifest written along with them gives the availability times and the
+location of every document.
+"""
+
+from ebu_tt_live.strings import ERR_SEGMENT_INVALID
+from collections import OrderedDict
+import mmap
+import os
+import struct
+import time
+
+
+SEGMENT_MAGIC = b'EBTTSEG\x01'
+SEGMENT_EXTENSION = '.seg'
+
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+DEFAULT_OPEN_SEGMENTS = 4
+
+_record_header = struct.Struct('<HI')
+
+
+class SegmentArchive(object):
+    """
+    Appends documents to the current segment and starts a new segment when the current one would grow beyond
+    segment_size or is older than segment_duration. A segment is named after its first document.
+
+    :param dirpath: the folder of the segments
+    :param segment_size: the size in bytes after which a new segment is started
+    :param segment_duration: the age in seconds after which a new segment is started, None to rotate by size only
+    :param clock: function returning the current time in seconds
+    """
+
+    _dirpath = None
+    _segment_size = None
+    _segment_duration = None
+    _clock = None
+    _segment_file = None
+    _segment_name = None
+    _segment_started = None
+    _size = None
+    _segment_count = 0
+
+    def __init__(self, dirpath, segment_size=DEFAULT_SEGMENT_SIZE, segment_duration=None, clock=time.time):
+        if segment_size < len(SEGMENT_MAGIC) + _record_header.size:
+            raise ValueError('Segment size is too small: {}'.format(segment_size))
+        if segment_duration is not None and segment_duration <= 0:
+            raise ValueError('Segment duration must be positive: {}'.format(segment_duration))
+        self._dirpath = dirpath
+        self._segment_size = segment_size
+        self._segment_duration = segment_duration
+        self._clock = clock
+
+    @property
+    def segment_name(self):
+        """
+        The name of the segment the documents are appended to.
+        """
+        return self._segment_name
+
+    @property
+    def segment_count(self):
+        """
+        The number of segments started by the archive.
+        """
+        return self._segment_count
+
+    def _needs_rotation(self, record_size):
+        if self._segment_file is None:
+            return True
+        if self._size > len(SEGMENT_MAGIC) and self._size + record_size > self._segment_size:
+            return True
+        return self._segment_duration is not None and \
+            self._clock() - self._segment_started >= self._segment_duration
+
+    def _start_segment(self, name):
+        self.close()
+        base_name = os.path.splitext(name)[0]
+        segment_name = base_name + SEGMENT_EXTENSION
+        counter = 0
+        while os.path.exists(os.path.join(self._dirpath, segment_name)):
+            counter += 1
+            segment_name = '{}-{}{}'.format(base_name, counter, SEGMENT_EXTENSION)
+        self._segment_file = open(os.path.join(self._dirpath, segment_name), 'wb')
+        self._segment_file.write(SEGMENT_MAGIC)
+        self._segment_name = segment_name
+        self._segment_started = self._clock()
+        self._size = len(SEGMENT_MAGIC)
+        self._segment_count += 1
+
+    def append(self, name, data):
+        """
+        Append a document.
+        :param name: the name of the document
+        :param data: the encoded document
+        :return: tuple of the name of the segment, the offset and the length of the document in the segment
+        """
+        encoded_name = name.encode('utf-8')
+        record_size = _record_header.size + len(encoded_name) + len(data)
+        if self._needs_rotation(record_size):
+            self._start_segment(name)
+        self._segment_file.write(_record_header.pack(len(encoded_name), len(data)))
+        self._segment_file.write(encoded_name)
+        self._segment_file.write(data)
+        offset = self._size + _record_header.size + len(encoded_name)
+        self._size += record_size
+        return self._segment_name, offset, len(data)
+
+    def flush(self, fsync=False):
+        if self._segment_file is not None:
+            self._segment_file.flush()
+            if fsync:
+                os.fsync(self._segment_file.fileno())
+
+    def close(self):
+        if self._segment_file is not None:
+            self._segment_file.close()
+            self._segment_file = None
+
+
+def iter_segment(segment_path):
+    """
+    Read the documents of a segment. An incomplete last record, left by an interrupted write, is ignored.
+    :param segment_path:
+    :return: iterator of tuples of the name of the document, the offset of the document in the segment and the
+        document
+    :raises ValueError: if the file is not a segment
+    """
+    with open(segment_path, 'rb') as segment_file:
+        segment = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        if segment[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+            raise ValueError(ERR_SEGMENT_INVALID.format(path=segment_path))
+        position = len(SEGMENT_MAGIC)
+        while position + _record_header.size <= len(segment):
+            name_length, length = _record_header.unpack_from(segment, position)
+            offset = position + _record_header.size + name_length
+            if offset + length > len(segment):
+                break
+            yield segment[position + _record_header.size:offset].decode('utf-8'), offset, segment[offset:offset + length]
+            position = offset + length
+    finally:
+        segment.close()
+
+
+class SegmentReader(object):
+    """
+    Reads documents from memory-mapped segments. The documents are sliced out of the mapping, so reading one takes
+    no system call once its segment is mapped. The most recently used segments stay mapped; a segment that grew
+    since it was mapped is mapped again.
+
+    :param dirpath: the folder of the segments
+    :param open_segments: the number of segments kept mapped
+    """
+
+    _dirpath = None
+    _open_segments = None
+    _segments = None
+
+    def __init__(self, dirpath, open_segments=DEFAULT_OPEN_SEGMENTS):
+        self._dirpath = dirpath
+        self._open_segments = open_segments
+        self._segments = OrderedDict()
+
+    def _map(self, segment_name):
+        with open(os.path.join(self._dirpath, segment_name), 'rb') as segment_file:
+            segment = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if segment[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+            segment.close()
+            raise ValueError(ERR_SEGMENT_INVALID.format(path=segment_name))
+        return segment
+
+    def read(self, segment_name, offset, length):
+        """
+        Read a document.
+        :param segment_name:
+        :param offset: the offset of the document in the segment
+        :param length: the length of the document
+        :return: the document
+        """
+        segment = self._segments.pop(segment_name, None)
+        if segment is None or offset + length > len(segment):
+            if segment is not None:
+                segment.close()
+            segment = self._map(segment_name)
+        self._segments[segment_name] = segment
+        while len(self._segments) > self._open_segments:
+            self._segments.popitem(last=False)[1].close()
+        if offset + length > len(segment):
+            raise ValueError(ERR_SEGMENT_INVALID.format(path=segment_name))
+        return segment[offset:offset + length]
+
+    def close(self):
+        for segment in self._segments.values():
+            segment.close()
+        self._segments.clear()
@@ -1,16 +1,25 @@
 from .base import ProducerCarriageImpl, ConsumerCarriageImpl
+from .manifest_index import ManifestIndex
+from .archive import SegmentArchive, SegmentReader, DEFAULT_SEGMENT_SIZE
 from ebu_tt_live.documents import EBUTT3Document
-from ebu_tt_live.bindings import CreateFromDocument
 from ebu_tt_live.errors import EndOfData, XMLParsingFailed
-from ebu_tt_live.strings import ERR_DECODING_XML_FAILED
+from ebu_tt_live.strings import ERR_DECODING_XML_FAILED, ERR_FILESYSTEM_WRITER_FAILED
 from datetime import timedelta
+from pyxb.utils.six.moves import queue
 import logging
 import os
-import time
+import threading
 
 
 log = logging.getLogger(__name__)
 
+FSYNC_POLICY_NONE = 'none'
+FSYNC_POLICY_BATCH = 'batch'
+FSYNC_POLICY_ALWAYS = 'always'
+FSYNC_POLICIES = (FSYNC_POLICY_NONE, FSYNC_POLICY_BATCH, FSYNC_POLICY_ALWAYS)
+
+DEFAULT_WRITE_QUEUE_SIZE = 64
+
 
 def timedelta_to_str_manifest(timed, time_base):
     if time_base == 'clock' or time_base == 'media':
@@ -28,14 +37,260 @@ def timedelta_to_str_manifest(timed, time_base):
 def timestr_manifest_to_timedelta(timestr, time_base):
     if time_base == 'clock' or time_base == 'media':
         hours, minutes, rest = timestr.split(":")
-        seconds, milliseconds = rest.split(".")
-        return timedelta(hours=int(hours), minutes=int(minutes), seconds=int(seconds), milliseconds=int(milliseconds))
+        seconds, fraction = rest.split(".")
+        # The fraction of the second may have fewer than 3 digits: 57.5 is 57 seconds and 500 milliseconds
+        return timedelta(hours=int(hours), minutes=int(minutes), seconds=int(seconds),
+                         milliseconds=int(fraction.ljust(3, '0')[:3]))
     elif time_base == 'smpte':
         raise NotImplementedError()
     else:
         raise ValueError()
 
 
+def read_last_manifest_line(manifest_path, block_size=4096):
+    """
+    Read the last line of a manifest without reading the lines before it. The file is read backwards block by
+    block from its end until a line ending is found before the last line.
+    :param manifest_path:
+    :param block_size: the number of bytes read at once
+    :return: the last line without its line ending or None if the manifest has no lines
+    """
+    with open(manifest_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        tail = b''
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            tail = f.read(read_size) + tail
+            stripped = tail.rstrip(b'\r\n')
+            line_start = stripped.rfind(b'\n')
+            if line_start >= 0:
+                return stripped[line_start + 1:].decode('utf-8')
+        tail = tail.rstrip(b'\r\n')
+        return tail.decode('utf-8') if tail else None
+
+
+class FilesystemWriter(object):
+    """
+    Writes the documents and the lines of the manifest in the order they are given. The manifest line of a document
+    is appended after the document is written, so a reader of the manifest never finds a line before its document.
+    The manifest file is kept open for appending.
+
+    The fsync policy says when the written data is forced to the disk:
+
+    * `none`: never, the operating system writes the data when it sees fit
+    * `batch`: every document file is synced when it is written, the manifest once for every batch of documents,
+      see :py:meth:`write_batch`. With an archive the documents are not synced one by one, the segment is synced
+      once for every batch before the manifest.
+    * `always`: after every document and every manifest line
+
+    With build_index the lines are also added to the :py:class:`ebu_tt_live.carriage.manifest_index.ManifestIndex`
+    of the manifest, which is synced along with the manifest.
+
+    With an archive the documents are appended to the segments of the archive instead of being written to files of
+    their own, see :py:class:`ebu_tt_live.carriage.archive.SegmentArchive`. The manifest line of a document then
+    gets the segment, the offset and the length of the document in the segment.
+
+    :param manifest_path: the path of the manifest file
+    :param fsync_policy: one of FSYNC_POLICIES
+    :param build_index: keep the index of the manifest up to date
+    :param archive: the archive to write the documents to
+    """
+
+    _manifest_path = None
+    _manifest_file = None
+    _manifest_size = None
+    _fsync_policy = None
+    _build_index = None
+    _index = None
+    _archive = None
+
+    def __init__(self, manifest_path, fsync_policy=FSYNC_POLICY_NONE, build_index=False, archive=None):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError('Unknown fsync policy: {}'.format(fsync_policy))
+        self._manifest_path = manifest_path
+        self._fsync_policy = fsync_policy
+        self._build_index = build_index
+        self._archive = archive
+
+    @property
+    def manifest_path(self):
+        return self._manifest_path
+
+    @property
+    def fsync_policy(self):
+        return self._fsync_policy
+
+    def write(self, file_path, data, manifest_line):
+        """
+        Write a document and append its line to the manifest.
+        :param file_path: the path of the document
+        :param data: the encoded document
+        :param manifest_line: the line of the manifest, with its line ending
+        """
+        self.write_batch([(file_path, data, manifest_line)])
+
+    def write_batch(self, items):
+        """
+        Write the documents of the batch, then append their lines to the manifest in one write. With the `batch`
+        fsync policy the manifest and its index are synced once for the batch. The files of the documents are
+        synced one by one while the segment of an archive is synced once for the batch.
+        :param items: list of (file_path, data, manifest_line) tuples
+        """
+        manifest_lines = []
+        for file_path, data, manifest_line in items:
+            manifest_line = self._write_document(file_path, data, manifest_line)
+            if self._fsync_policy == FSYNC_POLICY_ALWAYS:
+                self._append_manifest(manifest_line)
+            else:
+                manifest_lines.append(manifest_line)
+        if manifest_lines:
+            if self._archive is not None:
+                self._archive.flush(fsync=self._fsync_policy == FSYNC_POLICY_BATCH)
+            self._append_manifest(''.join(manifest_lines))
+
+    def _write_document(self, file_path, data, manifest_line):
+        # Returns the manifest line of the written document
+        if self._archive is not None:
+            segment_name, offset, length = self._archive.append(os.path.basename(file_path), data)
+            if self._fsync_policy == FSYNC_POLICY_ALWAYS:
+                self._archive.flush(fsync=True)
+            return '{},{},{},{}\n'.format(manifest_line.rstrip('\n'), segment_name, offset, length)
+        with open(file_path, 'wb') as f:
+            f.write(data)
+            if self._fsync_policy != FSYNC_POLICY_NONE:
+                f.flush()
+                os.fsync(f.fileno())
+        return manifest_line
+
+    def _append_manifest(self, text):
+        if self._manifest_file is None:
+            self._manifest_file = open(self._manifest_path, 'a')
+            self._manifest_size = os.path.getsize(self._manifest_path)
+            if self._build_index:
+                self._index = ManifestIndex(self._manifest_path)
+                # Catch up with the lines written without the index
+                self._index.update()
+        self._manifest_file.write(text)
+        self._manifest_file.flush()
+        fsync = self._fsync_policy != FSYNC_POLICY_NONE
+        if fsync:
+            os.fsync(self._manifest_file.fileno())
+        if self._index is not None:
+            for manifest_line in text.splitlines(True):
+                self._index.append(self._manifest_size, manifest_line)
+                self._manifest_size += len(manifest_line)
+            self._index.flush(fsync=fsync)
+        else:
+            self._manifest_size += len(text)
+
+    def flush(self):
+        """
+        Wait until the documents given so far are written. Nothing to wait for here.
+        """
+        pass
+
+    def close(self):
+        if self._manifest_file is not None:
+            self._manifest_file.close()
+            self._manifest_file = None
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+        if self._archive is not None:
+            self._archive.close()
+
+
+class WriteBehindFilesystemWriter(FilesystemWriter):
+    """
+    Passes the documents to a worker thread that writes them, so the thread of the producer, typically the reactor
+    thread, does not wait for the disk. The worker writes everything that is waiting in one batch. When documents
+    arrive faster than the disk takes them the `batch` fsync policy then syncs the manifest, its index and the
+    segment of an archive once for many documents. A document written to a file of its own is still synced on its
+    own, so without an archive `batch` costs about as much as `always`.
+
+    The queue of the worker is bounded. When it is full, :py:meth:`write` waits for room instead of dropping
+    documents or letting the backlog grow without limits. A failure of the worker is raised by the next call of
+    :py:meth:`write`, :py:meth:`flush` or :py:meth:`close`.
+
+    :param manifest_path: the path of the manifest file
+    :param fsync_policy: one of FSYNC_POLICIES
+    :param queue_size: the number of documents waiting to be written before :py:meth:`write` blocks
+    :param build_index: keep the index of the manifest up to date
+    :param archive: the archive to write the documents to
+    """
+
+    _queue = None
+    _worker = None
+    _error = None
+
+    def __init__(self, manifest_path, fsync_policy=FSYNC_POLICY_NONE, queue_size=DEFAULT_WRITE_QUEUE_SIZE,
+                 build_index=False, archive=None):
+        super(WriteBehindFilesystemWriter, self).__init__(
+            manifest_path, fsync_policy=fsync_policy, build_index=build_index, archive=archive
+        )
+        if queue_size < 1:
+            raise ValueError('Write queue size must be positive: {}'.format(queue_size))
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._worker = threading.Thread(target=self._run, name='FilesystemWriter')
+        self._worker.daemon = True
+        self._worker.start()
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # None asks the worker to stop once everything before it is written
+            stop = None in items
+            batch = [item for item in items if item is not None]
+            try:
+                if batch and self._error is None:
+                    super(WriteBehindFilesystemWriter, self).write_batch(batch)
+            except Exception as e:
+                log.exception(ERR_FILESYSTEM_WRITER_FAILED)
+                self._error = e
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+            if stop:
+                super(WriteBehindFilesystemWriter, self).close()
+                return
+
+    def _check_error(self):
+        if self._error is not None:
+            raise IOError(ERR_FILESYSTEM_WRITER_FAILED, self._error)
+
+    def write(self, file_path, data, manifest_line):
+        self._check_error()
+        if not self._worker.is_alive():
+            raise ValueError('Writer is closed')
+        self._queue.put((file_path, data, manifest_line))
+
+    def write_batch(self, items):
+        for item in items:
+            self.write(*item)
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def flush(self):
+        self._queue.join()
+        self._check_error()
+
+    def close(self):
+        if self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join()
+        self._check_error()
+
+
 class FilesystemProducerImpl(ProducerCarriageImpl):
     """
     This class implements a carriage mechanism to output produced documents
@@ -58,58 +313,147 @@ class FilesystemProducerImpl(ProducerCarriageImpl):
     `ttp:timeBase="clock"` or `ttp:timeBase="smpte"`, but not with `ttp:timeBase="media"`.
     If the output folder already exists and it contains a manifest_sequenceIdentifier.txt file for the same
     document sequence, the last line of the existing manifest file is parsed to get the last used sequence number
-    and the current sequence is set to start from the next sequence number.
+    and the current sequence is set to start from the next sequence number. The last line is read backwards from
+    the end of the manifest, so resuming does not depend on the length of the manifest.
+
+    With write_behind the files are written by a worker thread (see :py:class:`WriteBehindFilesystemWriter`) and
+    emit_document only serializes the document. Call :py:meth:`close` before exiting to write the remaining
+    documents.
+
+    :param dirpath: the output folder
+    :param write_behind: write the files from a worker thread
+    :param fsync_policy: one of FSYNC_POLICIES
+    :param queue_size: the number of documents the worker thread may fall behind
+    :param build_index: write the index of the manifest, see :py:class:`ebu_tt_live.carriage.manifest_index.ManifestIndex`
     """
 
     _manifest_path = None
     _dirpath = None
-    _manifest_content = None
     _manifest_time_format = None
+    _writer = None
+    _write_behind = None
+    _fsync_policy = None
+    _queue_size = None
+    _build_index = None
 
-    def __init__(self, dirpath):
+    def __init__(self, dirpath, write_behind=False, fsync_policy=FSYNC_POLICY_NONE,
+                 queue_size=DEFAULT_WRITE_QUEUE_SIZE, build_index=True):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError('Unknown fsync policy: {}'.format(fsync_policy))
+        if queue_size < 1:
+            raise ValueError('Write queue size must be positive: {}'.format(queue_size))
         self._dirpath = dirpath
         if not os.path.exists(self._dirpath):
             os.makedirs(self._dirpath)
-        self._manifest_content = ''
+        self._write_behind = write_behind
+        self._fsync_policy = fsync_policy
+        self._queue_size = queue_size
+        self._build_index = build_index
 
-    def resume_producing(self):
-        manifest_filename = "manifest_" + self._node.document_sequence.sequence_identifier + ".txt"
+    def _open_writer(self, sequence_identifier):
+        manifest_filename = "manifest_" + sequence_identifier + ".txt"
         self._manifest_path = os.path.join(self._dirpath, manifest_filename)
+        if self._writer is not None:
+            if self._writer.manifest_path == self._manifest_path:
+                return
+            self._writer.close()
+        archive = self._create_archive(sequence_identifier)
+        if self._write_behind:
+            self._writer = WriteBehindFilesystemWriter(
+                self._manifest_path, fsync_policy=self._fsync_policy, queue_size=self._queue_size,
+                build_index=self._build_index, archive=archive
+            )
+        else:
+            self._writer = FilesystemWriter(
+                self._manifest_path, fsync_policy=self._fsync_policy, build_index=self._build_index,
+                archive=archive
+            )
+
+    def _create_archive(self, sequence_identifier):
+        # The documents are written to files of their own
+        return None
+
+    def resume_producing(self):
+        self._open_writer(self._node.document_sequence.sequence_identifier)
         if os.path.exists(self._manifest_path):
-            with open(self._manifest_path, 'r') as f:
-                for last_line in f:
-                    pass
+            last_line = read_last_manifest_line(self._manifest_path)
+            if last_line is not None:
                 # Line has format: time,filename
                 # Where filename has the format:
                 # sequenceIdentifier_sequenceNumber.xml
-                _, last_filename = last_line.split(',')
-                last_sequence_number, _ = last_filename.split('_')[1].split('.')
+                # Archived documents have the location in the segment after the file name
+                last_filename = last_line.split(',')[1]
+                last_sequence_number, _ = last_filename.rsplit('_', 1)[1].split('.')
                 self._node.document_sequence.last_sequence_number = int(last_sequence_number)
         while True:
             try:
                 self._node.process_document(document=None)
             except EndOfData:
                 break
+        self._writer.flush()
 
     def emit_document(self, document):
         if self._manifest_path is None:
-            manifest_filename = "manifest_" + document.sequence_identifier + ".txt"
-            self._manifest_path = os.path.join(self._dirpath, manifest_filename)
+            self._open_writer(document.sequence_identifier)
         # Handle there the switch and checks to handle the string format to use
         # for times in the manifest file depending on your time base.
         filename = '{}_{}.xml'.format(document.sequence_identifier, document.sequence_number)
         filepath = os.path.join(self._dirpath, filename)
-        with open(filepath, 'w') as f:
-            f.write(document.get_xml())
         # To be able to format the output we need a datetime.time object and
         # not a datetime.timedelta. The next line serves as a converter (adding
         # a time with a timedelta gives a time)
         time = self._node.reference_clock.get_time()
         time_base = self._node.reference_clock.time_base
         new_manifest_line = '{},{}\n'.format(timedelta_to_str_manifest(time, time_base), filename)
-        self._manifest_content += new_manifest_line
-        with open(self._manifest_path, 'a') as f:
-            f.write(new_manifest_line)
+        # The document is serialized here, the writer only sees bytes
+        self._writer.write(filepath, document.get_encoded_xml(), new_manifest_line)
+
+    def flush(self):
+        """
+        Wait until the emitted documents are written.
+        """
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self):
+        """
+        Write the remaining documents and close the manifest.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._manifest_path = None
+
+
+class ArchiveProducerImpl(FilesystemProducerImpl):
+    """
+    A filesystem carriage mechanism that appends the documents to rolling segment files instead of writing a file
+    per document, see :py:class:`ebu_tt_live.carriage.archive.SegmentArchive`. The manifest is written as usual
+    but every line ends with the segment, the offset and the length of the document:
+
+    `availability_time,sequenceIdentifier_sequenceNumber.xml,segment,offset,length`
+
+    :py:class:`FilesystemReader` reads such manifests.
+
+    :param dirpath: the output folder
+    :param segment_size: the size in bytes after which a new segment is started
+    :param segment_duration: the age in seconds after which a new segment is started, None to rotate by size only
+    """
+
+    _segment_size = None
+    _segment_duration = None
+
+    def __init__(self, dirpath, segment_size=DEFAULT_SEGMENT_SIZE, segment_duration=None, **kwargs):
+        super(ArchiveProducerImpl, self).__init__(dirpath, **kwargs)
+        # Checks the arguments early
+        SegmentArchive(dirpath, segment_size=segment_size, segment_duration=segment_duration)
+        self._segment_size = segment_size
+        self._segment_duration = segment_duration
+
+    def _create_archive(self, sequence_identifier):
+        return SegmentArchive(
+            self._dirpath, segment_size=self._segment_size, segment_duration=self._segment_duration
+        )
 
 
 class FilesystemConsumerImpl(ConsumerCarriageImpl):
@@ -121,15 +465,14 @@ class FilesystemConsumerImpl(ConsumerCarriageImpl):
     def on_new_data(self, data):
         document = None
         availability_time_str, xml_content = data
+        availability_time = timestr_manifest_to_timedelta(availability_time_str, self._node.reference_clock.time_base)
         try:
-            document = EBUTT3Document.create_from_raw_binding(CreateFromDocument(xml_content))
+            document = EBUTT3Document.create_from_xml(xml_content, availability_time=availability_time)
         except:
             log.exception(ERR_DECODING_XML_FAILED)
             raise XMLParsingFailed(ERR_DECODING_XML_FAILED)
 
         if document:
-            availability_time = timestr_manifest_to_timedelta(availability_time_str, self._node.reference_clock.time_base)
-            document.availability_time = availability_time
             self._node.process_document(document)
 
 
@@ -139,9 +482,20 @@ class FilesystemReader(object):
     availability times and xml file's content to its _custom_consumer. Important note : the
     manifest file and the xml documents have to be in the same folder (it is the default behavior
     of the producer).
+
+    The manifest is read incrementally: :py:meth:`read_available` passes on the lines added since the last call.
+    When tailing, an incomplete last line is kept until the writer finishes it, and the manifest is read again
+    whenever it changes (see :py:class:`ebu_tt_live.twisted.filesystem.ManifestTailer`).
+
+    The reading can start at a sequence number or at an availability time instead of the top of the manifest. The
+    line to start at is found in the index of the manifest. The reader does not write the index, which belongs to
+    the writer of the manifest: the lines the index does not cover yet are indexed in memory.
     """
     _dirpath = None
     _manifest_path = None
+    _manifest_file = None
+    _partial_line = None
+    _segment_reader = None
     _custom_consumer = None
     _manifest_time_format = None
     _do_tail = None
@@ -151,29 +505,116 @@ class FilesystemReader(object):
         self._manifest_path = manifest_path
         self._custom_consumer = custom_consumer
         self._do_tail = do_tail
-        with open(manifest_path, 'r') as manifest:
-            self._manifest_lines_iter = iter(manifest.readlines())
+        self._partial_line = ''
+
+    @property
+    def manifest_path(self):
+        return self._manifest_path
+
+    @property
+    def do_tail(self):
+        return self._do_tail
+
+    def read_available(self):
+        """
+        Pass on the complete lines added to the manifest since the last call.
+        :return: the number of lines read
+        """
+        if self._manifest_file is None:
+            self._manifest_file = open(self._manifest_path, 'r')
+        count = 0
+        while True:
+            manifest_line = self._manifest_file.readline()
+            if not manifest_line:
+                return count
+            if not manifest_line.endswith('\n'):
+                # The writer is in the middle of the line
+                self._partial_line += manifest_line
+                return count
+            manifest_line, self._partial_line = self._partial_line + manifest_line, ''
+            self._read_line(manifest_line)
+            count += 1
+
+    def _seek(self, find_offset):
+        index = ManifestIndex(self._manifest_path, read_only=True)
+        try:
+            index.update()
+            offset = find_offset(index)
+        finally:
+            index.close()
+        if self._manifest_file is None:
+            self._manifest_file = open(self._manifest_path, 'r')
+        if offset is None:
+            # Nothing to read before the next line
+            self._manifest_file.seek(index.indexed_size)
+        else:
+            self._manifest_file.seek(offset)
+        self._partial_line = ''
+
+    def seek_sequence_number(self, sequence_number):
+        """
+        Continue reading at the first document with the sequence number or a higher one.
+        :param sequence_number:
+        """
+        self._seek(lambda index: index.find_sequence_number(sequence_number))
+
+    def seek_availability_time(self, availability_time):
+        """
+        Continue reading at the first document available at the time or later.
+        :param availability_time: timedelta
+        """
+        self._seek(lambda index: index.find_availability_time(availability_time))
+
+    def peek_availability_time(self, time_base):
+        """
+        The availability time of the next document to read, without reading it.
+        :param time_base: the time base of the manifest
+        :return: timedelta or None if there is no document to read
+        """
+        if self._manifest_file is None:
+            self._manifest_file = open(self._manifest_path, 'r')
+        position = self._manifest_file.tell()
+        manifest_line = self._partial_line + self._manifest_file.readline()
+        self._manifest_file.seek(position)
+        if not manifest_line.strip():
+            return None
+        return timestr_manifest_to_timedelta(manifest_line.split(',')[0], time_base)
+
+    def _read_line(self, manifest_line):
+        fields = manifest_line.rstrip().split(',')
+        availability_time_str = fields[0]
+        if len(fields) == 5:
+            # time,filename,segment,offset,length: the document is in a segment of an archive
+            if self._segment_reader is None:
+                self._segment_reader = SegmentReader(self._dirpath)
+            xml_content = self._segment_reader.read(fields[2], int(fields[3]), int(fields[4]))
+        else:
+            xml_file_path = os.path.join(self._dirpath, fields[1])
+            xml_content = None
+            with open(xml_file_path, 'r') as xml_file:
+                xml_content = xml_file.read()
+        data = [availability_time_str, xml_content]
+        self._custom_consumer.on_new_data(data)
 
     def resume_reading(self):
-        with open(self._manifest_path, 'r') as manifest_file:
-            while True:
-                manifest_line = manifest_file.readline()
-                if not manifest_line:
-                    if self._do_tail:
-                        try:
-                            time.sleep(0.5)
-                        except KeyboardInterrupt:
-                            break
-                    else:
-                        break
-                else:
-                    availability_time_str, xml_file_name = manifest_line.rstrip().split(',')
-                    xml_file_path = os.path.join(self._dirpath, xml_file_name)
-                    xml_content = None
-                    with open(xml_file_path, 'r') as xml_file:
-                        xml_content = xml_file.read()
-                    data = [availability_time_str, xml_content]
-                    self._custom_consumer.on_new_data(data)
+        """
+        Read the manifest. Unless tailing, the last line does not need a line ending and the manifest is closed
+        afterwards. When tailing, the manifest stays open for the next :py:meth:`read_available`.
+        """
+        self.read_available()
+        if not self._do_tail:
+            if self._partial_line:
+                manifest_line, self._partial_line = self._partial_line, ''
+                self._read_line(manifest_line)
+            self.close()
+
+    def close(self):
+        if self._manifest_file is not None:
+            self._manifest_file.close()
+            self._manifest_file = None
+        if self._segment_reader is not None:
+            self._segment_reader.close()
+            self._segment_reader = None
 
 
 class SimpleFolderExport(ProducerCarriageImpl):
@@ -194,3 +635,29 @@ class SimpleFolderExport(ProducerCarriageImpl):
         filename = self._file_name_pattern.format(self._counter)
         with open(os.path.join(self._dir_path, filename), 'w') as destfile:
             destfile.write(document.get_xml())
+
+
+class SegmentedFolderExport(ProducerCarriageImpl):
+    """
+    Like :py:class:`SimpleFolderExport` but the documents are appended to rolling segment files. The documents keep
+    their names in the segments, :py:func:`ebu_tt_live.carriage.archive.iter_segment` reads them back.
+    """
+
+    _archive = None
+    _file_name_pattern = None
+    _counter = None
+
+    def __init__(self, dir_path, file_name_pattern, segment_size=DEFAULT_SEGMENT_SIZE, segment_duration=None):
+        if not os.path.exists(dir_path):
+            raise Exception('Directory: {} could not be found.'.format(dir_path))
+        self._archive = SegmentArchive(dir_path, segment_size=segment_size, segment_duration=segment_duration)
+        self._file_name_pattern = file_name_pattern
+        self._counter = 0
+
+    def emit_document(self, document):
+        self._counter += 1
+        self._archive.append(self._file_name_pattern.format(self._counter), document.get_encoded_xml())
+        self._archive.flush()
+
+    def close(self):
+        self._archive.close()
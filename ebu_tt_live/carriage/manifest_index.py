@@ -0,0 +1,256 @@
+"""
+A binary index of a manifest written by :py:class:`ebu_tt_live.carriage.filesystem.FilesystemProducerImpl`.
+
+The index is a file next to the manifest (`manifest_sequenceIdentifier.idx`) made of a header followed by one
+fixed-width record per manifest line: the availability time in milliseconds, the sequence number and the byte offset
+of the line in the manifest. The records have the order of the manifest lines, so a reader finds the line of a
+sequence number or of an availability time with a binary search and seeks the manifest to it.
+
+The manifest stays the reference: the index can be brought up to date or rebuilt from it at any time. Only the
+writer of the manifest writes the index, readers open it read only.
+"""
+
+import os
+import struct
+
+
+MANIFEST_INDEX_MAGIC = b'EBTTMIX\x01'
+
+_record = struct.Struct('<qqQ')
+
+
+def manifest_index_path(manifest_path):
+    """
+    The path of the index of a manifest.
+    :param manifest_path:
+    :return: the manifest path with the .idx extension
+    """
+    return os.path.splitext(manifest_path)[0] + '.idx'
+
+
+def parse_manifest_line(manifest_line):
+    """
+    Read the availability time and the sequence number of a manifest line.
+    :param manifest_line: `availability_time,sequenceIdentifier_sequenceNumber.xml`, followed by the segment, offset
+        and length for archived documents
+    :return: tuple of the availability time in milliseconds and the sequence number
+    :raises ValueError: if the line does not have the expected format
+    """
+    try:
+        fields = manifest_line.rstrip().split(',')
+        if len(fields) not in (2, 5):
+            raise ValueError()
+        availability_time_str, file_name = fields[:2]
+        hours, minutes, rest = availability_time_str.split(':')
+        seconds, fraction = rest.split('.')
+        sequence_number = os.path.splitext(file_name)[0].rsplit('_', 1)[1]
+        return (
+            ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(fraction.ljust(3, '0')[:3]),
+            int(sequence_number)
+        )
+    except (IndexError, ValueError):
+        raise ValueError('Invalid manifest line: {!r}'.format(manifest_line))
+
+
+def _milliseconds(value):
+    return value.days * 86400000 + value.seconds * 1000 + value.microseconds // 1000
+
+
+class ManifestIndex(object):
+    """
+    The index of a manifest. Opening the index creates it if it does not exist; :py:meth:`update` indexes the lines
+    the manifest got since.
+
+    Only the writer of the manifest may write the index. A reader opens it with read_only: the index file is never
+    created, truncated or appended to, the complete records found in it are used and :py:meth:`update` indexes the
+    rest of the manifest in memory.
+
+    The search by availability time expects non-decreasing availability times. This holds for the media time base
+    and for the clock time base as long as the clock does not pass midnight.
+
+    :param manifest_path: the path of the manifest
+    :param index_path: the path of the index, next to the manifest by default
+    :param read_only: leave the index file as it is
+    :raises ValueError: if the index file is not an index
+    """
+
+    _manifest_path = None
+    _index_path = None
+    _index_file = None
+    _read_only = None
+    _count = None
+    _file_count = None
+    _memory_records = None
+    _indexed_size = None
+
+    def __init__(self, manifest_path, index_path=None, read_only=False):
+        self._manifest_path = manifest_path
+        self._index_path = index_path or manifest_index_path(manifest_path)
+        self._read_only = read_only
+        self._memory_records = []
+        if os.path.exists(self._index_path):
+            self._index_file = open(self._index_path, 'rb' if read_only else 'r+b')
+            if self._index_file.read(len(MANIFEST_INDEX_MAGIC)) != MANIFEST_INDEX_MAGIC:
+                self._index_file.close()
+                raise ValueError('Not a manifest index: {}'.format(self._index_path))
+            self._index_file.seek(0, os.SEEK_END)
+            # An incomplete last record is the trace of an interrupted write, or one the writer is writing right now
+            self._file_count = (self._index_file.tell() - len(MANIFEST_INDEX_MAGIC)) // _record.size
+            if not read_only:
+                self._index_file.truncate(len(MANIFEST_INDEX_MAGIC) + self._file_count * _record.size)
+        elif read_only:
+            self._file_count = 0
+        else:
+            self._index_file = open(self._index_path, 'w+b')
+            self._index_file.write(MANIFEST_INDEX_MAGIC)
+            self._file_count = 0
+        self._count = self._file_count
+        self._indexed_size = self._find_indexed_size()
+        if self._indexed_size is None:
+            # The manifest was replaced, the index starts over
+            self._file_count = self._count = 0
+            if not read_only:
+                self._index_file.truncate(len(MANIFEST_INDEX_MAGIC))
+            self._indexed_size = 0
+
+    @classmethod
+    def rebuild(cls, manifest_path, index_path=None):
+        """
+        Throw the index away and index the manifest again.
+        :param manifest_path:
+        :param index_path:
+        :return: ManifestIndex
+        """
+        index_path = index_path or manifest_index_path(manifest_path)
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        index = cls(manifest_path, index_path)
+        index.update()
+        return index
+
+    def _find_indexed_size(self):
+        # The end of the last indexed line in the manifest or None if the line is not the indexed one
+        if not self._count:
+            return 0
+        availability_time, sequence_number, offset = self.record(self._count - 1)
+        with open(self._manifest_path, 'rb') as manifest:
+            manifest.seek(offset)
+            manifest_line = manifest.readline()
+        try:
+            if parse_manifest_line(manifest_line.decode('utf-8')) != (availability_time, sequence_number):
+                return None
+        except ValueError:
+            return None
+        return offset + len(manifest_line)
+
+    @property
+    def index_path(self):
+        return self._index_path
+
+    @property
+    def read_only(self):
+        return self._read_only
+
+    @property
+    def indexed_size(self):
+        """
+        The number of bytes of the manifest that are indexed.
+        """
+        return self._indexed_size
+
+    def __len__(self):
+        return self._count
+
+    def record(self, position):
+        """
+        :param position: the position of the line in the manifest
+        :return: tuple of availability time in milliseconds, sequence number and offset of the line
+        """
+        if not 0 <= position < self._count:
+            raise IndexError(position)
+        if position >= self._file_count:
+            return self._memory_records[position - self._file_count]
+        self._index_file.seek(len(MANIFEST_INDEX_MAGIC) + position * _record.size)
+        return _record.unpack(self._index_file.read(_record.size))
+
+    def _add_records(self, records, indexed_size):
+        if self._read_only:
+            self._memory_records.extend(records)
+        else:
+            self._index_file.seek(0, os.SEEK_END)
+            self._index_file.write(b''.join(_record.pack(*record) for record in records))
+            self._file_count += len(records)
+        self._count += len(records)
+        self._indexed_size = indexed_size
+
+    def append(self, offset, manifest_line):
+        """
+        Index a line appended to the manifest.
+        :param offset: the offset of the line in the manifest
+        :param manifest_line: the line with its line ending
+        """
+        availability_time, sequence_number = parse_manifest_line(manifest_line)
+        self._add_records([(availability_time, sequence_number, offset)], offset + len(manifest_line))
+
+    def update(self):
+        """
+        Index the complete lines added to the manifest since the last indexed one, in memory if read only.
+        :return: the number of lines indexed
+        """
+        records = []
+        offset = self._indexed_size
+        with open(self._manifest_path, 'rb') as manifest:
+            manifest.seek(offset)
+            for manifest_line in manifest:
+                if not manifest_line.endswith(b'\n'):
+                    break
+                availability_time, sequence_number = parse_manifest_line(manifest_line.decode('utf-8'))
+                records.append((availability_time, sequence_number, offset))
+                offset += len(manifest_line)
+        self._add_records(records, offset)
+        self.flush()
+        return len(records)
+
+    def _bisect(self, value, field):
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self.record(middle)[field] < value:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find_sequence_number(self, sequence_number):
+        """
+        Find the line of the first document with the sequence number or a higher one.
+        :param sequence_number:
+        :return: the offset of the line in the manifest or None if there is no such document
+        """
+        position = self._bisect(sequence_number, 1)
+        if position == self._count:
+            return None
+        return self.record(position)[2]
+
+    def find_availability_time(self, availability_time):
+        """
+        Find the line of the first document available at the time or later.
+        :param availability_time: timedelta
+        :return: the offset of the line in the manifest or None if there is no such document
+        """
+        position = self._bisect(_milliseconds(availability_time), 0)
+        if position == self._count:
+            return None
+        return self.record(position)[2]
+
+    def flush(self, fsync=False):
+        if self._read_only or self._index_file is None:
+            return
+        self._index_file.flush()
+        if fsync:
+            os.fsync(self._index_file.fileno())
+
+    def close(self):
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
@@ -0,0 +1,229 @@
+"""
+Offline replay of recorded sequences. The documents listed in manifests are pushed through a consumer node as fast as
+the node can take them while the virtual reference clock of the node follows the availability times of the manifest.
+"""
+
+from .base import ProducerCarriageImpl
+from .archive import SegmentReader
+from .filesystem import timestr_manifest_to_timedelta
+from datetime import timedelta
+import logging
+import mmap
+import os
+import time
+
+
+log = logging.getLogger(__name__)
+
+
+def _map_file(file_path):
+    with open(file_path, 'rb') as mapped_file:
+        if not os.fstat(mapped_file.fileno()).st_size:
+            return None
+        return mmap.mmap(mapped_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def iter_manifest(manifest_path):
+    """
+    Read the documents of a manifest. The manifest and the documents are memory-mapped; archived documents are
+    sliced out of their segments.
+    :param manifest_path:
+    :return: iterator of lists of the availability time string and the document, the data format of
+        :py:class:`ebu_tt_live.carriage.filesystem.FilesystemConsumerImpl`
+    """
+    dirpath = os.path.dirname(manifest_path)
+    manifest = _map_file(manifest_path)
+    if manifest is None:
+        return
+    segment_reader = SegmentReader(dirpath)
+    try:
+        while True:
+            manifest_line = manifest.readline()
+            if not manifest_line:
+                break
+            if not manifest_line.strip():
+                continue
+            fields = manifest_line.decode('utf-8').rstrip().split(',')
+            if len(fields) == 5:
+                xml_content = segment_reader.read(fields[2], int(fields[3]), int(fields[4]))
+            else:
+                document = _map_file(os.path.join(dirpath, fields[1]))
+                if document is None:
+                    xml_content = b''
+                else:
+                    xml_content = document[:]
+                    document.close()
+            yield [fields[0], xml_content]
+    finally:
+        segment_reader.close()
+        manifest.close()
+
+
+def first_availability_time(manifest_path, time_base):
+    """
+    :param manifest_path:
+    :param time_base: the time base of the manifest
+    :return: the availability time of the first document of the manifest or None if it has no document
+    """
+    with open(manifest_path, 'r') as manifest:
+        manifest_line = manifest.readline()
+    if not manifest_line.strip():
+        return None
+    return timestr_manifest_to_timedelta(manifest_line.split(',')[0], time_base)
+
+
+class DiscardingProducerImpl(ProducerCarriageImpl):
+    """
+    Counts the emitted documents and forgets them. Used as the outbound carriage of an encoder when only the
+    throughput matters.
+    """
+
+    _count = 0
+
+    @property
+    def count(self):
+        return self._count
+
+    def emit_document(self, document):
+        self._count += 1
+
+
+class ReplayStatistics(object):
+    """
+    The outcome of a replay.
+    """
+
+    documents = 0
+    failures = 0
+    segments = 0
+    segment_failures = 0
+    elapsed = 0.0
+    simulated_duration = None
+
+    def __init__(self):
+        self.simulated_duration = timedelta()
+
+    @property
+    def documents_per_second(self):
+        if not self.elapsed:
+            return 0.0
+        return self.documents / self.elapsed
+
+    @property
+    def speed(self):
+        """
+        The simulated time passed per second of replay.
+        """
+        if not self.elapsed:
+            return 0.0
+        return self.simulated_duration.total_seconds() / self.elapsed
+
+    def __str__(self):
+        return '{} documents ({} failed), {} segments ({} failed) in {:.3f}s: {:.1f} docs/second, ' \
+            '{:.1f}x real time'.format(
+                self.documents, self.failures, self.segments, self.segment_failures, self.elapsed,
+                self.documents_per_second, self.speed
+            )
+
+
+class ManifestReplay(object):
+    """
+    Pushes recorded documents through a consumer node against a virtual clock. Before a document is passed on, the
+    scheduler is advanced to the availability time of the document: the timers of the node that fall due, like the
+    segmentation of an encoder, run first and the clock of the node shows the availability time. The node must be
+    given the clock of the scheduler as its reference clock, and an encoder must be given :py:meth:`segment_timer`
+    as its segment timer.
+
+    The documents are read from a manifest with :py:meth:`replay`, or from a
+    :py:class:`ebu_tt_live.carriage.filesystem.FilesystemReader` the replay is the custom consumer of.
+
+    A document the node rejects or a segment the encoder fails to convert is counted as a failure and the replay
+    goes on.
+
+    :param consumer_impl: :py:class:`ebu_tt_live.carriage.filesystem.FilesystemConsumerImpl` of the node
+    :param scheduler: :py:class:`ebu_tt_live.clocks.scheduler.VirtualScheduler`
+    """
+
+    _consumer_impl = None
+    _scheduler = None
+    _statistics = None
+    _first_time = None
+    _last_time = None
+
+    def __init__(self, consumer_impl, scheduler):
+        self._consumer_impl = consumer_impl
+        self._scheduler = scheduler
+        self._statistics = ReplayStatistics()
+
+    @property
+    def statistics(self):
+        return self._statistics
+
+    def segment_timer(self, encoder):
+        """
+        Schedule the segmentation of an encoder, see :py:class:`ebu_tt_live.node.consumer.EBUTTDEncoder`.
+        :param encoder:
+        :return: the scheduled call
+        """
+        return self._scheduler.call_every(encoder.segment_length, self._convert_segments, encoder)
+
+    def _convert_segments(self, encoder):
+        # Every segment that ended by now, a late start of the timer is caught up with
+        clock = self._scheduler.clock
+        while encoder.last_segment_end + encoder.segment_length <= clock.get_time():
+            try:
+                encoder.convert_next_segment()
+            except Exception:
+                log.exception('Converting the segment starting at {} failed'.format(encoder.last_segment_end))
+                self._statistics.segment_failures += 1
+                # Move on to the next segment, as a segmentation timer would
+                encoder.increment_last_segment_end(encoder.segment_length)
+            self._statistics.segments += 1
+
+    def _advance_to(self, value):
+        # Documents available earlier than the clock shows, e.g. from a second manifest, come in at the current time
+        if value > self._scheduler.clock.get_time():
+            self._scheduler.advance_to(value)
+
+    def on_new_data(self, data):
+        """
+        Advance the virtual time to the availability time of a document and pass the document on.
+        :param data: list of the availability time string and the document
+        """
+        start = time.time()
+        availability_time = timestr_manifest_to_timedelta(data[0], self._scheduler.clock.time_base)
+        if self._first_time is None:
+            self._first_time = availability_time
+        self._last_time = availability_time
+        self._advance_to(availability_time)
+        try:
+            self._consumer_impl.on_new_data(data)
+        except Exception:
+            log.exception('Replaying the document available at {} failed'.format(data[0]))
+            self._statistics.failures += 1
+        self._statistics.documents += 1
+        self._statistics.simulated_duration = self._last_time - self._first_time
+        self._statistics.elapsed += time.time() - start
+
+    def replay(self, manifest_path):
+        """
+        Replay the documents of a manifest.
+        :param manifest_path:
+        :return: ReplayStatistics of every replay so far
+        """
+        for data in iter_manifest(manifest_path):
+            self.on_new_data(data)
+        return self._statistics
+
+    def finish(self, end_time=None):
+        """
+        Advance the virtual time to the end of the replay.
+        :param end_time: the time to advance to, the last availability time by default
+        :return: ReplayStatistics
+        """
+        end_time = end_time or self._last_time
+        if end_time is not None:
+            start = time.time()
+            self._advance_to(end_time)
+            self._statistics.elapsed += time.time() - start
+        return self._statistics
@@ -0,0 +1,215 @@
+from unittest import TestCase
+from mock import MagicMock, patch
+from datetime import timedelta
+from ebu_tt_live.carriage.archive import SegmentArchive, SegmentReader, iter_segment
+from ebu_tt_live.carriage.filesystem import ArchiveProducerImpl, FilesystemProducerImpl, FilesystemReader, \
+    FilesystemConsumerImpl, SegmentedFolderExport
+from ebu_tt_live.carriage.manifest_index import ManifestIndex
+from ebu_tt_live.documents import EBUTT3Document
+from ebu_tt_live.errors import EndOfData
+import os
+import pytest
+import shutil
+import tempfile
+import time
+
+
+class ArchiveTest(TestCase):
+
+    def setUp(self):
+        self.test_dir_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir_path)
+
+    def _segments(self):
+        return sorted(name for name in os.listdir(self.test_dir_path) if name.endswith('.seg'))
+
+
+class TestSegmentArchive(ArchiveTest):
+
+    def test_rotation_by_size(self):
+        archive = SegmentArchive(self.test_dir_path, segment_size=110)
+        locations = [archive.append('testSeq_{}.xml'.format(index), b'x' * 30) for index in range(1, 7)]
+        archive.close()
+        # A record takes 49 bytes after the 8 bytes of the segment header, two records fit in a segment
+        self.assertEqual(self._segments(), ['testSeq_1.seg', 'testSeq_3.seg', 'testSeq_5.seg'])
+        self.assertEqual(archive.segment_count, 3)
+        self.assertEqual([location[0] for location in locations], [
+            'testSeq_1.seg', 'testSeq_1.seg', 'testSeq_3.seg', 'testSeq_3.seg', 'testSeq_5.seg', 'testSeq_5.seg'
+        ])
+        # A document larger than a segment gets a segment of its own
+        archive = SegmentArchive(self.test_dir_path, segment_size=100)
+        archive.append('big_1.xml', b'x' * 200)
+        archive.append('big_2.xml', b'x')
+        archive.close()
+        self.assertEqual(archive.segment_count, 2)
+
+    def test_rotation_by_time(self):
+        clock = MagicMock(return_value=0)
+        archive = SegmentArchive(self.test_dir_path, segment_duration=10, clock=clock)
+        archive.append('testSeq_1.xml', b'data')
+        clock.return_value = 9.9
+        archive.append('testSeq_2.xml', b'data')
+        clock.return_value = 10
+        archive.append('testSeq_3.xml', b'data')
+        archive.close()
+        self.assertEqual(self._segments(), ['testSeq_1.seg', 'testSeq_3.seg'])
+
+    def test_existing_segment(self):
+        for _ in range(2):
+            archive = SegmentArchive(self.test_dir_path)
+            archive.append('testSeq_1.xml', b'data')
+            archive.close()
+        self.assertEqual(self._segments(), ['testSeq_1-1.seg', 'testSeq_1.seg'])
+
+    def test_invalid_configuration(self):
+        self.assertRaises(ValueError, SegmentArchive, self.test_dir_path, segment_size=10)
+        self.assertRaises(ValueError, SegmentArchive, self.test_dir_path, segment_duration=0)
+
+    def test_iter_segment(self):
+        archive = SegmentArchive(self.test_dir_path)
+        documents = [(u'testSeq_{}.xml'.format(index), 'document {}'.format(index).encode('utf-8'))
+                     for index in range(1, 4)]
+        locations = [archive.append(name, data) for name, data in documents]
+        archive.close()
+        segment_path = os.path.join(self.test_dir_path, 'testSeq_1.seg')
+        records = list(iter_segment(segment_path))
+        self.assertEqual([(name, data) for name, _, data in records], documents)
+        self.assertEqual([offset for _, offset, _ in records], [location[1] for location in locations])
+        # A write was interrupted
+        with open(segment_path, 'rb') as f:
+            content = f.read()
+        with open(segment_path, 'wb') as f:
+            f.write(content[:-3])
+        self.assertEqual(len(list(iter_segment(segment_path))), 2)
+        with open(segment_path, 'wb') as f:
+            f.write(b'something else')
+        self.assertRaises(ValueError, list, iter_segment(segment_path))
+
+    def test_segment_reader(self):
+        archive = SegmentArchive(self.test_dir_path, segment_size=64)
+        first = archive.append('testSeq_1.xml', b'first')
+        archive.flush()
+        reader = SegmentReader(self.test_dir_path, open_segments=1)
+        self.assertEqual(reader.read(*first), b'first')
+        # The segment grew since it was mapped
+        second = archive.append('testSeq_2.xml', b'second')
+        archive.flush()
+        self.assertEqual(second[0], first[0])
+        self.assertEqual(reader.read(*second), b'second')
+        third = archive.append('testSeq_3.xml', b'x' * 40)
+        archive.close()
+        self.assertNotEqual(third[0], first[0])
+        self.assertEqual(reader.read(*third), b'x' * 40)
+        self.assertEqual(reader.read(*first), b'first')
+        self.assertRaises(ValueError, reader.read, first[0], first[1], 1000)
+        reader.close()
+
+
+class TestArchiveCarriage(ArchiveTest):
+
+    def _node(self, time_base='clock'):
+        node = MagicMock()
+        node.reference_clock.get_time.side_effect = lambda: timedelta(seconds=len(self.documents))
+        node.reference_clock.time_base = time_base
+        return node
+
+    def _emit(self, fs_carriage, count, start=1):
+        for sequence_number in range(start, start + count):
+            document = EBUTT3Document('clock', sequence_number, 'testSeq', 'en-GB')
+            self.documents.append(document)
+            fs_carriage.emit_document(document)
+
+    def setUp(self):
+        super(TestArchiveCarriage, self).setUp()
+        self.documents = []
+        self.manifest_path = os.path.join(self.test_dir_path, 'manifest_testSeq.txt')
+
+    def test_replay(self):
+        fs_carriage = ArchiveProducerImpl(self.test_dir_path, segment_size=2048, write_behind=True)
+        fs_carriage.register(self._node())
+        self._emit(fs_carriage, 20)
+        fs_carriage.close()
+        segments = self._segments()
+        self.assertGreater(len(segments), 1)
+        self.assertEqual(sorted(os.listdir(self.test_dir_path)),
+                         sorted(segments + ['manifest_testSeq.txt', 'manifest_testSeq.idx']))
+
+        node = MagicMock()
+        node.reference_clock.time_base = 'clock'
+        fs_consumer_impl = FilesystemConsumerImpl()
+        fs_consumer_impl.register(node)
+        fs_reader = FilesystemReader(self.manifest_path, fs_consumer_impl, False)
+        fs_reader.seek_sequence_number(5)
+        fs_reader.resume_reading()
+        received = [call[0][0] for call in node.process_document.call_args_list]
+        self.assertEqual([document.sequence_number for document in received], list(range(5, 21)))
+        self.assertEqual([document.availability_time for document in received],
+                         [timedelta(seconds=seconds) for seconds in range(5, 21)])
+        self.assertEqual(received[-1].get_xml(), self.documents[-1].get_xml())
+
+    @patch('ebu_tt_live.node.SimpleProducer')
+    def test_resume_producing(self, node):
+        fs_carriage = ArchiveProducerImpl(self.test_dir_path)
+        fs_carriage.register(self._node())
+        self._emit(fs_carriage, 3)
+        fs_carriage.close()
+        node.process_document = MagicMock(side_effect=EndOfData())
+        node.document_sequence.sequence_identifier = 'testSeq'
+        fs_carriage = ArchiveProducerImpl(self.test_dir_path)
+        fs_carriage.register(node)
+        fs_carriage.resume_producing()
+        self.assertEqual(node.document_sequence.last_sequence_number, 3)
+        index = ManifestIndex(self.manifest_path)
+        self.assertEqual(len(index), 3)
+        index.close()
+
+    def test_segmented_folder_export(self):
+        export = SegmentedFolderExport(self.test_dir_path, 'ebuttd-encode-{}.xml', segment_size=1024)
+        for sequence_number in range(1, 4):
+            export.emit_document(EBUTT3Document('clock', sequence_number, 'testSeq', 'en-GB'))
+        export.close()
+        records = []
+        for segment in self._segments():
+            records.extend(iter_segment(os.path.join(self.test_dir_path, segment)))
+        self.assertEqual([name for name, _, _ in records],
+                         ['ebuttd-encode-1.xml', 'ebuttd-encode-2.xml', 'ebuttd-encode-3.xml'])
+
+
+@pytest.mark.benchmark
+class TestArchiveReplayBenchmark(ArchiveTest):
+    """
+    Writes the same documents to a file per document and to segments, then reports the number of files and the
+    time needed to read the documents back through the manifest. The consumer is a mock so only the reading is
+    measured.
+    """
+
+    document_count = 5000
+
+    def _write_and_replay(self, producer_class, **kwargs):
+        dir_path = os.path.join(self.test_dir_path, producer_class.__name__)
+        node = MagicMock()
+        node.reference_clock.get_time.return_value = timedelta()
+        node.reference_clock.time_base = 'clock'
+        fs_carriage = producer_class(dir_path, **kwargs)
+        fs_carriage.register(node)
+        document = EBUTT3Document('clock', 1, 'testSeq', 'en-GB')
+        for sequence_number in range(1, self.document_count + 1):
+            document.sequence_number = sequence_number
+            fs_carriage.emit_document(document)
+        fs_carriage.close()
+        consumer = MagicMock()
+        fs_reader = FilesystemReader(os.path.join(dir_path, 'manifest_testSeq.txt'), consumer, False)
+        start = time.time()
+        fs_reader.resume_reading()
+        elapsed = time.time() - start
+        self.assertEqual(consumer.on_new_data.call_count, self.document_count)
+        return len(os.listdir(dir_path)), elapsed
+
+    def test_benchmark(self):
+        file_count, file_time = self._write_and_replay(FilesystemProducerImpl)
+        segment_count, segment_time = self._write_and_replay(ArchiveProducerImpl)
+        print('{} documents: {} files replayed in {:.1f}ms; {} files with segments replayed in {:.1f}ms'.format(
+            self.document_count, file_count, file_time * 1000, segment_count, segment_time * 1000
+        ))
@@ -1,11 +1,18 @@
 from unittest import TestCase
 from mock import patch, MagicMock
-from ebu_tt_live.carriage.filesystem import FilesystemProducerImpl, FilesystemConsumerImpl, FilesystemReader, timestr_manifest_to_timedelta, timedelta_to_str_manifest
+from ebu_tt_live.carriage.filesystem import FilesystemProducerImpl, FilesystemConsumerImpl, FilesystemReader, timestr_manifest_to_timedelta, timedelta_to_str_manifest, \
+    FilesystemWriter, WriteBehindFilesystemWriter, FSYNC_POLICY_ALWAYS, FSYNC_POLICY_BATCH, \
+    read_last_manifest_line
 from ebu_tt_live.errors import EndOfData, XMLParsingFailed
+from ebu_tt_live.bindings import tt_type
+from ebu_tt_live.documents import EBUTT3Document
 from datetime import timedelta
 import os
+import pytest
 import tempfile
 import shutil
+import time
+import threading
 
 
 class TestFilesystemProducerImpl(TestCase):
@@ -43,9 +50,41 @@ class TestFilesystemProducerImpl(TestCase):
         assert node.process_document.called
         self.assertEqual(node.document_sequence.last_sequence_number, 177)
 
+    @patch('ebu_tt_live.node.SimpleProducer')
+    def test_resume_producing_empty_manifest(self, node):
+        open(os.path.join(self.test_dir_path, "manifest_test_Seq.txt"), 'w').close()
+        fs_carriage = FilesystemProducerImpl(self.test_dir_path)
+        node.process_document = MagicMock(side_effect=EndOfData())
+        node.document_sequence.sequence_identifier = "test_Seq"
+        node.document_sequence.last_sequence_number = 0
+        fs_carriage.register(node)
+        fs_carriage.resume_producing()
+        self.assertEqual(node.document_sequence.last_sequence_number, 0)
+        with open(os.path.join(self.test_dir_path, "manifest_test_Seq.txt"), 'w') as f:
+            f.write("00:00:00.123,test_Seq_41.xml\n00:00:01.123,test_Seq_42.xml\n")
+        fs_carriage.resume_producing()
+        self.assertEqual(node.document_sequence.last_sequence_number, 42)
+
+    def test_read_last_manifest_line(self):
+        manifest_path = os.path.join(self.test_dir_path, "manifest_testSeq.txt")
+        lines = ['00:00:{:02d}.000,testSeq_{}.xml'.format(index % 60, index) for index in range(1, 200)]
+        for content, expected in (
+            ('', None),
+            ('\n', None),
+            (lines[0], lines[0]),
+            (lines[0] + '\n', lines[0]),
+            ('\n'.join(lines) + '\n', lines[-1]),
+            ('\r\n'.join(lines) + '\r\n', lines[-1]),
+            ('\n'.join(lines), lines[-1]),
+        ):
+            with open(manifest_path, 'wb') as f:
+                f.write(content.encode('utf-8'))
+            for block_size in (1, 7, len(lines[-1]), len(lines[-1]) + 1, 4096):
+                self.assertEqual(read_last_manifest_line(manifest_path, block_size=block_size), expected)
+
     def test_emit_document(self):
         document = MagicMock(sequence_identifier="testSeq", sequence_number=1)
-        document.get_xml = MagicMock(return_value="test")
+        document.get_encoded_xml = MagicMock(return_value=b"test")
         node = MagicMock()
         test_time = timedelta(hours=42, minutes=42, seconds=42, milliseconds=67)
         node.reference_clock.get_time.return_value = test_time
@@ -60,6 +99,206 @@ class TestFilesystemProducerImpl(TestCase):
         assert os.path.exists(exported_document_path)
         manifest_path = os.path.join(self.test_dir_path, 'manifest_testSeq.txt')
         assert os.path.exists(manifest_path)
+        with open(manifest_path, 'r') as f:
+            self.assertEqual(f.read(), '42:42:42.067,testSeq_1.xml\n')
+
+    def _producer_node(self):
+        node = MagicMock()
+        node.reference_clock.get_time.return_value = timedelta(seconds=1)
+        node.reference_clock.time_base = "clock"
+        return node
+
+    def test_emit_document_write_behind(self):
+        node = self._producer_node()
+        fs_carriage = FilesystemProducerImpl(self.test_dir_path, write_behind=True, fsync_policy=FSYNC_POLICY_BATCH)
+        fs_carriage.register(node)
+        documents = [
+            EBUTT3Document('clock', sequence_number, 'testSeq', 'en-GB') for sequence_number in range(1, 51)
+        ]
+        for document in documents:
+            fs_carriage.emit_document(document)
+        fs_carriage.close()
+        with open(os.path.join(self.test_dir_path, 'manifest_testSeq.txt'), 'r') as f:
+            self.assertEqual(
+                f.read(),
+                ''.join('00:00:01.000,testSeq_{}.xml\n'.format(document.sequence_number) for document in documents)
+            )
+        with open(os.path.join(self.test_dir_path, 'testSeq_50.xml'), 'rb') as f:
+            self.assertEqual(f.read(), documents[-1].get_encoded_xml())
+
+    def test_invalid_configuration(self):
+        self.assertRaises(ValueError, FilesystemProducerImpl, self.test_dir_path, fsync_policy='sometimes')
+        self.assertRaises(ValueError, FilesystemProducerImpl, self.test_dir_path, queue_size=0)
+
+
+class TestFilesystemWriter(TestCase):
+
+    def setUp(self):
+        self.test_dir_path = tempfile.mkdtemp()
+        self.manifest_path = os.path.join(self.test_dir_path, 'manifest_testSeq.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir_path)
+
+    def _items(self, count):
+        return [
+            (os.path.join(self.test_dir_path, 'testSeq_{}.xml'.format(index)), b'data',
+             '00:00:00.000,testSeq_{}.xml\n'.format(index))
+            for index in range(count)
+        ]
+
+    def _manifest(self):
+        with open(self.manifest_path, 'r') as f:
+            return f.read()
+
+    def test_fsync_policies(self):
+        with patch('os.fsync') as fsync:
+            writer = FilesystemWriter(self.manifest_path)
+            writer.write_batch(self._items(3))
+            writer.close()
+            self.assertEqual(fsync.call_count, 0)
+            writer = FilesystemWriter(self.manifest_path, fsync_policy=FSYNC_POLICY_BATCH)
+            writer.write_batch(self._items(3))
+            writer.close()
+            # Every document and the manifest once
+            self.assertEqual(fsync.call_count, 4)
+            fsync.reset_mock()
+            writer = FilesystemWriter(self.manifest_path, fsync_policy=FSYNC_POLICY_ALWAYS)
+            writer.write_batch(self._items(3))
+            writer.close()
+            self.assertEqual(fsync.call_count, 6)
+        self.assertEqual(self._manifest(), ''.join(item[2] for item in self._items(3)) * 3)
+
+    def test_manifest_line_follows_document(self):
+        writer = WriteBehindFilesystemWriter(self.manifest_path)
+        seen = []
+
+        def check_document(text):
+            # The documents of every line in the manifest are there already
+            for line in text.splitlines():
+                seen.append(os.path.exists(os.path.join(self.test_dir_path, line.split(',')[1])))
+            return original_append(text)
+
+        original_append = writer._append_manifest
+        writer._append_manifest = check_document
+        for item in self._items(20):
+            writer.write(*item)
+        writer.close()
+        self.assertEqual(seen, [True] * 20)
+
+    def test_bounded_queue(self):
+        writer = WriteBehindFilesystemWriter(self.manifest_path, queue_size=2)
+        release = threading.Event()
+        original_write_batch = FilesystemWriter.write_batch
+
+        def slow_write_batch(self, items):
+            release.wait()
+            return original_write_batch(self, items)
+
+        with patch.object(FilesystemWriter, 'write_batch', slow_write_batch):
+            items = self._items(4)
+            # The worker takes the first document and blocks, two more fit in the queue
+            writer.write(*items[0])
+            while writer.queue_depth:
+                time.sleep(0.01)
+            for item in items[1:3]:
+                writer.write(*item)
+            blocked = threading.Thread(target=writer.write, args=items[3])
+            blocked.start()
+            blocked.join(0.2)
+            self.assertTrue(blocked.is_alive())
+            self.assertEqual(writer.queue_depth, 2)
+            release.set()
+            blocked.join()
+            writer.close()
+        self.assertEqual(self._manifest(), ''.join(item[2] for item in items))
+
+    def test_worker_failure(self):
+        writer = WriteBehindFilesystemWriter(self.manifest_path)
+        writer.write(os.path.join(self.test_dir_path, 'missing', 'testSeq_1.xml'), b'data', 'line\n')
+        self.assertRaises(IOError, writer.flush)
+        self.assertRaises(IOError, writer.write, *self._items(1)[0])
+        self.assertRaises(IOError, writer.close)
+        self.assertFalse(os.path.exists(self.manifest_path))
+
+
+@pytest.mark.benchmark
+class TestResumeBenchmark(TestCase):
+    """
+    Reports the time needed to find the last line of a manifest of a few million lines by reading it backwards and
+    by reading every line like the producer used to.
+    """
+
+    line_count = 2000000
+
+    def setUp(self):
+        self.test_dir_path = tempfile.mkdtemp()
+        self.manifest_path = os.path.join(self.test_dir_path, 'manifest_testSeq.txt')
+        with open(self.manifest_path, 'w') as f:
+            for start in range(1, self.line_count + 1, 10000):
+                f.write(''.join(
+                    '00:00:00.000,testSeq_{}.xml\n'.format(index) for index in range(start, start + 10000)
+                ))
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir_path)
+
+    def test_benchmark(self):
+        start = time.time()
+        with open(self.manifest_path, 'r') as f:
+            for last_line in f:
+                pass
+        scan_time = time.time() - start
+        start = time.time()
+        self.assertEqual(read_last_manifest_line(self.manifest_path), last_line.rstrip())
+        seek_time = time.time() - start
+        print('Last line of {} lines: reading every line {:.1f}ms, reading backwards {:.3f}ms'.format(
+            self.line_count, scan_time * 1000, seek_time * 1000
+        ))
+
+
+@pytest.mark.benchmark
+class TestFilesystemProducerLatency(TestCase):
+    """
+    Reports the time emit_document keeps the thread of the producer busy when every document is forced to the disk,
+    with and without the write-behind worker.
+    """
+
+    document_count = 50
+
+    def setUp(self):
+        self.test_dir_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir_path)
+
+    def _emit_time(self, write_behind):
+        node = MagicMock()
+        node.reference_clock.get_time.return_value = timedelta()
+        node.reference_clock.time_base = "clock"
+        fs_carriage = FilesystemProducerImpl(
+            os.path.join(self.test_dir_path, str(write_behind)), write_behind=write_behind,
+            fsync_policy=FSYNC_POLICY_ALWAYS, queue_size=self.document_count
+        )
+        fs_carriage.register(node)
+        documents = [EBUTT3Document('clock', index, 'testSeq', 'en-GB') for index in range(1, self.document_count + 1)]
+        for document in documents:
+            document.get_encoded_xml()
+        slowest = 0
+        start = time.time()
+        for document in documents:
+            emit_start = time.time()
+            fs_carriage.emit_document(document)
+            slowest = max(slowest, time.time() - emit_start)
+        elapsed = time.time() - start
+        fs_carriage.close()
+        return elapsed * 1000 / self.document_count, slowest * 1000
+
+    def test_benchmark(self):
+        sync_mean, sync_max = self._emit_time(write_behind=False)
+        behind_mean, behind_max = self._emit_time(write_behind=True)
+        print('emit_document with fsync: synchronous {:.3f}ms mean, {:.3f}ms max; '
+              'write-behind {:.3f}ms mean, {:.3f}ms max'.format(sync_mean, sync_max, behind_mean, behind_max))
 
 
 class TestFilesystemConsumerImpl(TestCase):
@@ -84,6 +323,7 @@ class TestFilesystemConsumerImpl(TestCase):
     @patch('ebu_tt_live.node.SimpleConsumer')
     def test_on_new_data_raise_XMLParsingFailed(self, node):
         node.process_document = MagicMock(return_value=None)
+        node.reference_clock.time_base = "clock"
         data = ["18:42:42.42", "test"]
         fs_consumer_impl = FilesystemConsumerImpl()
         fs_consumer_impl.register(node)
@@ -113,6 +353,32 @@ class TestFilesystemReader(TestCase):
         fs_carriage_impl.on_new_data.assert_called_once_with(data)
 
 
+    def test_read_available(self):
+        test_dir_path = tempfile.mkdtemp()
+        try:
+            manifest_path = os.path.join(test_dir_path, 'manifest_testSeq.txt')
+            for index in range(1, 4):
+                with open(os.path.join(test_dir_path, 'testSeq_{}.xml'.format(index)), 'w') as f:
+                    f.write('document {}'.format(index))
+            consumer = MagicMock()
+            with open(manifest_path, 'w') as manifest:
+                manifest.write('00:00:01.000,testSeq_1.xml\n00:00:02.000,test')
+                manifest.flush()
+                fs_reader = FilesystemReader(manifest_path, consumer, True)
+                fs_reader.resume_reading()
+                consumer.on_new_data.assert_called_once_with(['00:00:01.000', 'document 1'])
+                # The rest of the line and a new one
+                manifest.write('Seq_2.xml\n00:00:03.000,testSeq_3.xml\n')
+                manifest.flush()
+                self.assertEqual(fs_reader.read_available(), 2)
+                self.assertEqual(fs_reader.read_available(), 0)
+            fs_reader.close()
+            self.assertEqual(consumer.on_new_data.call_args_list[1][0][0], ['00:00:02.000', 'document 2'])
+            self.assertEqual(consumer.on_new_data.call_args_list[2][0][0], ['00:00:03.000', 'document 3'])
+        finally:
+            shutil.rmtree(test_dir_path)
+
+
 class TestManifestTimedeltaConversion(TestCase):
 
     def test_timedelta_to_str_manifest(self):
@@ -130,3 +396,58 @@ class TestManifestTimedeltaConversion(TestCase):
         test_timedelta = timestr_manifest_to_timedelta(test_time_str, 'media')
         self.assertEqual(test_timedelta, expected_timedelta)
         self.assertRaises(ValueError, lambda: timestr_manifest_to_timedelta(test_time_str, 'test'))
+        self.assertEqual(timestr_manifest_to_timedelta('12:11:57.5', 'clock'),
+                         timedelta(hours=12, minutes=11, seconds=57, milliseconds=500))
+
+
+class TestIngestThroughput(TestCase):
+    """
+    Replays the example sequences through the consumer carriage. Every document must be parsed and semantically
+    validated exactly once. The benchmark reports the ingest rate.
+    """
+
+    example_sequences_dir_path = os.path.join(
+        os.path.dirname(__file__), '..', '..', '..', 'testing', 'example-sequences'
+    )
+
+    def _manifest_paths(self):
+        for dir_name in sorted(os.listdir(self.example_sequences_dir_path)):
+            dir_path = os.path.join(self.example_sequences_dir_path, dir_name)
+            for file_name in os.listdir(dir_path):
+                if file_name.startswith('manifest_'):
+                    yield os.path.join(dir_path, file_name)
+
+    def _ingest(self, node):
+        node.reference_clock.time_base = 'clock'
+        fs_consumer_impl = FilesystemConsumerImpl()
+        fs_consumer_impl.register(node)
+        document_count = 0
+        elapsed = 0
+        for manifest_path in self._manifest_paths():
+            node.process_document.reset_mock()
+            fs_reader = FilesystemReader(manifest_path, fs_consumer_impl, False)
+            start = time.time()
+            fs_reader.resume_reading()
+            elapsed += time.time() - start
+            document_count += node.process_document.call_count
+            with open(manifest_path, 'r') as manifest:
+                self.assertEqual(node.process_document.call_count, len(manifest.readlines()))
+        self.assertGreater(document_count, 0)
+        return document_count, elapsed
+
+    @patch('ebu_tt_live.node.SimpleConsumer')
+    def test_ingest_example_sequences(self, node):
+        with patch.object(tt_type, 'validateBinding', autospec=True, side_effect=tt_type.validateBinding) as \
+                validate_binding, \
+                patch.object(tt_type, 'recompute_timing', autospec=True, side_effect=tt_type.recompute_timing) as \
+                recompute_timing:
+            document_count, _ = self._ingest(node)
+
+        self.assertEqual(validate_binding.call_count, document_count)
+        self.assertEqual(recompute_timing.call_count, 0)
+
+    @pytest.mark.benchmark
+    @patch('ebu_tt_live.node.SimpleConsumer')
+    def test_benchmark(self, node):
+        document_count, elapsed = self._ingest(node)
+        print('Ingested {} documents at {:.1f} docs/second'.format(document_count, document_count / elapsed))
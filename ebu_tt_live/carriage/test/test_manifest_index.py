@@ -0,0 +1,261 @@
+from unittest import TestCase
+from mock import MagicMock
+from datetime import timedelta
+from ebu_tt_live.carriage.manifest_index import ManifestIndex, manifest_index_path, parse_manifest_line
+from ebu_tt_live.carriage.filesystem import FilesystemWriter, FilesystemReader, FilesystemProducerImpl
+from ebu_tt_live.documents import EBUTT3Document
+import os
+import pytest
+import shutil
+import tempfile
+import time
+
+
+def _manifest_line(sequence_number):
+    # One document every half second
+    seconds, half = divmod(sequence_number, 2)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return '{:02d}:{:02d}:{:02d}.{:03d},testSeq_{}.xml\n'.format(hours, minutes, seconds, half * 500, sequence_number)
+
+
+class ManifestTest(TestCase):
+
+    def setUp(self):
+        self.test_dir_path = tempfile.mkdtemp()
+        self.manifest_path = os.path.join(self.test_dir_path, 'manifest_testSeq.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir_path)
+
+    def _write_manifest(self, sequence_numbers, mode='w'):
+        with open(self.manifest_path, mode) as f:
+            f.write(''.join(_manifest_line(sequence_number) for sequence_number in sequence_numbers))
+
+
+class TestManifestIndex(ManifestTest):
+
+    def test_parse_manifest_line(self):
+        self.assertEqual(parse_manifest_line('01:02:03.045,test_Seq_42.xml\n'), (3723045, 42))
+        self.assertRaises(ValueError, parse_manifest_line, '01:02:03.045\n')
+        self.assertRaises(ValueError, parse_manifest_line, '01:02:03.045,test.xml\n')
+
+    def test_find(self):
+        self._write_manifest(range(1, 101, 2))
+        index = ManifestIndex.rebuild(self.manifest_path)
+        self.assertEqual(index.index_path, manifest_index_path(self.manifest_path))
+        self.assertEqual(len(index), 50)
+        with open(self.manifest_path, 'r') as manifest:
+            lines = manifest.readlines()
+        offset_of = dict((parse_manifest_line(line)[1], sum(len(l) for l in lines[:i])) for i, line in enumerate(lines))
+        self.assertEqual(index.find_sequence_number(1), 0)
+        self.assertEqual(index.find_sequence_number(0), 0)
+        self.assertEqual(index.find_sequence_number(51), offset_of[51])
+        self.assertEqual(index.find_sequence_number(52), offset_of[53])
+        self.assertIsNone(index.find_sequence_number(100))
+        # Document 51 is available at 25.5 seconds
+        self.assertEqual(index.find_availability_time(timedelta(seconds=25.5)), offset_of[51])
+        self.assertEqual(index.find_availability_time(timedelta(seconds=25.6)), offset_of[53])
+        self.assertIsNone(index.find_availability_time(timedelta(hours=1)))
+        index.close()
+
+    def test_update(self):
+        self._write_manifest(range(1, 11))
+        index = ManifestIndex(self.manifest_path)
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.update(), 10)
+        index.close()
+        # The last line is not complete yet
+        self._write_manifest(range(11, 21), mode='a')
+        with open(self.manifest_path, 'a') as f:
+            f.write('00:00:10.500,test')
+        index = ManifestIndex(self.manifest_path)
+        self.assertEqual(len(index), 10)
+        self.assertEqual(index.update(), 10)
+        self.assertEqual(index.update(), 0)
+        self.assertEqual(index.record(19)[1], 20)
+        index.close()
+
+    def test_damaged_index(self):
+        self._write_manifest(range(1, 11))
+        ManifestIndex.rebuild(self.manifest_path).close()
+        index_path = manifest_index_path(self.manifest_path)
+        # An interrupted write leaves part of a record
+        with open(index_path, 'ab') as f:
+            f.write(b'\x01\x02')
+        index = ManifestIndex(self.manifest_path)
+        self.assertEqual(len(index), 10)
+        index.close()
+        # The manifest is replaced by another one
+        self._write_manifest(range(5, 8))
+        index = ManifestIndex(self.manifest_path)
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.update(), 3)
+        index.close()
+        with open(index_path, 'wb') as f:
+            f.write(b'something else')
+        self.assertRaises(ValueError, ManifestIndex, self.manifest_path)
+
+    def test_read_only(self):
+        self._write_manifest(range(1, 11))
+        index_path = manifest_index_path(self.manifest_path)
+        index = ManifestIndex(self.manifest_path, read_only=True)
+        self.assertEqual(index.update(), 10)
+        self.assertEqual(index.find_sequence_number(10), index.record(9)[2])
+        index.close()
+        self.assertFalse(os.path.exists(index_path))
+        ManifestIndex.rebuild(self.manifest_path).close()
+        # The writer is in the middle of a record of a line it appended
+        self._write_manifest(range(11, 13), mode='a')
+        with open(index_path, 'ab') as f:
+            f.write(b'\x01\x02')
+        with open(index_path, 'rb') as f:
+            index_data = f.read()
+        index = ManifestIndex(self.manifest_path, read_only=True)
+        self.assertEqual(len(index), 10)
+        self.assertEqual(index.update(), 2)
+        self.assertEqual(index.record(11)[1], 12)
+        index.close()
+        with open(index_path, 'rb') as f:
+            self.assertEqual(f.read(), index_data)
+
+    def test_built_on_write(self):
+        self._write_manifest(range(1, 6))
+        writer = FilesystemWriter(self.manifest_path, build_index=True)
+        writer.write_batch([
+            (os.path.join(self.test_dir_path, 'testSeq_{}.xml'.format(sequence_number)), b'data',
+             _manifest_line(sequence_number))
+            for sequence_number in range(6, 11)
+        ])
+        writer.write(os.path.join(self.test_dir_path, 'testSeq_11.xml'), b'data', _manifest_line(11))
+        writer.close()
+        index = ManifestIndex(self.manifest_path)
+        written = [index.record(position) for position in range(len(index))]
+        index.close()
+        index = ManifestIndex.rebuild(self.manifest_path)
+        self.assertEqual(written, [index.record(position) for position in range(len(index))])
+        self.assertEqual(len(written), 11)
+        index.close()
+
+    def test_producer(self):
+        node = MagicMock()
+        node.reference_clock.get_time.return_value = timedelta(seconds=1)
+        node.reference_clock.time_base = 'clock'
+        fs_carriage = FilesystemProducerImpl(self.test_dir_path)
+        fs_carriage.register(node)
+        fs_carriage.emit_document(EBUTT3Document('clock', 1, 'testSeq', 'en-GB'))
+        fs_carriage.close()
+        index = ManifestIndex(self.manifest_path)
+        self.assertEqual(index.record(0), (1000, 1, 0))
+        index.close()
+
+
+class TestFilesystemReaderSeek(ManifestTest):
+
+    def setUp(self):
+        super(TestFilesystemReaderSeek, self).setUp()
+        self._write_manifest(range(1, 21))
+        for sequence_number in range(1, 21):
+            with open(os.path.join(self.test_dir_path, 'testSeq_{}.xml'.format(sequence_number)), 'w') as f:
+                f.write('document {}'.format(sequence_number))
+        self.consumer = MagicMock()
+
+    def _read(self):
+        return [call[0][0][1] for call in self.consumer.on_new_data.call_args_list]
+
+    def test_seek_sequence_number(self):
+        fs_reader = FilesystemReader(self.manifest_path, self.consumer, False)
+        fs_reader.seek_sequence_number(18)
+        fs_reader.resume_reading()
+        self.assertEqual(self._read(), ['document 18', 'document 19', 'document 20'])
+        # The reader leaves the index to the writer
+        self.assertFalse(os.path.exists(manifest_index_path(self.manifest_path)))
+
+    def test_seek_availability_time(self):
+        fs_reader = FilesystemReader(self.manifest_path, self.consumer, False)
+        fs_reader.seek_availability_time(timedelta(seconds=9.2))
+        fs_reader.resume_reading()
+        self.assertEqual(self._read(), ['document 19', 'document 20'])
+
+    def test_shared_with_writer(self):
+        for sequence_number in [21, 22]:
+            with open(os.path.join(self.test_dir_path, 'testSeq_{}.xml'.format(sequence_number)), 'w') as f:
+                f.write('document {}'.format(sequence_number))
+        writer = FilesystemWriter(self.manifest_path, build_index=True)
+        writer.write(os.path.join(self.test_dir_path, 'testSeq_21.xml'), b'document 21', _manifest_line(21))
+        index_path = manifest_index_path(self.manifest_path)
+        fs_reader = FilesystemReader(self.manifest_path, self.consumer, False)
+        index_append = writer._index.append
+        index_data = []
+
+        def append_after_seek(offset, manifest_line):
+            # A reader seeks after the writer appended the manifest line and before it indexed it
+            with open(index_path, 'rb') as f:
+                index_data.append(f.read())
+            fs_reader.seek_sequence_number(21)
+            with open(index_path, 'rb') as f:
+                index_data.append(f.read())
+            index_append(offset, manifest_line)
+
+        writer._index.append = append_after_seek
+        writer.write(os.path.join(self.test_dir_path, 'testSeq_22.xml'), b'document 22', _manifest_line(22))
+        writer.close()
+        fs_reader.resume_reading()
+        self.assertEqual(self._read(), ['document 21', 'document 22'])
+        # The reader did not touch the index
+        self.assertEqual(index_data[0], index_data[1])
+        index = ManifestIndex(self.manifest_path)
+        written = [index.record(position) for position in range(len(index))]
+        index.close()
+        index = ManifestIndex.rebuild(self.manifest_path)
+        self.assertEqual(written, [index.record(position) for position in range(len(index))])
+        self.assertEqual(len(written), 22)
+        index.close()
+
+    def test_seek_end_and_tail(self):
+        fs_reader = FilesystemReader(self.manifest_path, self.consumer, True)
+        fs_reader.seek_sequence_number(100)
+        fs_reader.resume_reading()
+        self.assertEqual(self._read(), [])
+        with open(os.path.join(self.test_dir_path, 'testSeq_21.xml'), 'w') as f:
+            f.write('document 21')
+        self._write_manifest([21], mode='a')
+        fs_reader.read_available()
+        fs_reader.close()
+        self.assertEqual(self._read(), ['document 21'])
+
+
+@pytest.mark.benchmark
+class TestSeekBenchmark(ManifestTest):
+    """
+    Reports the time needed to index a long manifest and the time needed to find a line near its end with the index
+    and by reading the manifest from the top.
+    """
+
+    line_count = 500000
+
+    def test_benchmark(self):
+        with open(self.manifest_path, 'w') as f:
+            for start in range(1, self.line_count + 1, 10000):
+                f.write(''.join(_manifest_line(sequence_number) for sequence_number in range(start, start + 10000)))
+        start = time.time()
+        ManifestIndex.rebuild(self.manifest_path).close()
+        rebuild_time = time.time() - start
+        target = self.line_count - 10
+        start = time.time()
+        index = ManifestIndex(self.manifest_path)
+        offset = index.find_sequence_number(target)
+        index.close()
+        seek_time = time.time() - start
+        start = time.time()
+        with open(self.manifest_path, 'r') as f:
+            scan_offset = 0
+            for line in f:
+                if parse_manifest_line(line)[1] >= target:
+                    break
+                scan_offset += len(line)
+        scan_time = time.time() - start
+        self.assertEqual(offset, scan_offset)
+        print('{} lines: indexing {:.1f}ms, seeking with the index {:.3f}ms, reading from the top {:.1f}ms'.format(
+            self.line_count, rebuild_time * 1000, seek_time * 1000, scan_time * 1000
+        ))
@@ -0,0 +1,255 @@
+from unittest import TestCase
+from mock import MagicMock
+from datetime import timedelta
+from ebu_tt_live.carriage.filesystem import FilesystemProducerImpl, ArchiveProducerImpl, FilesystemConsumerImpl, \
+    FilesystemReader
+from ebu_tt_live.carriage.replay import iter_manifest, first_availability_time, ManifestReplay, \
+    DiscardingProducerImpl
+from ebu_tt_live.clocks.virtual import VirtualClock
+from ebu_tt_live.clocks.scheduler import VirtualScheduler
+from ebu_tt_live.documents import EBUTT3Document
+from ebu_tt_live.node import SimpleConsumer, EBUTTDEncoder
+import os
+import pytest
+import shutil
+import tempfile
+import time
+
+
+example_sequences_path = os.path.join(
+    os.path.dirname(__file__), '..', '..', '..', 'testing', 'example-sequences'
+)
+
+document_template = '''<?xml version="1.0" ?>
+<tt:tt ebuttp:sequenceIdentifier="testSeq" ebuttp:sequenceNumber="{sequence_number}" ttp:clockMode="local"
+    ttp:timeBase="clock" xml:lang="en-GB" xmlns:ebuttm="urn:ebu:tt:metadata" xmlns:ebuttp="urn:ebu:tt:parameters"
+    xmlns:tt="http://www.w3.org/ns/ttml" xmlns:ttp="http://www.w3.org/ns/ttml#parameter"
+    xmlns:tts="http://www.w3.org/ns/ttml#styling" xmlns:xml="http://www.w3.org/XML/1998/namespace">
+  <tt:head>
+    <tt:metadata>
+      <ebuttm:documentMetadata/>
+    </tt:metadata>
+    <tt:styling>
+      <tt:style xml:id="S1" tts:color="white"/>
+    </tt:styling>
+  </tt:head>
+  <tt:body begin="10:00:{sequence_number:02d}"{duration}>
+    <tt:div>
+      <tt:p xml:id="ID{sequence_number}" style="S1">Subtitle number <tt:span>{sequence_number}</tt:span></tt:p>
+    </tt:div>
+  </tt:body>
+</tt:tt>'''
+
+
+class ReplayTest(TestCase):
+
+    def setUp(self):
+        self.test_dir_path = tempfile.mkdtemp()
+        self.manifest_path = os.path.join(self.test_dir_path, 'manifest_testSeq.txt')
+        self.documents = []
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir_path)
+
+    def _record(self, count, producer_class=FilesystemProducerImpl, **kwargs):
+        # The documents become available a second apart, starting at 10:00:01
+        node = MagicMock()
+        node.reference_clock.get_time.side_effect = lambda: timedelta(hours=10, seconds=len(self.documents))
+        node.reference_clock.time_base = 'clock'
+        fs_carriage = producer_class(self.test_dir_path, **kwargs)
+        fs_carriage.register(node)
+        for sequence_number in range(1, count + 1):
+            document = EBUTT3Document('clock', sequence_number, 'testSeq', 'en-GB')
+            self.documents.append(document)
+            fs_carriage.emit_document(document)
+        fs_carriage.close()
+
+    def _record_subtitles(self, count, duration=' dur="00:00:01"'):
+        # Every document shows a subtitle from its availability time, for a second by default
+        with open(self.manifest_path, 'w') as manifest:
+            for sequence_number in range(1, count + 1):
+                file_name = 'testSeq_{}.xml'.format(sequence_number)
+                with open(os.path.join(self.test_dir_path, file_name), 'w') as f:
+                    f.write(document_template.format(sequence_number=sequence_number, duration=duration))
+                manifest.write('10:00:{:02d}.000,{}\n'.format(sequence_number, file_name))
+
+    def _replay(self, manifest_path=None):
+        # A replay against a virtual clock starting at the first document of the manifest
+        reference_clock = VirtualClock(start_time=first_availability_time(manifest_path or self.manifest_path, 'clock'))
+        consumer_impl = FilesystemConsumerImpl()
+        return consumer_impl, ManifestReplay(consumer_impl, VirtualScheduler(reference_clock)), reference_clock
+
+    def _consumer(self, manifest_path=None):
+        consumer_impl, replay, reference_clock = self._replay(manifest_path)
+        node = SimpleConsumer(node_id='replay-consumer', carriage_impl=consumer_impl, reference_clock=reference_clock)
+        return node, replay
+
+    def _encoder(self, outbound_carriage, manifest_path=None):
+        consumer_impl, replay, reference_clock = self._replay(manifest_path)
+        node = EBUTTDEncoder(
+            node_id='replay-encoder',
+            carriage_impl=consumer_impl,
+            outbound_carriage_impl=outbound_carriage,
+            reference_clock=reference_clock,
+            segment_length=1.0,
+            media_time_zero=reference_clock.get_time(),
+            segment_timer=replay.segment_timer,
+            discard=False
+        )
+        return node, replay
+
+
+class TestIterManifest(ReplayTest):
+
+    def _assert_recording(self):
+        data = list(iter_manifest(self.manifest_path))
+        self.assertEqual([time_str for time_str, _ in data],
+                         ['10:00:0{}.000'.format(seconds) for seconds in range(1, 6)])
+        self.assertEqual([xml for _, xml in data], [document.get_encoded_xml() for document in self.documents])
+
+    def test_files(self):
+        self._record(5)
+        self._assert_recording()
+
+    def test_segments(self):
+        self._record(5, ArchiveProducerImpl, segment_size=2048)
+        self._assert_recording()
+
+    def test_empty_manifest(self):
+        open(self.manifest_path, 'w').close()
+        self.assertEqual(list(iter_manifest(self.manifest_path)), [])
+        self.assertIsNone(first_availability_time(self.manifest_path, 'clock'))
+
+    def test_first_availability_time(self):
+        self._record(3)
+        self.assertEqual(first_availability_time(self.manifest_path, 'clock'), timedelta(hours=10, seconds=1))
+
+
+class TestManifestReplay(ReplayTest):
+
+    def test_simple_consumer(self):
+        self._record(5)
+        node, replay = self._consumer()
+        availability_times = []
+        process_document = node.process_document
+
+        def record_time(document):
+            availability_times.append(node.reference_clock.get_time())
+            process_document(document)
+        node.process_document = record_time
+
+        statistics = replay.replay(self.manifest_path)
+        # The clock of the node showed the availability time of every document
+        self.assertEqual(availability_times, [timedelta(hours=10, seconds=seconds) for seconds in range(1, 6)])
+        # The sequence kept the virtual clock of the node
+        self.assertIsInstance(node.reference_clock, VirtualClock)
+        self.assertEqual(node.reference_clock.get_time(), timedelta(hours=10, seconds=5))
+        self.assertEqual(statistics.documents, 5)
+        self.assertEqual(statistics.failures, 0)
+        self.assertEqual(statistics.segments, 0)
+        self.assertEqual(statistics.simulated_duration, timedelta(seconds=4))
+        self.assertEqual(replay.finish().segments, 0)
+
+    def test_encoder(self):
+        self._record_subtitles(5)
+        outbound_carriage = DiscardingProducerImpl()
+        node, replay = self._encoder(outbound_carriage)
+        statistics = replay.replay(self.manifest_path)
+        # The segments ending before the last availability time were converted as the documents arrived
+        self.assertEqual(statistics.segments, 4)
+        self.assertEqual(outbound_carriage.count, 4)
+        statistics = replay.finish(timedelta(hours=10, seconds=11))
+        self.assertEqual(statistics.segments, 10)
+        self.assertEqual(statistics.segment_failures, 0)
+        self.assertEqual(outbound_carriage.count, 10)
+        self.assertEqual(node.last_segment_end, timedelta(hours=10, seconds=11))
+
+    def test_encoder_open_ended(self):
+        # The subtitles stay until the next document replaces them
+        self._record_subtitles(3, duration='')
+        outbound_carriage = DiscardingProducerImpl()
+        node, replay = self._encoder(outbound_carriage)
+        replay.replay(self.manifest_path)
+        statistics = replay.finish(timedelta(hours=10, seconds=5))
+        self.assertEqual(statistics.segments, 4)
+        self.assertEqual(statistics.segment_failures, 0)
+        self.assertEqual(outbound_carriage.count, 4)
+
+    def test_deterministic_output(self):
+        self._record_subtitles(5)
+        outputs = []
+        for _ in range(2):
+            outbound_carriage = MagicMock()
+            node, replay = self._encoder(outbound_carriage)
+            replay.replay(self.manifest_path)
+            replay.finish(timedelta(hours=10, seconds=7))
+            outputs.append([call[0][0].get_xml() for call in outbound_carriage.emit_document.call_args_list])
+        self.assertEqual(len(outputs[0]), 6)
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_filesystem_reader(self):
+        self._record_subtitles(5)
+        outbound_carriage = DiscardingProducerImpl()
+        node, replay = self._encoder(outbound_carriage)
+        fs_reader = FilesystemReader(self.manifest_path, replay, False)
+        self.assertEqual(fs_reader.peek_availability_time('clock'), timedelta(hours=10, seconds=1))
+        fs_reader.resume_reading()
+        self.assertEqual(replay.statistics.documents, 5)
+        self.assertEqual(replay.finish().segments, 4)
+
+    def test_failures(self):
+        self._record(3)
+        with open(os.path.join(self.test_dir_path, 'testSeq_2.xml'), 'w') as f:
+            f.write('<broken')
+        node, replay = self._consumer()
+        statistics = replay.replay(self.manifest_path)
+        self.assertEqual(statistics.documents, 3)
+        self.assertEqual(statistics.failures, 1)
+        self.assertEqual(node.reference_clock.get_time(), timedelta(hours=10, seconds=3))
+
+    def test_segment_failures(self):
+        self._record_subtitles(3)
+        node, replay = self._encoder(DiscardingProducerImpl())
+        node.get_segment = MagicMock(side_effect=ValueError())
+        replay.replay(self.manifest_path)
+        statistics = replay.finish()
+        self.assertEqual(statistics.segments, 2)
+        self.assertEqual(statistics.segment_failures, 2)
+        self.assertEqual(node.last_segment_end, timedelta(hours=10, seconds=3))
+
+
+@pytest.mark.benchmark
+class TestReplayBenchmark(ReplayTest):
+    """
+    Reports the throughput of a replay through a simple consumer, compared with reading the same manifest with
+    :py:class:`ebu_tt_live.carriage.filesystem.FilesystemReader`, and of a replay of the example sequences through
+    an encoder.
+    """
+
+    document_count = 500
+
+    def test_benchmark(self):
+        self._record(self.document_count)
+        node, replay = self._consumer()
+        statistics = replay.replay(self.manifest_path)
+        self.assertEqual(statistics.failures, 0)
+
+        consumer_impl, _, reference_clock = self._replay()
+        SimpleConsumer(node_id='reader-consumer', carriage_impl=consumer_impl, reference_clock=reference_clock)
+        fs_reader = FilesystemReader(self.manifest_path, consumer_impl, False)
+        start = time.time()
+        fs_reader.resume_reading()
+        reader_time = time.time() - start
+        fs_reader.close()
+        print('{} documents: replay {}; FilesystemReader {:.1f} docs/second'.format(
+            self.document_count, statistics, self.document_count / reader_time
+        ))
+
+        for sequence_name in sorted(os.listdir(example_sequences_path)):
+            sequence_path = os.path.join(example_sequences_path, sequence_name)
+            manifest_path = os.path.join(
+                sequence_path, [name for name in os.listdir(sequence_path) if name.startswith('manifest_')][0]
+            )
+            node, replay = self._encoder(DiscardingProducerImpl(), manifest_path)
+            replay.replay(manifest_path)
+            print('{}: {}'.format(sequence_name, replay.finish()))
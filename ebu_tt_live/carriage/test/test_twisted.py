@@ -0,0 +1,62 @@
+from unittest import TestCase
+from datetime import timedelta
+from mock import MagicMock
+from ebu_tt_live.carriage.twisted import TwistedConsumerImpl, TwistedProducerImpl
+from ebu_tt_live.documents import EBUTT3Document, RelayedDocument
+from ebu_tt_live.errors import XMLParsingFailed
+
+
+class TestTwistedCarriageImpl(TestCase):
+
+    def setUp(self):
+        self.document = EBUTT3Document(
+            time_base='clock',
+            lang='en-GB',
+            sequence_identifier='TestSequence1',
+            sequence_number=1
+        )
+        self.node = MagicMock()
+        self.node.pass_through = False
+        self.node.reference_clock.get_time.return_value = timedelta(seconds=5)
+
+    def _received_document(self, data):
+        consumer_impl = TwistedConsumerImpl()
+        consumer_impl.register(self.node)
+        consumer_impl.on_new_data(data)
+        document = self.node.process_document.call_args[0][0]
+        self.assertEqual(document.sequence_identifier, 'TestSequence1')
+        self.assertEqual(document.availability_time, timedelta(seconds=5))
+        return document
+
+    def test_on_new_data_xml(self):
+        self._received_document(self.document.get_encoded_xml())
+
+    def test_on_new_data_compact(self):
+        payload = self.document.get_compact()
+        document = self._received_document(payload)
+        self.assertIs(document.get_compact(), payload)
+
+    def test_on_new_data_invalid(self):
+        consumer_impl = TwistedConsumerImpl()
+        consumer_impl.register(self.node)
+        self.assertRaises(XMLParsingFailed, consumer_impl.on_new_data, self.document.get_compact()[:-1])
+
+    def test_emit_document(self):
+        producer_impl = TwistedProducerImpl()
+        twisted_producer = MagicMock()
+        producer_impl.register_twisted_producer(twisted_producer)
+        producer_impl.emit_document(self.document)
+        twisted_producer.emit_data.assert_called_once_with('TestSequence1', self.document)
+
+    def test_on_new_data_pass_through(self):
+        self.node.pass_through = True
+        payload = self.document.get_encoded_xml()
+        document = self._received_document(payload)
+        self.assertIsInstance(document, RelayedDocument)
+        self.assertIs(document.payload, payload)
+
+    def test_on_new_data_pass_through_invalid(self):
+        self.node.pass_through = True
+        consumer_impl = TwistedConsumerImpl()
+        consumer_impl.register(self.node)
+        self.assertRaises(XMLParsingFailed, consumer_impl.on_new_data, b'<tt:tt/>')
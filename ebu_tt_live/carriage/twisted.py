@@ -1,9 +1,9 @@
 
 from .base import ProducerCarriageImpl, ConsumerCarriageImpl
-from ebu_tt_live.bindings import CreateFromDocument
-from ebu_tt_live.strings import ERR_DECODING_XML_FAILED
+from ebu_tt_live.strings import ERR_DECODING_XML_FAILED, ERR_DOCUMENT_HEADER_SNIFFING_FAILED
 from ebu_tt_live.errors import XMLParsingFailed
-from ebu_tt_live.documents import EBUTT3Document
+from ebu_tt_live.documents import EBUTT3Document, RelayedDocument
+from ebu_tt_live.bindings.compact import is_compact
 import logging
 
 
@@ -22,19 +22,34 @@ class TwistedProducerImpl(ProducerCarriageImpl):
         self._node.process_document(document=None)
 
     def emit_document(self, document):
-        self._twisted_producer.emit_data(document.sequence_identifier, document.get_xml())
+        # The websocket layer picks the encoding of every subscriber. The encoded payloads are cached by the document
+        # so they are shared by every subscriber.
+        self._twisted_producer.emit_data(document.sequence_identifier, document)
 
 
 class TwistedConsumerImpl(ConsumerCarriageImpl):
 
     def on_new_data(self, data):
         document = None
+        availability_time = self._node.reference_clock.get_time()
+        if self._node.pass_through:
+            # Only the header is read to route the document
+            try:
+                document = RelayedDocument.create_from_raw_data(data, availability_time=availability_time)
+            except ValueError:
+                log.exception(ERR_DOCUMENT_HEADER_SNIFFING_FAILED)
+                raise XMLParsingFailed(ERR_DOCUMENT_HEADER_SNIFFING_FAILED)
+            self._node.process_document(document)
+            return
+
         try:
-            document = EBUTT3Document.create_from_raw_binding(CreateFromDocument(data))
+            if is_compact(data):
+                document = EBUTT3Document.create_from_compact(data, availability_time=availability_time)
+            else:
+                document = EBUTT3Document.create_from_xml(data, availability_time=availability_time)
         except:
             log.exception(ERR_DECODING_XML_FAILED)
             raise XMLParsingFailed(ERR_DECODING_XML_FAILED)
 
         if document:
-            document.availability_time = self._node.reference_clock.get_time()
             self._node.process_document(document)
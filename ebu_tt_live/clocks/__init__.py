@@ -3,6 +3,8 @@ from . import base
 from . import local
 from . import utc
 from . import media
+from . import virtual
+from . import scheduler
 
 
 def get_clock(time_base, **kwargs):
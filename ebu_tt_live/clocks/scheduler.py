@@ -0,0 +1,133 @@
+"""
+Schedulers run the periodic work of the nodes, like the segmentation of the EBU-TT-D encoder. The node does not
+know whether the calls happen in real time or against a virtual clock.
+"""
+
+from datetime import timedelta
+import heapq
+import itertools
+
+
+class Scheduler(object):
+    """
+    Runs functions at a regular interval. Implemented in descendant classes.
+    """
+
+    def call_every(self, interval, function, *args, **kwargs):
+        """
+        Call a function every interval, the first time an interval from now.
+        :param interval: datetime.timedelta
+        :param function:
+        :return: the scheduled call, its stop() method cancels it
+        """
+        raise NotImplementedError()
+
+
+class VirtualCall(object):
+    """
+    A periodic call of a :py:class:`VirtualScheduler`.
+    """
+
+    _interval = None
+    _function = None
+    _args = None
+    _kwargs = None
+    _running = True
+
+    def __init__(self, interval, function, args, kwargs):
+        self._interval = interval
+        self._function = function
+        self._args = args
+        self._kwargs = kwargs
+
+    @property
+    def interval(self):
+        return self._interval
+
+    @property
+    def running(self):
+        return self._running
+
+    def __call__(self):
+        self._function(*self._args, **self._kwargs)
+
+    def stop(self):
+        self._running = False
+
+
+class VirtualScheduler(Scheduler):
+    """
+    Runs the scheduled calls against a :py:class:`ebu_tt_live.clocks.virtual.VirtualClock`. Time only passes when
+    the scheduler is advanced: the calls that fall due are made in the order of their times, calls due at the same
+    time in the order they were scheduled, and the clock shows the time of each call while it is made. The same
+    input gives the same sequence of calls on every run however long the calls take.
+
+    A call that raises is stopped and the exception is passed on, like a looping call in Twisted.
+
+    :param clock: VirtualClock
+    """
+
+    _clock = None
+    _queue = None
+    _counter = None
+
+    def __init__(self, clock):
+        self._clock = clock
+        self._queue = []
+        self._counter = itertools.count()
+
+    @property
+    def clock(self):
+        return self._clock
+
+    def call_every(self, interval, function, *args, **kwargs):
+        if not isinstance(interval, timedelta):
+            interval = timedelta(seconds=interval)
+        if interval <= timedelta():
+            raise ValueError('Interval must be positive: {}'.format(interval))
+        call = VirtualCall(interval, function, args, kwargs)
+        self._schedule(self._clock.get_time() + interval, next(self._counter), call)
+        return call
+
+    def _schedule(self, due_time, order, call):
+        heapq.heappush(self._queue, (due_time, order, call))
+
+    @property
+    def next_call_time(self):
+        """
+        The time of the next call or None if nothing is scheduled.
+        """
+        while self._queue and not self._queue[0][2].running:
+            heapq.heappop(self._queue)
+        if not self._queue:
+            return None
+        return self._queue[0][0]
+
+    def advance_to(self, value):
+        """
+        Make the calls due until a time and move the clock to it.
+        :param value: datetime.timedelta
+        :return: the number of calls made
+        """
+        count = 0
+        while self.next_call_time is not None and self.next_call_time <= value:
+            due_time, order, call = heapq.heappop(self._queue)
+            self._clock.advance_to(due_time)
+            try:
+                call()
+            except Exception:
+                call.stop()
+                raise
+            count += 1
+            if call.running:
+                self._schedule(due_time + call.interval, order, call)
+        self._clock.advance_to(value)
+        return count
+
+    def advance(self, value):
+        """
+        Make the calls due in a timespan and move the clock forward by it.
+        :param value: datetime.timedelta
+        :return: the number of calls made
+        """
+        return self.advance_to(self._clock.get_time() + value)
@@ -0,0 +1,56 @@
+from unittest import TestCase
+from ebu_tt_live.clocks.scheduler import Scheduler, VirtualScheduler
+from ebu_tt_live.clocks.virtual import VirtualClock
+from datetime import timedelta
+
+
+class TestVirtualScheduler(TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock(start_time=timedelta(hours=1))
+        self.scheduler = VirtualScheduler(self.clock)
+        self.calls = []
+
+    def _record(self, name):
+        self.calls.append((name, self.clock.get_time()))
+
+    def test_call_every(self):
+        call = self.scheduler.call_every(timedelta(seconds=2), self._record, 'a')
+        self.scheduler.call_every(3, self._record, name='b')
+        self.assertEqual(self.scheduler.next_call_time, timedelta(hours=1, seconds=2))
+        self.assertEqual(self.scheduler.advance(timedelta(seconds=6)), 5)
+        # In the order of their times, calls at the same time in the order they were scheduled
+        self.assertEqual(self.calls, [
+            ('a', timedelta(hours=1, seconds=2)),
+            ('b', timedelta(hours=1, seconds=3)),
+            ('a', timedelta(hours=1, seconds=4)),
+            ('a', timedelta(hours=1, seconds=6)),
+            ('b', timedelta(hours=1, seconds=6)),
+        ])
+        self.assertEqual(self.clock.get_time(), timedelta(hours=1, seconds=6))
+        call.stop()
+        self.assertFalse(call.running)
+        self.calls = []
+        self.scheduler.advance_to(timedelta(hours=1, seconds=10))
+        self.assertEqual(self.calls, [('b', timedelta(hours=1, seconds=9))])
+        self.assertEqual(self.clock.get_time(), timedelta(hours=1, seconds=10))
+
+    def test_nothing_scheduled(self):
+        self.assertIsNone(self.scheduler.next_call_time)
+        self.assertEqual(self.scheduler.advance(timedelta(seconds=1)), 0)
+        self.assertEqual(self.clock.get_time(), timedelta(hours=1, seconds=1))
+
+    def test_invalid_interval(self):
+        self.assertRaises(ValueError, self.scheduler.call_every, timedelta(), self._record, 'a')
+
+    def test_failing_call_is_stopped(self):
+        def fail():
+            raise RuntimeError()
+        call = self.scheduler.call_every(1, fail)
+        self.assertRaises(RuntimeError, self.scheduler.advance, timedelta(seconds=5))
+        self.assertFalse(call.running)
+        self.assertEqual(self.clock.get_time(), timedelta(hours=1, seconds=1))
+        self.assertIsNone(self.scheduler.next_call_time)
+
+    def test_abstract_scheduler(self):
+        self.assertRaises(NotImplementedError, Scheduler().call_every, 1, self._record, 'a')
@@ -0,0 +1,34 @@
+from unittest import TestCase
+from ebu_tt_live.clocks.virtual import VirtualClock
+from ebu_tt_live.errors import TimeFormatError
+from datetime import timedelta
+
+
+class TestVirtualClock(TestCase):
+
+    def test_advance(self):
+        clock = VirtualClock(start_time=timedelta(hours=1))
+        self.assertEqual(clock.time_base, 'clock')
+        self.assertEqual(clock.clock_mode, 'local')
+        self.assertEqual(clock.get_time(), timedelta(hours=1))
+        clock.advance(timedelta(seconds=2))
+        self.assertEqual(clock.get_time(), timedelta(hours=1, seconds=2))
+        clock.advance_to(timedelta(hours=2))
+        self.assertEqual(clock.get_time(), timedelta(hours=2))
+        # The time is only moved by the clock's owner
+        self.assertEqual(clock.get_time(), timedelta(hours=2))
+
+    def test_time_does_not_go_back(self):
+        clock = VirtualClock(start_time=timedelta(hours=1))
+        self.assertRaises(ValueError, clock.advance_to, timedelta(minutes=59))
+        self.assertRaises(TimeFormatError, clock.advance_to, 3600)
+        self.assertEqual(clock.get_time(), timedelta(hours=1))
+
+    def test_fixed_time_mode(self):
+        clock = VirtualClock(time_base='media')
+        self.assertEqual(clock.time_base, 'media')
+        clock.set_fixed_time(timedelta(seconds=5))
+        clock.set_fixed_time_mode(True)
+        self.assertEqual(clock.get_time(), timedelta(seconds=5))
+        clock.set_fixed_time_mode(False)
+        self.assertEqual(clock.get_time(), timedelta())
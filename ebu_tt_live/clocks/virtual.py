@@ -0,0 +1,45 @@
+from datetime import timedelta
+from ebu_tt_live.errors import TimeFormatError
+from ebu_tt_live.strings import ERR_TIME_WRONG_FORMAT
+from .base import Clock
+
+
+class VirtualClock(Clock):
+    """
+    A clock whose time only moves when it is advanced. Nodes given a virtual clock process recorded input as fast as
+    they can while seeing the timeline of the recording, and produce the same output on every run.
+    See :py:class:`ebu_tt_live.clocks.scheduler.VirtualScheduler` for running timers against it.
+
+    :param time_base: the time base the clock stands for
+    :param clock_mode: the clock mode the clock stands for in the clock time base
+    :param start_time: the initial time of the clock
+    """
+
+    _current_time = None
+
+    def __init__(self, time_base='clock', clock_mode='local', start_time=timedelta()):
+        self._time_base = time_base
+        self._clock_mode = clock_mode
+        self.advance_to(start_time)
+
+    def get_real_clock_time(self):
+        return self._current_time
+
+    def advance_to(self, value):
+        """
+        Move the clock to a time. The time of a clock never goes back.
+        :param value: datetime.timedelta
+        :raises ValueError: if the time is before the current time of the clock
+        """
+        if not isinstance(value, timedelta):
+            raise TimeFormatError(ERR_TIME_WRONG_FORMAT)
+        if self._current_time is not None and value < self._current_time:
+            raise ValueError('Virtual time can not go back from {} to {}'.format(self._current_time, value))
+        self._current_time = value
+
+    def advance(self, value):
+        """
+        Move the clock forward.
+        :param value: the time to move forward by as a datetime.timedelta
+        """
+        self.advance_to(self._current_time + value)
@@ -1,5 +1,6 @@
 
 from .base import SubtitleDocument, TimeBase, DocumentSequence
-from .ebutt3 import EBUTT3Document, EBUTT3DocumentSequence
+from .ebutt3 import EBUTT3Document, EBUTT3DocumentSequence, RetentionPolicy, SegmentCache
 from .ebuttd import EBUTTDDocument
+from .relayed import RelayedDocument
 from .converters import ebutt3_to_ebuttd
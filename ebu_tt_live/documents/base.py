@@ -9,12 +9,54 @@ class TimeBase(object):
 
 class SubtitleDocument(ComparableMixin):
 
+    # Serialized forms of the document: the XML text under None and the encoded payloads under their encoding.
+    # Every consumer of the document (e.g. the websocket subscribers) shares them until the content changes.
+    _serialized = None
+
     def __init__(self):
         raise NotImplementedError('This is an abstract class')
 
     def validate(self):
         raise NotImplementedError()
 
+    def _serialize(self):
+        """
+        Produce the XML text of the document.
+        """
+        raise NotImplementedError()
+
+    def _get_serialized(self, encoding):
+        if self._serialized is None:
+            self._serialized = {}
+        try:
+            return self._serialized[encoding]
+        except KeyError:
+            if encoding is None:
+                value = self._serialize()
+            else:
+                value = self._get_serialized(None).encode(encoding)
+            self._serialized[encoding] = value
+            return value
+
+    def get_xml(self):
+        return self._get_serialized(None)
+
+    def get_encoded_xml(self, encoding='utf-8'):
+        """
+        The XML of the document encoded for transmission. The document is serialized and encoded only once and the
+        payload is shared until the content of the document changes.
+        :param encoding:
+        :return: the encoded XML
+        """
+        return self._get_serialized(encoding)
+
+    def invalidate_serialized(self):
+        """
+        Drop the cached serialized forms of the document. The document API calls this on every mutation. Code that modifies
+        the binding directly must call it (validate calls it too).
+        """
+        self._serialized = None
+
 
 class DocumentSequence(object):
     """
@@ -1,20 +1,23 @@
 import logging
 from .base import SubtitleDocument, TimeBase, CloningDocumentSequence
-from .ebutt3_segmentation import EBUTT3Segmenter
+from .ebutt3_segmentation import EBUTT3SharingSegmenter, shift_segment
 from .ebutt3_splicer import EBUTT3Splicer
 from ebu_tt_live import bindings
-from ebu_tt_live.bindings import _ebuttm as metadata, TimingValidationMixin
-from ebu_tt_live.strings import ERR_DOCUMENT_SEQUENCE_MISMATCH, \
+from ebu_tt_live.bindings import _ebuttm as metadata, TimingValidationMixin, compact
+from ebu_tt_live.strings import ERR_DOCUMENT_SEQUENCE_MISMATCH, ERR_TIME_WRONG_FORMAT, \
     ERR_DOCUMENT_NOT_COMPATIBLE, ERR_DOCUMENT_NOT_PART_OF_SEQUENCE, \
     ERR_DOCUMENT_SEQUENCE_INCONSISTENCY, DOC_DISCARDED, DOC_TRIMMED, DOC_REQ_SEGMENT, DOC_SEQ_REQ_SEGMENT, \
-    DOC_INSERTED, DOC_SEMANTIC_VALIDATION_SUCCESSFUL
+    DOC_INSERTED, DOC_SEMANTIC_VALIDATION_SUCCESSFUL, DOC_EVICTED
 from ebu_tt_live.errors import IncompatibleSequenceError, DocumentDiscardedError, \
     SequenceOverridden
 from ebu_tt_live.clocks import get_clock_from_document
+from ebu_tt_live.utils import IntervalTree, IDAllocator
 from datetime import timedelta
 from pyxb import BIND
+from pyxb.utils import six
 from sortedcontainers import sortedset
 from sortedcontainers import sortedlist
+from collections import OrderedDict
 import gc
 
 
@@ -82,6 +85,22 @@ class TimingEventEnd(TimingEvent):
             self.element
         )
 
+
+class TimelineRecord(object):
+    """
+    The timing events of one element on a timeline. This is what makes the element-to-event lookups constant time
+    and it also holds the key of the element's interval in the interval index.
+    """
+
+    __slots__ = ('element', 'begin', 'end', 'interval_key')
+
+    def __init__(self, element):
+        self.element = element
+        self.begin = None
+        self.end = None
+        self.interval_key = None
+
+
 class TimelineUtilMixin(object):
     """
     This mixin is responsible for managing the shared timeline functionality
@@ -90,6 +109,11 @@ class TimelineUtilMixin(object):
     # The timing events that mark the beginning and end of an element are kept on a timeline,
     # which iw a sorted list. IMPORTANT: Not sorted set as there are overlapping begins and ends.
     _timeline = None
+    # The begin and end events are also paired up per element in an interval tree so that range lookups do not need
+    # to walk the timeline from its very beginning.
+    _interval_index = None
+    # Element identity -> TimelineRecord
+    _timeline_records = None
 
     @property
     def timeline(self):
@@ -97,8 +121,80 @@ class TimelineUtilMixin(object):
             self._timeline = sortedlist.SortedListWithKey(key=lambda item: item.when)
         return self._timeline
 
+    @property
+    def interval_index(self):
+        if self._interval_index is None:
+            self._init_interval_index()
+        return self._interval_index
+
+    def _init_interval_index(self):
+        self._interval_index = IntervalTree()
+        self._timeline_records = {}
+
     def reset_timeline(self):
         self._timeline = None
+        self._interval_index = None
+        self._timeline_records = None
+
+    def _index_interval(self, record):
+        index = self.interval_index
+        if record.interval_key is not None:
+            index.remove(record.interval_key)
+            record.interval_key = None
+        if record.begin is not None:
+            record.interval_key = index.insert(
+                begin=record.begin.when,
+                end=record.end.when if record.end is not None else None,
+                value=record.element
+            )
+
+    def _get_timeline_record(self, element, create=False):
+        if self._interval_index is None:
+            self._init_interval_index()
+        record = self._timeline_records.get(id(element))
+        if record is None and create:
+            record = TimelineRecord(element)
+            self._timeline_records[id(element)] = record
+        return record
+
+    def add_timing_event(self, event):
+        """
+        Put a timing event on the timeline and pair it up with the other event of the same element in the interval
+        index. Every timeline insertion is meant to go through this function.
+        :param event: TimingEventBegin or TimingEventEnd
+        """
+        self._add_timing_events(event.element, [event])
+
+    def _add_timing_events(self, element, events):
+        record = self._get_timeline_record(element, create=True)
+        for event in events:
+            self.timeline.add(event)
+            if isinstance(event, TimingEventBegin):
+                record.begin = event
+            else:
+                record.end = event
+        self._index_interval(record)
+
+    def remove_timing_event(self, event):
+        """
+        Take a timing event off the timeline and the interval index. Every timeline removal is meant to go through
+        this function.
+        :param event: TimingEventBegin or TimingEventEnd
+        """
+        self.timeline.remove(event)
+        record = self._get_timeline_record(event.element)
+        if record is None:
+            return
+        if record.begin is event:
+            record.begin = None
+        elif record.end is event:
+            record.end = None
+        if record.begin is None and record.end is None:
+            if record.interval_key is not None:
+                self._interval_index.remove(record.interval_key)
+            del self._timeline_records[id(event.element)]
+        else:
+            self._index_interval(record)
 
     def add_to_timeline(self, element):
         """
@@ -106,46 +202,47 @@ class TimelineUtilMixin(object):
         :param element:
         :return:
         """
+        events = []
         if element.computed_begin_time is not None:
-            self.timeline.add(TimingEventBegin(element=element))
+            events.append(TimingEventBegin(element=element))
         if element.computed_end_time is not None:
-            self.timeline.add(TimingEventEnd(element=element))
+            events.append(TimingEventEnd(element=element))
+        if events:
+            self._add_timing_events(element, events)
 
     def locate_element_begin(self, element):
-        for item in self.timeline.irange(TimingEventBegin(element)):
-            if item.element == element and isinstance(item, TimingEventBegin):
-                return item
-        raise LookupError()
+        record = self._get_timeline_record(element)
+        if record is None or record.begin is None:
+            raise LookupError()
+        return record.begin
 
     def locate_element_end(self, element):
-        for item in self.timeline.irange(TimingEventBegin(element)):
-            if item.element == element and isinstance(item, TimingEventEnd):
-                return item
-        raise LookupError()
+        record = self._get_timeline_record(element)
+        if record is None or record.end is None:
+            raise LookupError()
+        return record.end
 
     def lookup_range_on_timeline(self, begin=None, end=None):
         """
-        Extract a segment of the timeline and
+        Extract a segment of the timeline. Elements that begin at or after the end of the range and the ones that
+        ended at or before the beginning of the range are left out. The lookup is done in the interval index so it
+        does not depend on the amount of history kept on the timeline.
         :param begin:
         :param end:
         :return: A list of elements in chronological order
         """
-        affected_elements = []
+        return self.interval_index.query(begin=begin, end=end)
 
-        # Coming from the beginning of the timeline in any case
-        for item in self.timeline.irange(maximum=end is not None and TimingEvent(None, end) or None):
-
-            if isinstance(item, TimingEventBegin):
-                if item.when != end:
-                    # Don't take 0 long elements
-                    affected_elements.append(item.element)
-                continue
-            elif isinstance(item, TimingEventEnd):
-                if begin is not None and item.when <= begin:
-                    # Remove elements, which had ended before the specified range began.
-                    if item.element in affected_elements:
-                        affected_elements.remove(item.element)
-        return affected_elements
+    def has_timing_events(self, begin, end):
+        """
+        Tell whether anything begins or ends on the timeline after the beginning and before the end of a range.
+        :param begin:
+        :param end:
+        :return: bool
+        """
+        for _ in self.timeline.irange_key(min_key=begin, max_key=end, inclusive=(False, False)):
+            return True
+        return False
 
 
 class EBUTT3Document(TimelineUtilMixin, SubtitleDocument):
@@ -169,6 +266,19 @@ class EBUTT3Document(TimelineUtilMixin, SubtitleDocument):
     # The sequence the document belongs to
     _sequence = None
 
+    # Size of the XML representation, used by the retention policy of the sequence
+    _byte_size = None
+    _compact = None
+
+    # Set by a successful validation and cleared by the mutators of the content
+    _validated = False
+
+    # Copies of the head elements shared by the segments of the document, dropped by the validation
+    _shared_segment_copies = None
+
+    # Qualifies the IDs of the elements in the segments of the document with its sequence number
+    _id_allocator = None
+
     def __init__(self, time_base, sequence_number, sequence_identifier, lang, clock_mode=None):
         if not clock_mode and time_base is TimeBase.CLOCK:
             clock_mode = 'local'
@@ -189,19 +299,57 @@ class EBUTT3Document(TimelineUtilMixin, SubtitleDocument):
         self.validate()
 
     @classmethod
-    def create_from_raw_binding(cls, binding):
+    def create_from_raw_binding(cls, binding, availability_time=None, validate=True):
+        """
+        Wrap a binding into a validated document.
+        :param binding: the tt element binding
+        :param availability_time: if known, passing the availability time here saves the timing recomputation the
+            availability_time setter would trigger afterwards
+        :param validate: set it to False to leave the validation to the user of the document
+        """
         instance = cls.__new__(cls)
         instance._ebutt3_content = binding
-        instance.validate()
+        if availability_time is not None:
+            if not isinstance(availability_time, timedelta):
+                raise TypeError
+            instance._availability_time = availability_time
+        if validate:
+            instance.validate()
         return instance
 
     @classmethod
-    def create_from_xml(cls, xml):
+    def create_from_xml(cls, xml, availability_time=None):
+        """
+        Parse and validate a document in one go. This is the ingest path of the consumer carriage implementations:
+        the document is traversed by the semantic validator exactly once.
+        :param xml: the XML text of the document
+        :param availability_time: the availability time of the document as a timedelta
+        """
         instance = cls.create_from_raw_binding(
             binding=bindings.CreateFromDocument(
                 xml_text=xml
-            )
+            ),
+            availability_time=availability_time
         )
+        if isinstance(xml, six.text_type):
+            # The retention policy limits bytes, not characters
+            xml = xml.encode('utf-8')
+        instance._byte_size = len(xml)
+        return instance
+
+    @classmethod
+    def create_from_compact(cls, data, availability_time=None):
+        """
+        Decode and validate a document received in the compact encoding of the bindings.
+        :param data: the compact payload
+        :param availability_time: the availability time of the document as a timedelta
+        """
+        instance = cls.create_from_raw_binding(
+            binding=compact.decode(data),
+            availability_time=availability_time
+        )
+        # Forwarding the document does not need to encode it again
+        instance._compact = data
         return instance
 
     def _cmp_key(self):
@@ -218,6 +366,7 @@ class EBUTT3Document(TimelineUtilMixin, SubtitleDocument):
     @sequence_identifier.setter
     def sequence_identifier(self, value):
         self._ebutt3_content.sequenceIdentifier = value
+        self.invalidate_serialized()
 
     @property
     def lang(self):
@@ -247,6 +396,7 @@ class EBUTT3Document(TimelineUtilMixin, SubtitleDocument):
     def sequence_number(self, value):
         intvalue = int(value)
         self._ebutt3_content.sequenceNumber = intvalue
+        self.invalidate_serialized()
 
     @property
     def availability_time(self):
@@ -257,7 +407,11 @@ class EBUTT3Document(TimelineUtilMixin, SubtitleDocument):
         if not isinstance(value, timedelta):
             raise TypeError
         self._availability_time = value
-        self.validate()
+        if self._validated:
+            # Only the computed times depend on the availability time
+            self.recompute_timing()
+        else:
+            self.validate()
 
     @property
     def computed_begin_time(self):
@@ -300,11 +454,38 @@ class EBUTT3Document(TimelineUtilMixin, SubtitleDocument):
     def time_base(self):
         return self._ebutt3_content.timeBase
 
+    @property
+    def byte_size(self):
+        """
+        The size in bytes of the document's XML representation encoded in UTF-8. Documents parsed from XML report
+        the size of their input so the document is only serialized here if it was not created from XML.
+        """
+        if self._byte_size is None:
+            self._byte_size = len(self.get_encoded_xml())
+        return self._byte_size
+
+    def freeze_resolved_times(self, resolved_begin_time, resolved_end_time):
+        """
+        Store the resolved times in the document itself. This is used when the sequence stops keeping track of the
+        document but the document is expected to remember the timing it had in the sequence.
+        :param resolved_begin_time:
+        :param resolved_end_time:
+        """
+        self._resolved_begin_time = resolved_begin_time
+        self._resolved_end_time = resolved_end_time
+
     @property
     def discarded(self):
         return self.resolved_begin_time >= self.resolved_end_time
 
+    @property
+    def validated(self):
+        return self._validated
+
     def validate(self):
+        self._validated = False
+        self._shared_segment_copies = None
+        self.invalidate_serialized()
         # Reset timeline
         self.reset_timeline()
         # This is assuming availability from the beginning of our time coordinate system.
@@ -321,6 +502,30 @@ class EBUTT3Document(TimelineUtilMixin, SubtitleDocument):
                 sequence_number=self.sequence_number
             )
         )
+        self._extract_computed_times()
+        self._validated = True
+
+    def ensure_validated(self):
+        """
+        Validate the document unless it has already been validated and it was not modified since.
+        Changes made directly on the binding are not tracked, call validate after those.
+        """
+        if not self._validated:
+            self.validate()
+
+    def recompute_timing(self):
+        """
+        Recompute the computed times and the timeline of an already validated document. The ID, style and region
+        validation results are kept since the availability time does not affect them.
+        """
+        self.reset_timeline()
+        self._ebutt3_content.recompute_timing(
+            availability_time=self.availability_time or timedelta(),
+            document=self
+        )
+        self._extract_computed_times()
+
+    def _extract_computed_times(self):
         # Extract results
 
         # Begin times
@@ -332,40 +537,88 @@ class EBUTT3Document(TimelineUtilMixin, SubtitleDocument):
         # End times
         self._computed_end_time = self._ebutt3_content.body.computed_end_time
 
+    def _content_modified(self):
+        self._validated = False
+        self.invalidate_serialized()
+
     def add_div(self, div):
         body = self._ebutt3_content.body
         body.append(div)
+        self._content_modified()
 
     def set_begin(self, begin):
         self._ebutt3_content.body.begin = begin
+        self._content_modified()
 
     def set_end(self, end):
         self._ebutt3_content.body.end = end
+        self._content_modified()
 
     def set_dur(self, dur):
         self._ebutt3_content.body.dur = dur
+        self._content_modified()
 
     @property
     def binding(self):
         return self._ebutt3_content
 
-    def get_xml(self):
+    def _serialize(self):
         return self._ebutt3_content.toxml()
 
+    def get_compact(self):
+        """
+        The compact binary encoding of the document used between the nodes of the toolkit. Like the XML it is
+        encoded once and shared until the content of the document changes.
+        """
+        if self._compact is None:
+            self._compact = compact.encode(self._ebutt3_content)
+        return self._compact
+
+    def invalidate_serialized(self):
+        super(EBUTT3Document, self).invalidate_serialized()
+        self._compact = None
+
     def get_dom(self):
         return self._ebutt3_content.toDOM()
 
     def get_element_by_id(self, elem_id, elem_type=None):
         return self.binding.get_element_by_id(elem_id=elem_id, elem_type=elem_type)
 
-    def extract_segment(self, begin=None, end=None, deconflict_ids=False):
+    @property
+    def id_allocator(self):
+        """
+        The IDAllocator the segmenter qualifies the IDs with, every element gets its qualified ID formatted once for
+        all the segments of the document.
+        """
+        if self._id_allocator is None:
+            self._id_allocator = IDAllocator()
+        return self._id_allocator
+
+    def get_shared_segment_copies(self, deconflict_ids):
+        """
+        The copies of the style and region elements the segments of this document share. They do not depend on the
+        segment boundaries so they are made once. The next validation of the document drops them.
+
+        :param deconflict_ids: the copies with prefixed IDs are kept apart from the ones with the original IDs
+        :return: dict mapping the elements of the document to their copies
+        """
+        if self._shared_segment_copies is None:
+            self._shared_segment_copies = {True: {}, False: {}}
+        return self._shared_segment_copies[bool(deconflict_ids)]
+
+    def extract_segment(self, begin=None, end=None, deconflict_ids=False, validate=True):
         """
         Create a valid ebutt3 document subset. As it collects data it will also prefix the ids in the document with
         the document sequence number so that later merge does not have collision.
 
+        The segments of a document share their style and region elements, see
+        :py:class:`ebu_tt_live.documents.ebutt3_segmentation.EBUTT3SharingSegmenter`. Treat them as read-only.
+
         :param begin:
         :param end:
         :param deconflict_ids: prevent id clash across documents by prefixing the IDs
+        :param validate: a segment that is only spliced into another document can skip the validation as the
+            result of the splicing is validated anyway
         :return: EBUTT3Document
         """
         document_logger.info(
@@ -376,8 +629,8 @@ class EBUTT3Document(TimelineUtilMixin, SubtitleDocument):
                 end=end
             )
         )
-        segmenter = EBUTT3Segmenter(self, begin=begin, end=end, deconflict_ids=deconflict_ids)
-        return EBUTT3Document.create_from_raw_binding(segmenter.segment)
+        segmenter = EBUTT3SharingSegmenter(self, begin=begin, end=end, deconflict_ids=deconflict_ids)
+        return EBUTT3Document.create_from_raw_binding(segmenter.segment, validate=validate)
 
     def cleanup(self):
         """
@@ -388,6 +641,190 @@ class EBUTT3Document(TimelineUtilMixin, SubtitleDocument):
         self.reset_timeline()
 
 
+class RetentionPolicy(object):
+    """
+    The retention policy limits the history an EBUTT3DocumentSequence keeps in memory. It is enforced every time a
+    document is added to the sequence by evicting the documents that begin the earliest on the timeline. Any limit can
+    be left unset. The most recently activated document is always kept so that the sequence can keep resolving the
+    timing of new documents.
+
+    :param max_documents: The maximum number of documents to keep
+    :param max_age: datetime.timedelta. Documents that ended longer than this before the time of the reference clock
+        are evicted.
+    :param max_bytes: The maximum cumulative size of the XML representation of the documents kept.
+    """
+
+    _max_documents = None
+    _max_age = None
+    _max_bytes = None
+
+    def __init__(self, max_documents=None, max_age=None, max_bytes=None):
+        if max_age is not None and not isinstance(max_age, timedelta):
+            raise TypeError(ERR_TIME_WRONG_FORMAT)
+        self._max_documents = max_documents
+        self._max_age = max_age
+        self._max_bytes = max_bytes
+
+    @property
+    def max_documents(self):
+        return self._max_documents
+
+    @property
+    def max_age(self):
+        return self._max_age
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+
+    def evicts(self, document_count, byte_count, resolved_end_time, reference_time):
+        """
+        Decide if the oldest document should be evicted from the sequence.
+
+        :param document_count: number of documents in the sequence
+        :param byte_count: cumulative size of the documents in the sequence
+        :param resolved_end_time: resolved end time of the oldest document
+        :param reference_time: current time of the reference clock of the sequence
+        :return: boolean
+        """
+        if self._max_documents is not None and document_count > self._max_documents:
+            return True
+        if self._max_bytes is not None and byte_count > self._max_bytes:
+            return True
+        if self._max_age is not None and resolved_end_time + self._max_age <= reference_time:
+            return True
+        return False
+
+
+class SegmentCache(object):
+    """
+    Least recently used cache of the segments an EBUTT3DocumentSequence extracts from its documents. A segment is
+    looked up by its document and the interval it was clipped to. When all the subtitles in the segment span it
+    entirely, e.g. a long-running subtitle, the next segment of the same length shows the same content with shifted
+    times: it is made from the cached one by shifting its times instead of segmenting the document again.
+
+    The cached segments are not validated and they must not be modified.
+
+    :param max_size: The maximum number of segments kept
+    """
+
+    _max_size = None
+    _segments = None
+    _spanned_segments = None
+    _hits = None
+    _shifted_hits = None
+    _misses = None
+
+    def __init__(self, max_size=64):
+        if max_size < 1:
+            raise ValueError('The segment cache needs room for at least 1 segment: {}'.format(max_size))
+        self._max_size = max_size
+        self._segments = OrderedDict()
+        self._spanned_segments = OrderedDict()
+        self._hits = 0
+        self._shifted_hits = 0
+        self._misses = 0
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def shifted_hits(self):
+        return self._shifted_hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    @property
+    def hit_rate(self):
+        """
+        The share of the lookups served from the cache, shifted segments included.
+        """
+        lookups = self._hits + self._shifted_hits + self._misses
+        if not lookups:
+            return 0.0
+        return float(self._hits + self._shifted_hits) / lookups
+
+    def __len__(self):
+        return len(self._segments)
+
+    def __str__(self):
+        return '{} hits, {} shifted hits, {} misses: {:.1%} hit rate'.format(
+            self._hits, self._shifted_hits, self._misses, self.hit_rate
+        )
+
+    def clear(self):
+        self._segments.clear()
+        self._spanned_segments.clear()
+
+    @classmethod
+    def _get(cls, segments, key):
+        value = segments.pop(key, None)
+        if value is not None:
+            segments[key] = value
+        return value
+
+    def _put(self, segments, key, value):
+        segments.pop(key, None)
+        segments[key] = value
+        while len(segments) > self._max_size:
+            segments.popitem(last=False)
+
+    @classmethod
+    def _spanned_key(cls, document, begin, end):
+        # The content of the segment only depends on the interval if every subtitle in it spans the whole interval
+        if begin is None or end is None:
+            return None
+        elements = document.lookup_range_on_timeline(begin=begin, end=end)
+        for element in elements:
+            if element.computed_begin_time > begin:
+                return None
+            if element.computed_end_time is not None and element.computed_end_time < end:
+                return None
+        return document.sequence_identifier, document.sequence_number, frozenset(elements), end - begin
+
+    def extract_segment(self, document, begin=None, end=None):
+        """
+        Look up the segment of a document or extract it.
+
+        :param document: EBUTT3Document
+        :param begin:
+        :param end:
+        :return: EBUTT3Document, not validated
+        """
+        key = (document.sequence_identifier, document.sequence_number, begin, end)
+        segment = self._get(self._segments, key)
+        if segment is not None:
+            self._hits += 1
+            return segment
+
+        spanned_key = self._spanned_key(document, begin, end)
+        spanned_segment = None
+        if spanned_key is not None:
+            spanned_segment = self._get(self._spanned_segments, spanned_key)
+        if spanned_segment is not None:
+            self._shifted_hits += 1
+            spanned_begin, spanned_document = spanned_segment
+            segment = EBUTT3Document.create_from_raw_binding(
+                shift_segment(spanned_document.binding, begin - spanned_begin),
+                validate=False
+            )
+        else:
+            self._misses += 1
+            segment = document.extract_segment(begin=begin, end=end, deconflict_ids=True, validate=False)
+
+        self._put(self._segments, key, segment)
+        if spanned_key is not None:
+            self._put(self._spanned_segments, spanned_key, (begin, segment))
+        return segment
+
+
 class EBUTT3DocumentSequence(TimelineUtilMixin, CloningDocumentSequence):
     """
     EBU-TT Live specific document sequence. It maps the documents based on their sequence numbers and timing attributes.
@@ -408,14 +845,22 @@ class EBUTT3DocumentSequence(TimelineUtilMixin, CloningDocumentSequence):
     _clock_mode = None
     _lang = None
     _documents = None
+    _retention_policy = None
+    _retained_bytes = None
+    _segment_cache = None
+    _revision = None
 
-    def __init__(self, sequence_identifier, reference_clock, lang):
+    def __init__(self, sequence_identifier, reference_clock, lang, retention_policy=None, segment_cache=None):
         self._sequence_identifier = sequence_identifier
         self._reference_clock = reference_clock
         self._lang = lang
         self._last_sequence_number = 0
         # The documents are kept in a sorted set that is sorted by the documents's sequence number
         self._documents = sortedset.SortedSet()
+        self._retention_policy = retention_policy
+        self._retained_bytes = 0
+        self._segment_cache = segment_cache
+        self._revision = 0
 
     @property
     def reference_clock(self):
@@ -425,6 +870,48 @@ class EBUTT3DocumentSequence(TimelineUtilMixin, CloningDocumentSequence):
     def sequence_identifier(self):
         return self._sequence_identifier
 
+    @property
+    def retention_policy(self):
+        return self._retention_policy
+
+    @property
+    def segment_cache(self):
+        return self._segment_cache
+
+    @property
+    def revision(self):
+        """
+        Counts the changes to the documents of the sequence: every added document and every discarding increments it.
+        """
+        return self._revision
+
+    def has_change_points(self, begin, end):
+        """
+        Tell whether the content of the sequence changes inside a range, i.e. a document or an element of a document
+        begins or ends after the beginning and before the end of the range. Otherwise the content active at the
+        beginning of the range lasts until its end. Changes made by adding documents are told by the revision.
+        :param begin:
+        :param end:
+        :return: bool
+        """
+        if self.has_timing_events(begin, end):
+            return True
+        for document in self.lookup_range_on_timeline(begin=begin, end=end):
+            if document.has_timing_events(begin, end):
+                return True
+        return False
+
+    @property
+    def document_count(self):
+        return len(self._documents)
+
+    @property
+    def retained_bytes(self):
+        """
+        Cumulative size of the documents kept by the sequence. Only accounted when the retention policy limits it.
+        """
+        return self._retained_bytes
+
     @property
     def last_sequence_number(self):
         return self._last_sequence_number
@@ -440,7 +927,9 @@ class EBUTT3DocumentSequence(TimelineUtilMixin, CloningDocumentSequence):
         return cls(
             sequence_identifier=kwargs.get('sequence_identifier', document.sequence_identifier),
             reference_clock=kwargs.get('reference_clock', get_clock_from_document(document)),
-            lang=kwargs.get('lang', document.lang)
+            lang=kwargs.get('lang', document.lang),
+            retention_policy=kwargs.get('retention_policy', None),
+            segment_cache=kwargs.get('segment_cache', None)
         )
 
     def _check_document_compatibility(self, document):
@@ -552,7 +1041,7 @@ class EBUTT3DocumentSequence(TimelineUtilMixin, CloningDocumentSequence):
         if begins_before:
             # Move up previous document's end R17
             if ends_after:
-                self.timeline.remove(ends_after)
+                self.remove_timing_event(ends_after)
             else:
                 ends_after = TimingEventEnd(begins_before.element)
             ends_after.when = this_begins.when
@@ -562,7 +1051,7 @@ class EBUTT3DocumentSequence(TimelineUtilMixin, CloningDocumentSequence):
                 resolved_begin_time=begins_before.when,
                 resolved_end_time=ends_after.when
             ))
-            self.timeline.add(ends_after)
+            self.add_timing_event(ends_after)
 
         self._insert_document(document, ends=this_ends)
 
@@ -575,13 +1064,15 @@ class EBUTT3DocumentSequence(TimelineUtilMixin, CloningDocumentSequence):
         :return:
         """
         self._documents.add(document)
-        self.timeline.add(TimingEventBegin(document))
+        if self._retention_policy is not None and self._retention_policy.max_bytes is not None:
+            self._retained_bytes += document.byte_size
+        self.add_timing_event(TimingEventBegin(document))
         if ends is not None and ends.when is not None:
-            self.timeline.add(ends)
+            self.add_timing_event(ends)
         else:
             computed_end = TimingEventEnd(document)
             if computed_end.when is not None:
-                self.timeline.add(computed_end)
+                self.add_timing_event(computed_end)
 
         document_logger.info(DOC_INSERTED.format(
             sequence_identifier=document.sequence_identifier,
@@ -613,9 +1104,9 @@ class EBUTT3DocumentSequence(TimelineUtilMixin, CloningDocumentSequence):
 
         for item, events in discarded_timing_events.items():
             item.discard_document(resolved_end_time=resolved_begin.when)
-            self._documents.remove(item)
+            self._remove_document(item)
             for event in events:
-                self.timeline.remove(event)
+                self.remove_timing_event(event)
 
     def discard_before(self, document):
         """
@@ -623,6 +1114,7 @@ class EBUTT3DocumentSequence(TimelineUtilMixin, CloningDocumentSequence):
         :param document: The document up to which we would like to discard things
         :return:
         """
+        self._revision += 1
         discarded_timing_events = {}
         resolved_begin = TimingEventBegin(document)
         discard_time = timedelta()
@@ -633,15 +1125,80 @@ class EBUTT3DocumentSequence(TimelineUtilMixin, CloningDocumentSequence):
 
         for item, events in discarded_timing_events.items():
             item.discard_document(resolved_end_time=discard_time)
-            self._documents.remove(item)
+            self._remove_document(item)
             for event in events:
-                self.timeline.remove(event)
+                self.remove_timing_event(event)
             del item
         del discarded_timing_events
 
+    def _remove_document(self, document):
+        self._documents.remove(document)
+        if self._retention_policy is not None and self._retention_policy.max_bytes is not None:
+            self._retained_bytes -= document.byte_size
+
+    def _evict_document(self, document):
+        """
+        Stop keeping track of a document that is no longer needed. Unlike discarding the document keeps its resolved
+        times. The timing events of the surviving documents are not touched.
+        :param document:
+        """
+        begin_event = self.locate_element_begin(document)
+        end_event = self.locate_element_end(document)
+        document.freeze_resolved_times(
+            resolved_begin_time=begin_event.when,
+            resolved_end_time=end_event.when
+        )
+        self.remove_timing_event(begin_event)
+        self.remove_timing_event(end_event)
+        self._remove_document(document)
+        document_logger.info(DOC_EVICTED.format(
+            sequence_identifier=document.sequence_identifier,
+            sequence_number=document.sequence_number
+        ))
+
+    def apply_retention_policy(self):
+        """
+        Evict the documents from the beginning of the timeline as long as the retention policy requires it.
+        This is called every time a document is added to the sequence.
+        """
+        if self._retention_policy is None:
+            return
+
+        reference_time = self._reference_clock.get_time()
+        document_count = len(self._documents)
+        byte_count = self._retained_bytes
+        evicted_documents = []
+
+        for item in self.timeline:
+            if not isinstance(item, TimingEventBegin):
+                continue
+            document = item.element
+            try:
+                end_event = self.locate_element_end(document)
+            except LookupError:
+                # A document without end is still active so neither this nor the following ones can go.
+                break
+            if not self._retention_policy.evicts(
+                document_count=document_count,
+                byte_count=byte_count,
+                resolved_end_time=end_event.when,
+                reference_time=reference_time
+            ):
+                break
+            if document_count <= 1:
+                break
+            evicted_documents.append(document)
+            document_count -= 1
+            if self._retention_policy.max_bytes is not None:
+                byte_count -= document.byte_size
+
+        for document in evicted_documents:
+            self._evict_document(document)
+
     def add_document(self, document):
         self._check_document_compatibility(document)
         document.sequence = self
+        self._revision += 1
 
         # Let's create space for the document
         try:
@@ -657,6 +1214,8 @@ class EBUTT3DocumentSequence(TimelineUtilMixin, CloningDocumentSequence):
         if document.sequence_number > self._last_sequence_number:
             self._last_sequence_number = document.sequence_number
 
+        self.apply_retention_policy()
+
     def get_document(self, seq_id):
         return self._documents[seq_id]
 
@@ -717,10 +1276,14 @@ class EBUTT3DocumentSequence(TimelineUtilMixin, CloningDocumentSequence):
         for doc in affected_documents:
             doc_ending = doc.resolved_end_time
             if end is not None:
-                if end < doc_ending:
+                # A document without a resolved end lasts until the end of the segment
+                if doc_ending is None or end < doc_ending:
                     doc_ending = end
             # Check only til resolved end, otherwise there will be unwanted parallel elements
-            doc_segment = doc.extract_segment(begin=begin, end=doc_ending, deconflict_ids=True)
+            if self._segment_cache is not None:
+                doc_segment = self._segment_cache.extract_segment(doc, begin=begin, end=doc_ending)
+            else:
+                doc_segment = doc.extract_segment(begin=begin, end=doc_ending, deconflict_ids=True, validate=False)
 
             document_segments.append(doc_segment)
             begin = doc_ending
@@ -5,9 +5,10 @@ import copy
 from ebu_tt_live.bindings.validation.base import SemanticValidationMixin, IDMixin
 from ebu_tt_live.bindings.pyxb_utils import RecursiveOperation
 from ebu_tt_live.bindings.validation.presentation import StyledElementMixin
-from ebu_tt_live.bindings import style_type, region_type
+from ebu_tt_live.bindings import style_type, region_type, TimingValidationMixin
 from ebu_tt_live.errors import DiscardElement
 from ebu_tt_live.bindings import ebuttdt
+from pyxb.binding.basis import ElementContent, NonElementContent
 
 # Splicer and segmentation
 # ========================
@@ -64,7 +65,7 @@ class EBUTT3Segmenter(RecursiveOperation):
 
     def _do_deconflict_id(self, element):
         if isinstance(element, IDMixin):
-            element.deconflict_id(self._document.sequence_number)
+            element.deconflict_id(self._document.sequence_number, id_allocator=self._document.id_allocator)
 
     def _do_copy(self, element, dataset):
 
@@ -155,7 +156,7 @@ class EBUTT3Segmenter(RecursiveOperation):
     def compute_document_segment(self):
         # Init
         # Make sure it is validated
-        self.document.validate()
+        self.document.ensure_validated()
         # Get the p and span elements in the range from the timeline
         affected_elements = self.document.lookup_range_on_timeline(begin=self.begin, end=self.end)
 
@@ -200,3 +201,84 @@ class EBUTT3Segmenter(RecursiveOperation):
         if len(self._segment.body.orderedContent()) == 0:
             self._segment.body.begin = self._convert_time(self.begin)
             self._segment.body.end = self._convert_time(self.end)
+
+
+class EBUTT3SharingSegmenter(EBUTT3Segmenter):
+    """
+    A segmenter that only copies what the segment changes. The timed containers are copied because their timing is
+    trimmed to the segment and the validation of the segment keeps its results on them. The style and region
+    elements do not depend on the segment boundaries: their copies are made once per document and shared by all the
+    segments of the document. Text is immutable so it is shared by reference.
+
+    The shared elements must not be modified in the segments.
+    """
+
+    def _do_copy(self, element, dataset):
+        if not isinstance(element, (style_type, region_type)):
+            return super(EBUTT3SharingSegmenter, self)._do_copy(element, dataset)
+
+        shared_copies = self.document.get_shared_segment_copies(deconflict_ids=self.deconflict_ids)
+        celem = shared_copies.get(element)
+        if celem is None:
+            celem = super(EBUTT3SharingSegmenter, self)._do_copy(element, dataset)
+            shared_copies[element] = celem
+        else:
+            dataset['instance_mapping'][element] = celem
+        return celem
+
+    def _process_non_element(self, value, non_element, parent_binding=None, **kwargs):
+        parent = self._semantic_dataset['instance_mapping'][parent_binding]
+        parent.append(value)
+
+
+def copy_segment_head(head):
+    """
+    Copy the head of a segment. The style and region elements are shared by the segments of a document so only the
+    containers holding them are copied.
+
+    :param head: head element binding of a segment
+    :return: head element binding
+    """
+    copied_head = copy.copy(head)
+    copied_head.metadata = head.metadata
+    for container_name in ['styling', 'layout']:
+        container = getattr(head, container_name)
+        if container is None:
+            continue
+        copied_container = copy.copy(container)
+        for item in container.orderedContent():
+            if isinstance(item, ElementContent):
+                copied_container.append(item.value)
+        setattr(copied_head, container_name, copied_container)
+    return copied_head
+
+
+def _shift_element(tt_element, element, offset):
+    copied_element = copy.copy(element)
+    copied_element._resetContent()
+    if isinstance(element, TimingValidationMixin):
+        if element.begin is not None:
+            copied_element.begin = tt_element.get_timing_type(element.begin.timedelta + offset)
+        if element.end is not None:
+            copied_element.end = tt_element.get_timing_type(element.end.timedelta + offset)
+    for item in element.orderedContent():
+        if isinstance(item, NonElementContent):
+            copied_element.append(item.value)
+        elif isinstance(item, ElementContent):
+            copied_element.append(_shift_element(tt_element, item.value, offset))
+    return copied_element
+
+
+def shift_segment(segment, offset):
+    """
+    Copy a segment with its times shifted. A document that shows the same content in consecutive segments gives the
+    same segments apart from the times so the next one can be made this way instead of segmenting the document again.
+
+    :param segment: tt element binding of a segment
+    :param offset: datetime.timedelta
+    :return: tt element binding
+    """
+    shifted_segment = copy.copy(segment)
+    shifted_segment.head = copy_segment_head(segment.head)
+    shifted_segment.body = _shift_element(segment, segment.body, offset)
+    return shifted_segment
@@ -3,72 +3,97 @@ from datetime import timedelta
 import logging
 import copy
 from pyxb.binding.basis import NonElementContent, ElementContent
-from ebu_tt_live.bindings import tt
+from ebu_tt_live.bindings import tt, IDMixin
+from ebu_tt_live.utils import IDAllocator
 
 
 log = logging.getLogger(__name__)
 
 
 class EBUTT3Splicer(object):
+    """
+    Merges the segments of consecutive documents into one document. The head and the body of the result are built in
+    one pass over the segments: every element of the bodies is copied once and the IDs are deconflicted against all
+    the IDs taken so far in the document by an IDAllocator, which maps the renamed IDs back to the original ones.
+
+    The segments are not modified. The style and region elements are shared with the segments unless their IDs have
+    to change.
+    """
 
     _document_segments = None
     _sequence_identifier = None
     _sequence_number = None
     _spliced_document = None
-    _dataset = None
+    _id_allocator = None
 
     def __init__(self, document_segments, sequence_identifier, sequence_number):
         if not document_segments:
             raise Exception()
-        self._document_segments = list(reversed(list(document_segments)))
+        self._document_segments = list(document_segments)
         self._sequence_identifier = sequence_identifier
         self._sequence_number = sequence_number
-        self._dataset = {
-            'ids': set()
-        }
+        self._id_allocator = IDAllocator()
         self._do_splice()
 
     @property
     def spliced_document(self):
         return self._spliced_document
 
+    @property
+    def id_allocator(self):
+        return self._id_allocator
+
+    def _merge_definitions(self, merged_head, head, container_name):
+        container = getattr(head, container_name)
+        if container is None:
+            return
+        merged_container = getattr(merged_head, container_name)
+        if merged_container is None:
+            merged_container = copy.copy(container)
+            setattr(merged_head, container_name, merged_container)
+        for item in container.orderedContent():
+            if not isinstance(item, ElementContent):
+                continue
+            definition = item.value
+            definition_id = self._id_allocator.allocate(definition.id)
+            if definition_id != definition.id:
+                definition = copy.copy(definition)
+                definition.id = definition_id
+            merged_container.append(definition)
+
+    def _copy_content(self, element, dest):
+        for item in element.orderedContent():
+            if isinstance(item, NonElementContent):
+                dest.append(item.value)
+            elif isinstance(item, ElementContent):
+                copied_elem = copy.copy(item.value)
+                copied_elem._resetContent()
+                self._copy_content(item.value, copied_elem)
+                if isinstance(copied_elem, IDMixin):
+                    copied_elem.id = self._id_allocator.allocate(copied_elem.id)
+                dest.append(copied_elem)
+
     def _do_splice(self):
 
-        first_doc = self._document_segments.pop()
-        first_tt = first_doc.binding
-
-        merged_tt = first_tt
-        merged_head = first_tt.head
-        merged_styling = first_tt.head.styling
-        merged_layout = first_tt.head.layout
-
-        merged_body = first_tt.body
-
-        while self._document_segments:
-            current_doc = self._document_segments.pop()
-            current_tt = current_doc.binding
-            merged_tt = merged_tt.merge(current_tt, self._dataset)
-
-            if merged_head:
-                merged_head = merged_head.merge(current_tt.head, self._dataset)
-                if merged_styling:
-                    merged_styling = merged_styling.merge(current_tt.head.styling, self._dataset)
-                else:
-                    merged_styling = current_tt.head.styling
-                if merged_layout:
-                    merged_layout = merged_layout.merge(current_tt.head.layout, self._dataset)
-                else:
-                    merged_layout = current_tt.head.layout
-            else:
-                merged_head = current_tt.head
-
-            if merged_body:
-                merged_body = merged_body.merge(current_tt.body, self._dataset)
-            else:
-                merged_body = current_tt.body
-
-        merged_head.layout = merged_layout
-        merged_head.styling = merged_styling
+        first_tt = self._document_segments[0].binding
+
+        merged_tt = copy.copy(first_tt)
+        merged_head = copy.copy(first_tt.head)
+        merged_head.metadata = first_tt.head.metadata
+
+        for segment in self._document_segments:
+            self._merge_definitions(merged_head, segment.binding.head, 'styling')
+            self._merge_definitions(merged_head, segment.binding.head, 'layout')
+
+        if len(self._document_segments) == 1:
+            merged_body = first_tt.body
+        else:
+            merged_body = copy.copy(first_tt.body)
+            merged_body.begin = None
+            merged_body.dur = None
+            merged_body.end = None
+            for segment in self._document_segments:
+                self._copy_content(segment.binding.body, merged_body)
 
         merged_tt.head = merged_head
         merged_tt.body = merged_body
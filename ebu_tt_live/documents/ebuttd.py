@@ -1,8 +1,10 @@
 import logging
-from xml.dom import minidom
+import copy
 from .base import SubtitleDocument, TimeBase
 from ebu_tt_live import bindings
+from ebu_tt_live.bindings import ebuttdt
 from ebu_tt_live.bindings.converters.ebutt3_ebuttd import EBUTT3EBUTTDConverter
+from pyxb.binding.basis import ElementContent, NonElementContent
 
 
 log = logging.getLogger(__name__)
@@ -12,6 +14,9 @@ document_logger = logging.getLogger('document_logger')
 class EBUTTDDocument(SubtitleDocument):
 
     _ebuttd_content = None
+    _root_element_renames = {
+        (bindings.Namespace.uri(), 'tt'): (bindings.Namespace.uri(), 'ttd')
+    }
 
     def __init__(self, lang):
         self._ebuttd_content = bindings.ttd(
@@ -24,18 +29,19 @@ class EBUTTDDocument(SubtitleDocument):
         )
 
     def validate(self):
+        self.invalidate_serialized()
         self._ebuttd_content.validateBinding()
 
     @classmethod
     def create_from_xml(cls, xml):
         # NOTE: This is a workaround to make the bindings accept separate root element identities
-        # for the same name. tt comes in but we rename it to ttd to make the xsd validate.
-        xml_dom = minidom.parseString(xml)
-        if xml_dom.documentElement.tagName == 'tt':
-            xml_dom.documentElement.tagName = 'ttd'
+        # for the same name. tt comes in but we rename it to ttd to make the xsd validate. The incremental parser
+        # renames the root element on the fly so there is no need for a DOM tree.
         instance = cls.create_from_raw_binding(
-            binding=bindings.CreateFromDOM(
-                xml_dom
+            binding=bindings.parse_document(
+                xml,
+                root_element_renames=cls._root_element_renames,
+                use_parsing_context=False
             )
         )
         return instance
@@ -46,8 +52,54 @@ class EBUTTDDocument(SubtitleDocument):
         instance._ebuttd_content = binding
         return instance
 
-    def get_xml(self):
+    def _serialize(self):
         return self._ebuttd_content.toxml()
 
     def get_dom(self):
         return self._ebuttd_content.toDOM()
+
+    @property
+    def binding(self):
+        return self._ebuttd_content
+
+
+def _copy_attributes(element):
+    # The EBU-TT-D bindings have no copy constructors
+    copied_element = type(element)()
+    for attribute_use in element._AttributeMap.values():
+        if attribute_use.provided(element):
+            attribute_use.set(copied_element, attribute_use.value(element))
+    return copied_element
+
+
+def _shift_element(element, offset):
+    copied_element = _copy_attributes(element)
+    if isinstance(element, (bindings.d_p_type, bindings.d_span_type)):
+        if element.begin is not None:
+            copied_element.begin = ebuttdt.FullClockTimingType(element.begin.timedelta + offset)
+        if element.end is not None:
+            copied_element.end = ebuttdt.FullClockTimingType(element.end.timedelta + offset)
+    for item in element.orderedContent():
+        if isinstance(item, NonElementContent):
+            copied_element.append(item.value)
+        elif isinstance(item, ElementContent):
+            copied_element.append(_shift_element(item.value, offset))
+    return copied_element
+
+
+def shift_document(document, offset):
+    """
+    Copy an EBU-TT-D document with its times shifted. The encoder makes the next segment this way when the content
+    does not change from the previous one. The head is shared with the original document.
+
+    :param document: EBUTTDDocument
+    :param offset: datetime.timedelta
+    :return: EBUTTDDocument
+    """
+    binding = document.binding
+    shifted_binding = _copy_attributes(binding)
+    shifted_binding.head = binding.head
+    if binding.body is not None:
+        shifted_binding.body = _shift_element(binding.body, offset)
+    shifted_binding._setElement(bindings.ttd)
+    return EBUTTDDocument.create_from_raw_binding(shifted_binding)
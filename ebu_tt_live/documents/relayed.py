@@ -0,0 +1,170 @@
+import logging
+import re
+from datetime import timedelta
+from xml.sax.saxutils import unescape
+from .base import SubtitleDocument
+from .ebutt3 import EBUTT3Document
+from ebu_tt_live.bindings import compact
+from ebu_tt_live.strings import ERR_DOCUMENT_HEADER_SNIFFING_FAILED, ERR_DOCUMENT_SEQUENCE_MISMATCH
+
+
+log = logging.getLogger(__name__)
+
+EBUTTP_NAMESPACE = 'urn:ebu:tt:parameters'
+
+# The XML declaration, comments, processing instructions and the document type declaration before the root element
+_prolog = re.compile(br'(?:\xef\xbb\xbf)?(?:\s+|<\?.*?\?>|<!--.*?-->|<!DOCTYPE[^>]*>)*', re.DOTALL)
+_root_start_tag = re.compile(br'<([A-Za-z_][\w.\-]*(?::[\w.\-]+)?)(\s[^>]*)?/?>')
+_attribute = re.compile(br'([A-Za-z_][\w.\-]*(?::[\w.\-]+)?)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+_entities = {'&quot;': '"', '&apos;': "'"}
+
+
+def sniff_xml_header(data):
+    """
+    Find the sequence identifier and the sequence number in the root element of an XML document without parsing
+    the rest of the document.
+    :param data: the encoded XML document
+    :return: tuple of sequence identifier and sequence number
+    :raises ValueError: if the header can not be found
+    """
+    match = _root_start_tag.match(data, _prolog.match(data).end())
+    if match is None or match.group(2) is None:
+        raise ValueError(ERR_DOCUMENT_HEADER_SNIFFING_FAILED)
+    prefixes = set()
+    values = {}
+    for name, double_quoted, single_quoted in _attribute.findall(match.group(2)):
+        value = unescape((double_quoted or single_quoted).decode('utf-8'), _entities)
+        prefix, _, local_name = name.decode('utf-8').rpartition(':')
+        if prefix == 'xmlns':
+            if value == EBUTTP_NAMESPACE:
+                prefixes.add(local_name)
+        elif local_name in ('sequenceIdentifier', 'sequenceNumber'):
+            values.setdefault(prefix, {})[local_name] = value
+    for prefix in prefixes:
+        header = values.get(prefix, {})
+        if 'sequenceIdentifier' in header and 'sequenceNumber' in header:
+            return header['sequenceIdentifier'], int(header['sequenceNumber'])
+    raise ValueError(ERR_DOCUMENT_HEADER_SNIFFING_FAILED)
+
+
+def sniff_compact_header(data):
+    """
+    Read the sequence identifier and the sequence number from the root element of a compact payload.
+    :param data: the compact payload
+    :return: tuple of sequence identifier and sequence number
+    :raises ValueError: if the header can not be found
+    """
+    attributes = compact.read_root_attributes(data)
+    try:
+        return (
+            attributes[(EBUTTP_NAMESPACE, 'sequenceIdentifier')],
+            int(attributes[(EBUTTP_NAMESPACE, 'sequenceNumber')])
+        )
+    except KeyError:
+        raise ValueError(ERR_DOCUMENT_HEADER_SNIFFING_FAILED)
+
+
+class RelayedDocument(SubtitleDocument):
+    """
+    A document that is passed on as it was received. Only the sequence identifier and the sequence number are read
+    from the payload, which is enough to route the document to the subscribers of its sequence. The payload is
+    parsed only if the document is converted to an EBUTT3Document.
+    """
+
+    _payload = None
+    _compact = None
+    _sequence_identifier = None
+    _sequence_number = None
+    _availability_time = None
+
+    def __init__(self, payload, sequence_identifier, sequence_number, availability_time=None):
+        self._payload = payload
+        self._compact = compact.is_compact(payload)
+        self._sequence_identifier = sequence_identifier
+        self._sequence_number = sequence_number
+        if availability_time is not None and not isinstance(availability_time, timedelta):
+            raise TypeError
+        self._availability_time = availability_time
+
+    @classmethod
+    def create_from_raw_data(cls, data, availability_time=None):
+        """
+        Wrap a received payload after reading its header.
+        :param data: the encoded XML document or the compact payload
+        :param availability_time: the availability time of the document as a timedelta
+        :raises ValueError: if the header can not be read
+        """
+        if compact.is_compact(data):
+            sequence_identifier, sequence_number = sniff_compact_header(data)
+        else:
+            if not isinstance(data, bytes):
+                data = data.encode('utf-8')
+            sequence_identifier, sequence_number = sniff_xml_header(data)
+        return cls(
+            payload=data,
+            sequence_identifier=sequence_identifier,
+            sequence_number=sequence_number,
+            availability_time=availability_time
+        )
+
+    def _cmp_key(self):
+        return self.sequence_number
+
+    def _cmp_checks(self, other):
+        if self.sequence_identifier != other.sequence_identifier:
+            raise ValueError(ERR_DOCUMENT_SEQUENCE_MISMATCH)
+
+    @property
+    def sequence_identifier(self):
+        return self._sequence_identifier
+
+    @property
+    def sequence_number(self):
+        return self._sequence_number
+
+    @property
+    def availability_time(self):
+        return self._availability_time
+
+    @property
+    def payload(self):
+        """
+        The payload as it was received.
+        """
+        return self._payload
+
+    @property
+    def compact(self):
+        """
+        True if the payload is in the compact encoding of the bindings.
+        """
+        return self._compact
+
+    def to_document(self):
+        """
+        Parse and validate the payload.
+        :return: EBUTT3Document
+        """
+        if self._compact:
+            return EBUTT3Document.create_from_compact(self._payload, availability_time=self._availability_time)
+        return EBUTT3Document.create_from_xml(self._payload, availability_time=self._availability_time)
+
+    def validate(self):
+        self.to_document()
+
+    def _serialize(self):
+        if self._compact:
+            return self.to_document().get_xml()
+        return self._payload.decode('utf-8')
+
+    def get_encoded_xml(self, encoding='utf-8'):
+        if not self._compact and encoding == 'utf-8':
+            return self._payload
+        return super(RelayedDocument, self).get_encoded_xml(encoding)
+
+    def __repr__(self):
+        return '<{name}: {sequence_identifier}_{sequence_number}>'.format(
+            name=self.__class__.__name__,
+            sequence_identifier=self._sequence_identifier,
+            sequence_number=self._sequence_number
+        )
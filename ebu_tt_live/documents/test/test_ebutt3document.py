@@ -1,6 +1,8 @@
 from unittest import TestCase
 from datetime import timedelta, datetime
 from ebu_tt_live.documents import EBUTT3Document
+from ebu_tt_live.bindings import tt_type, div_type, p_type, ebuttdt
+from mock import patch
 
 
 class TestEBUTT3Document(TestCase):
@@ -41,3 +43,62 @@ class TestEBUTT3Document(TestCase):
         # this syntax and not the "=" syntax, because of the way the "="
         # operator works in python
         self.assertRaises(TypeError, lambda: document.availability_time(1))
+
+    def test_availability_time_recomputes_timing(self):
+        document = EBUTT3Document("clock", 1, "testSeq1", "en-GB", "local")
+        document.set_end(ebuttdt.LimitedClockTimingType(timedelta(seconds=20)))
+        document.add_div(div_type(p_type(id='ID1', begin=ebuttdt.LimitedClockTimingType(timedelta(seconds=5)))))
+        document.validate()
+        self.assertTrue(document.validated)
+
+        with patch.object(tt_type, 'validateBinding') as validate_binding:
+            document.availability_time = timedelta(seconds=10)
+            self.assertFalse(validate_binding.called)
+        self.assertEqual(document.computed_begin_time, timedelta(seconds=10))
+        self.assertEqual(document.computed_end_time, timedelta(seconds=20))
+        paragraph = document.binding.body.div[0].p[0]
+        self.assertEqual(paragraph.computed_begin_time, timedelta(seconds=10))
+        self.assertEqual(document.lookup_range_on_timeline(), [paragraph])
+
+        document.ensure_validated()
+        document.add_div(div_type())
+        self.assertFalse(document.validated)
+        with patch.object(tt_type, 'validateBinding') as validate_binding:
+            document.ensure_validated()
+            self.assertTrue(validate_binding.called)
+
+    def test_serialized_once(self):
+        document = EBUTT3Document("clock", 1, "testSeq1", "en-GB", "local")
+        with patch.object(tt_type, 'toxml', autospec=True, side_effect=tt_type.toxml) as toxml:
+            xml = document.get_xml()
+            payload = document.get_encoded_xml()
+            self.assertIs(document.get_encoded_xml(), payload)
+            self.assertIs(document.get_xml(), xml)
+            self.assertEqual(toxml.call_count, 1)
+        self.assertEqual(payload, xml.encode('utf-8'))
+
+    def test_byte_size(self):
+        document = EBUTT3Document("clock", 1, "testSeq1", "en-GB", "local")
+        document.add_div(div_type(p_type(u'Fish & chips \xe9\xe8', id='ID1')))
+        xml = document.get_xml()
+        self.assertEqual(document.byte_size, len(document.get_encoded_xml()))
+        self.assertGreater(document.byte_size, len(xml))
+        # Text input is measured encoded, like the serialized document
+        self.assertEqual(EBUTT3Document.create_from_xml(xml).byte_size, document.byte_size)
+        self.assertEqual(EBUTT3Document.create_from_xml(xml.encode('utf-8')).byte_size, document.byte_size)
+
+    def test_serialized_invalidation(self):
+        document = EBUTT3Document("clock", 1, "testSeq1", "en-GB", "local")
+        payload = document.get_encoded_xml()
+        document.add_div(div_type(p_type('Text', id='ID1')))
+        updated_payload = document.get_encoded_xml()
+        self.assertNotEqual(updated_payload, payload)
+        self.assertIn('ID1', updated_payload)
+
+        document.sequence_number = 2
+        self.assertIn('sequenceNumber="2"', document.get_encoded_xml())
+
+        # Direct modifications of the binding are picked up by the next validation
+        document.binding.body.div[0].p[0].id = 'ID2'
+        document.validate()
+        self.assertIn('ID2', document.get_encoded_xml())
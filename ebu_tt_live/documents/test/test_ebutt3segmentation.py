@@ -1,11 +1,17 @@
 
 from unittest import TestCase
 from datetime import timedelta
+from jinja2 import Template
+import os
+import pytest
+import time
 from ebu_tt_live import bindings
 from ebu_tt_live.bindings import ebuttdt as datatypes
 from ebu_tt_live.bindings import ebuttm as metadata
 from ebu_tt_live.documents.converters import ebutt3_to_ebuttd
 from ebu_tt_live.documents.ebutt3 import EBUTT3Document
+from ebu_tt_live.documents.ebutt3_segmentation import EBUTT3Segmenter
+from ebu_tt_live.documents.ebutt3_splicer import EBUTT3Splicer
 from ebu_tt_live.bindings import div_type, p_type, span_type, br_type, ebuttdt
 
 
@@ -171,3 +177,131 @@ class TestEBUTT3DocumentSegment(TestCase):
         self.assertIsInstance(cdoc.get_element_by_id('SEQ1.ID005'), bindings.p_type)
         self.assertRaises(LookupError, cdoc.get_element_by_id, 'SEQ1.span1')
         self.assertIsInstance(cdoc.get_element_by_id('SEQ1.span2'), bindings.span_type)
+
+
+segmentation_template_path = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'testing', 'bdd', 'templates', 'segmentation.xml'
+)
+
+paragraph_template = \
+    '<tt:p xml:id="p{index}" begin="{begin}s" end="{end}s">' \
+    '<tt:span style="style4" xml:id="p{index}s1">Line one of {index}</tt:span><tt:br/>' \
+    '<tt:span xml:id="p{index}s2">Line two of {index}</tt:span>' \
+    '</tt:p>'
+
+
+def _segmentation_document(paragraph_count=0, chained_styles=False):
+    """
+    The document of the segmentation scenarios with a paragraph every second after the first 10 seconds.
+    """
+    with open(segmentation_template_path) as template_file:
+        xml = Template(template_file.read()).render(
+            sequence_identifier='testSegmentation',
+            sequence_number=1,
+            span1_begin='00:00:01',
+            span1_end='00:00:02',
+            span2_begin='00:00:03',
+            span2_end='00:00:04',
+            span3_begin='00:00:05',
+            span3_end='00:00:06'
+        )
+    paragraphs = ''.join(
+        paragraph_template.format(index=index, begin=10 + index, end=11 + index) for index in range(paragraph_count)
+    )
+    xml = xml.replace('</tt:div>', paragraphs + '</tt:div>')
+    if chained_styles:
+        xml = xml.replace('xml:id="style4"', 'style="style3" xml:id="style4"')
+    return EBUTT3Document.create_from_xml(xml)
+
+
+def _copy_segment(document, begin, end):
+    # The segmentation before the structural sharing
+    segmenter = EBUTT3Segmenter(document, begin=begin, end=end, deconflict_ids=True)
+    return EBUTT3Document.create_from_raw_binding(segmenter.segment)
+
+
+class TestSharingSegmenter(TestCase):
+
+    def test_same_segments(self):
+        document = _segmentation_document(paragraph_count=5)
+        for second in list(range(1, 6)) + list(range(10, 15)):
+            begin = timedelta(seconds=second)
+            end = timedelta(seconds=second + 1)
+            self.assertEqual(
+                document.extract_segment(begin=begin, end=end, deconflict_ids=True).get_xml(),
+                _copy_segment(document, begin=begin, end=end).get_xml()
+            )
+
+    def test_head_elements_shared(self):
+        document = _segmentation_document(paragraph_count=2)
+        segment1 = document.extract_segment(begin=timedelta(seconds=10), end=timedelta(seconds=11),
+                                            deconflict_ids=True)
+        segment2 = document.extract_segment(begin=timedelta(seconds=11), end=timedelta(seconds=12),
+                                            deconflict_ids=True)
+        self.assertIs(segment1.get_element_by_id('SEQ1.style4'), segment2.get_element_by_id('SEQ1.style4'))
+        self.assertIs(segment1.get_element_by_id('SEQ1.region1'), segment2.get_element_by_id('SEQ1.region1'))
+        self.assertIsNot(segment1.binding.body, segment2.binding.body)
+        self.assertIsNot(segment1.binding.head.styling, segment2.binding.head.styling)
+
+        # The copies with the original IDs are kept apart
+        segment3 = document.extract_segment(begin=timedelta(seconds=10), end=timedelta(seconds=11))
+        self.assertEqual(segment3.get_element_by_id('style4').id, 'style4')
+
+        # Validating the document again drops the shared copies
+        document.validate()
+        segment4 = document.extract_segment(begin=timedelta(seconds=10), end=timedelta(seconds=11),
+                                            deconflict_ids=True)
+        self.assertIsNot(segment1.get_element_by_id('SEQ1.style4'), segment4.get_element_by_id('SEQ1.style4'))
+
+    def test_chained_styles(self):
+        document = _segmentation_document(chained_styles=True)
+        for _ in range(2):
+            segment = document.extract_segment(begin=timedelta(seconds=1), end=timedelta(seconds=2),
+                                               deconflict_ids=True)
+            self.assertEqual(segment.get_element_by_id('SEQ1.style4').style, ['SEQ1.style3'])
+        # The document keeps its own references
+        self.assertEqual(document.get_element_by_id('style4').style, ['style3'])
+
+    def test_unvalidated_segment(self):
+        document = _segmentation_document()
+        segment = document.extract_segment(begin=timedelta(seconds=1), end=timedelta(seconds=2), validate=False)
+        self.assertFalse(segment.validated)
+        segment.validate()
+        self.assertEqual(segment.computed_begin_time, timedelta(seconds=1))
+
+
+@pytest.mark.benchmark
+class TestSegmentationThroughput(TestCase):
+    """
+    Compares the sharing segmenter with the copying one on the document of the segmentation scenarios, short and
+    with 300 paragraphs. The spliced figures include the splicing and the validation of the result as an EBU-TT-D
+    encoder does it. The figures are only reported.
+    """
+
+    def _segments_per_second(self, extract, document, first_second, segment_count):
+        start = time.time()
+        for second in range(first_second, first_second + segment_count):
+            extract(document, timedelta(seconds=second), timedelta(seconds=second + 1))
+        return segment_count / (time.time() - start)
+
+    def _spliced(self, segments):
+        splicer = EBUTT3Splicer(segments, sequence_identifier='testSegmentation_resegmented', sequence_number=1)
+        return EBUTT3Document.create_from_raw_binding(splicer.spliced_document)
+
+    def test_throughput(self):
+        def copying(document, begin, end):
+            return self._spliced([_copy_segment(document, begin, end)])
+
+        def sharing(document, begin, end):
+            return self._spliced([
+                document.extract_segment(begin=begin, end=end, deconflict_ids=True, validate=False)
+            ])
+
+        # The segments cover the subtitles, the first paragraph begins at 10 seconds
+        for paragraph_count, first_second, segment_count in [(0, 1, 5), (300, 10, 60)]:
+            document = _segmentation_document(paragraph_count=paragraph_count)
+            copying_rate = self._segments_per_second(copying, document, first_second, segment_count)
+            sharing_rate = self._segments_per_second(sharing, document, first_second, segment_count)
+            print('{} paragraphs, spliced segments: copying {:.1f}/second, sharing {:.1f}/second'.format(
+                paragraph_count, copying_rate, sharing_rate
+            ))
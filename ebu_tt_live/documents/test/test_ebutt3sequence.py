@@ -1,6 +1,6 @@
 from unittest import TestCase
 from datetime import timedelta, datetime
-from ebu_tt_live.documents import EBUTT3Document, EBUTT3DocumentSequence
+from ebu_tt_live.documents import EBUTT3Document, EBUTT3DocumentSequence, RetentionPolicy, SegmentCache
 from ebu_tt_live.clocks.local import LocalMachineClock
 from ebu_tt_live.bindings._ebuttdt import LimitedClockTimingType
 
@@ -87,3 +87,176 @@ class TestEBUTT3Sequence(TestCase):
     def test_increasing_sequence_number(self):
         self.assertGreater(self.document2.sequence_number, self.document1.sequence_number)
         self.assertGreater(self.document3.sequence_number, self.document2.sequence_number)
+
+    def test_resolved_times_after_discard_before(self):
+        self.sequence.add_document(self.document1)
+        self.sequence.add_document(self.document2)
+        self.sequence.add_document(self.document3)
+
+        self.sequence.discard_before(self.document2)
+
+        self.assertRaises(LookupError, self.sequence.resolved_begin_time, self.document1)
+        self.assertEqual(self.document1.resolved_end_time, timedelta())
+        self.assertEqual(self.document2.resolved_begin_time, timedelta(seconds=3))
+        self.assertEqual(self.document2.resolved_end_time, timedelta(seconds=4))
+        self.assertEqual(self.document3.resolved_begin_time, timedelta(seconds=5))
+        self.assertEqual(self.document3.resolved_end_time, timedelta(seconds=6))
+
+
+class TestEBUTT3SequenceRetention(TestCase):
+
+    def _create_document(self, begin, end=None):
+        doc = self.sequence.new_document()
+        doc.set_begin(LimitedClockTimingType(timedelta(seconds=begin)))
+        if end is not None:
+            doc.set_end(LimitedClockTimingType(timedelta(seconds=end)))
+        doc.availability_time = timedelta()
+        return doc
+
+    def _create_sequence(self, **kwargs):
+        self.reference_clock = LocalMachineClock()
+        self.reference_clock.set_fixed_time(timedelta(seconds=10))
+        self.reference_clock.set_fixed_time_mode(True)
+        self.sequence = EBUTT3DocumentSequence(
+            sequence_identifier='sequenceTesting',
+            reference_clock=self.reference_clock,
+            lang='en-GB',
+            retention_policy=RetentionPolicy(**kwargs)
+        )
+
+    def test_max_documents(self):
+        self._create_sequence(max_documents=2)
+        documents = [self._create_document(begin) for begin in range(1, 6)]
+        for doc in documents:
+            self.sequence.add_document(doc)
+
+        self.assertEqual(self.sequence.document_count, 2)
+        self.assertEqual(len(self.sequence.timeline), 3)
+        # Evicted documents remember how they were resolved
+        for index, doc in enumerate(documents[:3]):
+            self.assertEqual(doc.resolved_begin_time, timedelta(seconds=index + 1))
+            self.assertEqual(doc.resolved_end_time, timedelta(seconds=index + 2))
+            self.assertFalse(doc.discarded)
+        # The survivors are untouched
+        self.assertEqual(documents[3].resolved_begin_time, timedelta(seconds=4))
+        self.assertEqual(documents[3].resolved_end_time, timedelta(seconds=5))
+        self.assertEqual(documents[4].resolved_begin_time, timedelta(seconds=5))
+        self.assertIsNone(documents[4].resolved_end_time)
+        self.assertEqual(self.sequence.lookup_range_on_timeline(), documents[3:])
+
+    def test_max_age(self):
+        self._create_sequence(max_age=timedelta(seconds=5))
+        documents = [self._create_document(begin, begin + 1) for begin in range(0, 10, 2)]
+        for doc in documents:
+            self.sequence.add_document(doc)
+
+        # Documents ending at or before 00:00:05 are gone
+        self.assertEqual(self.sequence.lookup_range_on_timeline(), documents[3:])
+        self.reference_clock.set_fixed_time(timedelta(seconds=100))
+        self.sequence.apply_retention_policy()
+        # The last one is always kept
+        self.assertEqual(self.sequence.lookup_range_on_timeline(), documents[4:])
+
+    def test_max_bytes(self):
+        self._create_sequence(max_bytes=1)
+        documents = [self._create_document(begin) for begin in range(1, 4)]
+        for doc in documents:
+            self.sequence.add_document(doc)
+        self.assertEqual(self.sequence.document_count, 1)
+        self.assertEqual(self.sequence.retained_bytes, documents[2].byte_size)
+
+    def test_no_limits(self):
+        self._create_sequence()
+        for begin in range(1, 6):
+            self.sequence.add_document(self._create_document(begin))
+        self.assertEqual(self.sequence.document_count, 5)
+
+
+cache_document_template = """<?xml version="1.0" ?>
+<tt:tt ebuttp:sequenceIdentifier="cacheTesting" ebuttp:sequenceNumber="{sequence_number}" ttp:timeBase="media"
+        tts:extent="800px 600px" xml:lang="en-GB" xmlns:ebuttm="urn:ebu:tt:metadata"
+        xmlns:ebuttp="urn:ebu:tt:parameters" xmlns:tt="http://www.w3.org/ns/ttml"
+        xmlns:ttp="http://www.w3.org/ns/ttml#parameter" xmlns:tts="http://www.w3.org/ns/ttml#styling"
+        xmlns:xml="http://www.w3.org/XML/1998/namespace">
+  <tt:head>
+    <tt:metadata><ebuttm:documentMetadata/></tt:metadata>
+    <tt:styling><tt:style tts:color="red" xml:id="style1"/></tt:styling>
+    <tt:layout><tt:region tts:extent="300px 150px" tts:origin="200px 450px" xml:id="region1"/></tt:layout>
+  </tt:head>
+  <tt:body begin="{begin}"{end}>
+    <tt:div region="region1">
+      <tt:p xml:id="p1"><tt:span style="style1" xml:id="span1">Subtitle {sequence_number}</tt:span></tt:p>
+      <tt:p xml:id="p2" begin="{change}"><tt:span xml:id="span2">Second line</tt:span></tt:p>
+    </tt:div>
+  </tt:body>
+</tt:tt>"""
+
+
+class TestSegmentCache(TestCase):
+
+    def _create_sequence(self, segment_cache=None):
+        # Two long-running documents, the second line of each appears 2 seconds after the document begins. The
+        # second one ends the first one.
+        documents = [
+            EBUTT3Document.create_from_xml(cache_document_template.format(
+                sequence_number=sequence_number, begin=begin, end=end, change='2s'
+            ), availability_time=timedelta())
+            for sequence_number, begin, end in [(1, '0s', ''), (2, '10s', ' end="20s"')]
+        ]
+        sequence = EBUTT3DocumentSequence.create_from_document(documents[0], segment_cache=segment_cache)
+        for document in documents:
+            sequence.add_document(document)
+        return sequence
+
+    def _segments(self, sequence, interval):
+        return [
+            sequence.extract_segment(begin=timedelta(seconds=begin), end=timedelta(seconds=begin + interval))
+            for begin in range(0, 20, interval)
+        ]
+
+    def test_same_segments(self):
+        for interval in [1, 3]:
+            segment_cache = SegmentCache()
+            cached_sequence = self._create_sequence(segment_cache=segment_cache)
+            self.assertIs(cached_sequence.segment_cache, segment_cache)
+            for segment, cached_segment in zip(
+                    self._segments(self._create_sequence(), interval), self._segments(cached_sequence, interval)):
+                self.assertEqual(segment.get_xml(), cached_segment.get_xml())
+
+    def test_shifted_hits(self):
+        segment_cache = SegmentCache()
+        self._segments(self._create_sequence(segment_cache=segment_cache), 1)
+        # 0-2 and 10-12 show the first line only, 2-10 and 12-20 both lines
+        self.assertEqual(segment_cache.misses, 4)
+        self.assertEqual(segment_cache.shifted_hits, 16)
+        self.assertEqual(segment_cache.hits, 0)
+        self.assertEqual(segment_cache.hit_rate, 0.8)
+
+    def test_hits(self):
+        segment_cache = SegmentCache()
+        sequence = self._create_sequence(segment_cache=segment_cache)
+        segment = sequence.extract_segment(begin=timedelta(seconds=1), end=timedelta(seconds=4))
+        self.assertEqual(segment_cache.misses, 1)
+        self.assertEqual(
+            sequence.extract_segment(begin=timedelta(seconds=1), end=timedelta(seconds=4)).get_xml(),
+            segment.get_xml()
+        )
+        self.assertEqual(segment_cache.hits, 1)
+        self.assertEqual(str(segment_cache), '1 hits, 0 shifted hits, 1 misses: 50.0% hit rate')
+
+    def test_eviction(self):
+        segment_cache = SegmentCache(max_size=2)
+        sequence = self._create_sequence(segment_cache=segment_cache)
+        for begin in [0, 1, 2, 0]:
+            sequence.extract_segment(begin=timedelta(seconds=begin), end=timedelta(seconds=begin + 2))
+        # 0-2 was evicted by the time it was asked again but the subtitles span it so it is made from its spanned
+        # entry again
+        self.assertEqual(segment_cache.misses, 3)
+        self.assertEqual(segment_cache.shifted_hits, 1)
+        self.assertEqual(len(segment_cache), 2)
+
+        segment_cache.clear()
+        self.assertEqual(len(segment_cache), 0)
+
+    def test_max_size(self):
+        self.assertRaises(ValueError, SegmentCache, max_size=0)
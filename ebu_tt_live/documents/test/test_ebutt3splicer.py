@@ -0,0 +1,123 @@
+from unittest import TestCase
+from datetime import timedelta
+import copy
+import pytest
+import time
+from ebu_tt_live.bindings import tt
+from ebu_tt_live.documents import EBUTT3Document
+from ebu_tt_live.documents.ebutt3_segmentation import copy_segment_head
+from ebu_tt_live.documents.ebutt3_splicer import EBUTT3Splicer
+from ebu_tt_live.utils import IDAllocator
+
+
+document_template = """<?xml version="1.0" ?>
+<tt:tt ebuttp:sequenceIdentifier="spliceTesting" ebuttp:sequenceNumber="{sequence_number}" ttp:timeBase="media"
+        tts:extent="800px 600px" xml:lang="en-GB" xmlns:ebuttm="urn:ebu:tt:metadata"
+        xmlns:ebuttp="urn:ebu:tt:parameters" xmlns:tt="http://www.w3.org/ns/ttml"
+        xmlns:ttp="http://www.w3.org/ns/ttml#parameter" xmlns:tts="http://www.w3.org/ns/ttml#styling"
+        xmlns:xml="http://www.w3.org/XML/1998/namespace">
+  <tt:head>
+    <tt:metadata><ebuttm:documentMetadata/></tt:metadata>
+    <tt:styling><tt:style tts:color="red" xml:id="style1"/></tt:styling>
+    <tt:layout><tt:region tts:extent="300px 150px" tts:origin="200px 450px" xml:id="region1"/></tt:layout>
+  </tt:head>
+  <tt:body begin="{begin}s" end="{end}s">
+    <tt:div region="region1">
+      <tt:p xml:id="p1"><tt:span style="style1" xml:id="span1">Subtitle {sequence_number}</tt:span></tt:p>
+    </tt:div>
+  </tt:body>
+</tt:tt>"""
+
+
+def _segments(count, deconflict_ids=True):
+    segments = []
+    for sequence_number in range(1, count + 1):
+        document = EBUTT3Document.create_from_xml(
+            document_template.format(sequence_number=sequence_number, begin=sequence_number, end=sequence_number + 1)
+        )
+        segments.append(document.extract_segment(deconflict_ids=deconflict_ids, validate=False))
+    return segments
+
+
+def _pairwise_splice(segments):
+    # The splicing before the single pass: every merge copies the body accumulated so far again
+    dataset = {'ids': IDAllocator()}
+    first_tt = segments[0].binding
+    merged_head = copy_segment_head(first_tt.head)
+    merged_styling = merged_head.styling
+    merged_layout = merged_head.layout
+    merged_body = first_tt.body
+    for segment in segments[1:]:
+        current_tt = segment.binding
+        merged_styling = merged_styling.merge(current_tt.head.styling, dataset)
+        merged_layout = merged_layout.merge(current_tt.head.layout, dataset)
+        merged_body = merged_body.merge(current_tt.body, dataset)
+    merged_tt = copy.copy(first_tt)
+    merged_tt.head = merged_head
+    merged_tt.body = merged_body
+    merged_tt.sequenceIdentifier = 'spliceTesting_resegmented'
+    merged_tt.sequenceNumber = 1
+    merged_tt._setElement(tt)
+    return merged_tt
+
+
+class TestEBUTT3Splicer(TestCase):
+
+    def _splice(self, segments):
+        splicer = EBUTT3Splicer(segments, sequence_identifier='spliceTesting_resegmented', sequence_number=1)
+        return EBUTT3Document.create_from_raw_binding(splicer.spliced_document)
+
+    def test_ids_kept(self):
+        segments = _segments(3)
+        segment_xml = [segment.get_xml() for segment in segments]
+        spliced = self._splice(segments)
+        for sequence_number in range(1, 4):
+            for elem_id in ['style1', 'region1', 'p1', 'span1']:
+                spliced.get_element_by_id('SEQ{}.{}'.format(sequence_number, elem_id))
+        self.assertEqual(spliced.computed_begin_time, timedelta(seconds=1))
+        self.assertEqual(spliced.computed_end_time, timedelta(seconds=4))
+        # The segments are left as they were, their styles are shared
+        self.assertEqual([segment.get_xml() for segment in segments], segment_xml)
+        self.assertIs(spliced.get_element_by_id('SEQ2.style1'), segments[1].binding.head.styling.style[0])
+
+    def test_colliding_ids(self):
+        segments = _segments(2, deconflict_ids=False)
+        spliced = self._splice(segments)
+        for elem_id in ['style1', 'region1', 'p1', 'span1']:
+            spliced.get_element_by_id(elem_id)
+            spliced.get_element_by_id('{}.1'.format(elem_id))
+        # A definition is copied to change its ID
+        self.assertEqual(segments[1].binding.head.styling.style[0].id, 'style1')
+
+    def test_repeated_collisions(self):
+        segments = _segments(20, deconflict_ids=False)
+        splicer = EBUTT3Splicer(segments, sequence_identifier='spliceTesting_resegmented', sequence_number=1)
+        spliced = EBUTT3Document.create_from_raw_binding(splicer.spliced_document)
+        spliced.get_element_by_id('span1.19')
+        self.assertEqual(splicer.id_allocator.original_id('span1.19'), 'span1')
+        # The pairwise merges keep the IDs of the body merged into so the IDs stay short
+        merged = EBUTT3Document.create_from_raw_binding(_pairwise_splice(segments))
+        span_ids = [span.id for div in merged.binding.body.div for p in div.p for span in p.span]
+        self.assertEqual(len(set(span_ids)), len(segments))
+        self.assertLessEqual(max(len(span_id) for span_id in span_ids), len('span1.999'))
+
+    def test_same_as_pairwise(self):
+        segments = _segments(2)
+        self.assertEqual(
+            self._splice(segments).get_xml(),
+            EBUTT3Document.create_from_raw_binding(_pairwise_splice(segments)).get_xml()
+        )
+
+    @pytest.mark.benchmark
+    def test_benchmark(self):
+        # The pairwise splicing takes seconds already
+        segments = _segments(100)
+        start = time.time()
+        _pairwise_splice(segments)
+        pairwise_time = time.time() - start
+        start = time.time()
+        EBUTT3Splicer(segments, sequence_identifier='spliceTesting_resegmented', sequence_number=1)
+        single_pass_time = time.time() - start
+        print('Splicing {} segments: pairwise {:.3f}s, single pass {:.3f}s'.format(
+            len(segments), pairwise_time, single_pass_time
+        ))
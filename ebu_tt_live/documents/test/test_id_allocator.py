@@ -0,0 +1,94 @@
+from unittest import TestCase
+import pytest
+import time
+from ebu_tt_live.utils import IDAllocator
+
+
+def _suffix_allocate(ids, elem_id):
+    # The deconfliction before the allocator: one more suffix for every collision
+    while elem_id in ids:
+        elem_id = '{}.1'.format(elem_id)
+    ids.add(elem_id)
+    return elem_id
+
+
+class TestIDAllocator(TestCase):
+
+    def test_free_id_kept(self):
+        allocator = IDAllocator()
+        self.assertEqual(allocator.allocate('p1'), 'p1')
+        self.assertIn('p1', allocator)
+        self.assertEqual(allocator.original_id('p1'), 'p1')
+        self.assertIsNone(allocator.allocate(None))
+        self.assertEqual(len(allocator), 1)
+
+    def test_taken_id_counted(self):
+        allocator = IDAllocator()
+        self.assertEqual([allocator.allocate('p1') for _ in range(4)], ['p1', 'p1.1', 'p1.2', 'p1.3'])
+        self.assertEqual(allocator.original_id('p1.3'), 'p1')
+
+    def test_taken_suffix_skipped(self):
+        allocator = IDAllocator()
+        allocator.reserve('p1')
+        allocator.reserve('p1.1')
+        self.assertEqual(allocator.allocate('p1'), 'p1.2')
+        self.assertEqual(allocator.original_id('p1.2'), 'p1')
+        # An element with a suffixed ID is renamed from its own ID
+        self.assertEqual(allocator.allocate('p1.2'), 'p1.2.1')
+        self.assertEqual(allocator.original_id('p1.2.1'), 'p1.2')
+
+    def test_input_like_suffix(self):
+        allocator = IDAllocator()
+        self.assertEqual(allocator.allocate('x'), 'x')
+        self.assertEqual(allocator.allocate('x'), 'x.1')
+        # This element's ID is x.1, it is not another x
+        self.assertEqual(allocator.allocate('x.1'), 'x.1.1')
+        self.assertEqual(allocator.original_id('x.1'), 'x')
+        self.assertEqual(allocator.original_id('x.1.1'), 'x.1')
+        # The next x skips nothing it does not have to
+        self.assertEqual(allocator.allocate('x'), 'x.2')
+        self.assertEqual(allocator.original_id('x.2'), 'x')
+
+    def test_unique_and_bounded(self):
+        allocator = IDAllocator()
+        elem_ids = ['p{}'.format(index % 10) for index in range(1000)]
+        allocated = [allocator.allocate(elem_id) for elem_id in elem_ids]
+        self.assertEqual(len(set(allocated)), len(allocated))
+        self.assertLessEqual(max(len(elem_id) for elem_id in allocated), len('p0.99'))
+        self.assertEqual([allocator.original_id(elem_id) for elem_id in allocated], elem_ids)
+
+    def test_stable(self):
+        elem_ids = ['p{}'.format(index % 7) for index in range(100)]
+        first = IDAllocator()
+        second = IDAllocator()
+        self.assertEqual(
+            [first.allocate(elem_id) for elem_id in elem_ids],
+            [second.allocate(elem_id) for elem_id in elem_ids]
+        )
+
+    def test_sequence_id(self):
+        allocator = IDAllocator()
+        qualified_id = allocator.sequence_id('p1', 3)
+        self.assertEqual(qualified_id, 'SEQ3.p1')
+        self.assertIs(allocator.sequence_id('p1', 3), qualified_id)
+        self.assertEqual(allocator.original_id(qualified_id), 'p1')
+        # Qualified IDs are not taken
+        self.assertNotIn(qualified_id, allocator)
+
+    @pytest.mark.benchmark
+    def test_benchmark(self):
+        merges = 1000
+        start = time.time()
+        ids = set()
+        suffixed = [_suffix_allocate(ids, 'span1') for _ in range(merges)]
+        suffix_time = time.time() - start
+        start = time.time()
+        allocator = IDAllocator()
+        counted = [allocator.allocate('span1') for _ in range(merges)]
+        allocator_time = time.time() - start
+        self.assertEqual(len(set(counted)), merges)
+        print('Deconflicting {} merges of an ID: suffixes {:.3f}s (longest {} characters), '
+              'allocator {:.3f}s (longest {} characters)'.format(
+                  merges, suffix_time, max(len(elem_id) for elem_id in suffixed),
+                  allocator_time, max(len(elem_id) for elem_id in counted)
+              ))
@@ -1,12 +1,13 @@
 
 from unittest import TestCase
-from ebu_tt_live.documents import EBUTT3Document, EBUTT3DocumentSequence
+from ebu_tt_live.documents import EBUTT3Document, EBUTT3DocumentSequence, RetentionPolicy
 from ebu_tt_live.bindings import ebuttdt
 import gc
 import os
 from datetime import timedelta
 from jinja2 import Environment, FileSystemLoader, Template
 import weakref
+import resource
 
 
 raw_template = """<?xml version="1.0" ?>
@@ -186,4 +187,44 @@ class TestDocumentLeaks(TestCase):
         self.assertIsInstance(doc_refs[1](), EBUTT3Document)
         self.assertIsInstance(doc_refs[2](), EBUTT3Document)
 
+    def _get_rss(self):
+        # Current resident set size in kilobytes. Linux only, falling back to the peak on other platforms.
+        try:
+            with open('/proc/self/statm') as statm:
+                return int(statm.read().split()[1]) * resource.getpagesize() // 1024
+        except IOError:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def test_retention_policy_steady_state(self):
+        # A synthetic 24 hour feed with a new document every 5 minutes. The sequence keeps the last hour.
+        interval = timedelta(minutes=5)
+        document_count = int(timedelta(hours=24).total_seconds() / interval.total_seconds())
+        retention_policy = RetentionPolicy(max_documents=12, max_age=timedelta(hours=1))
+
+        doc1 = self._generate_document(sequence_number=1)
+        sequence = EBUTT3DocumentSequence.create_from_document(doc1, retention_policy=retention_policy)
+        sequence.reference_clock.set_fixed_time(timedelta())
+        sequence.reference_clock.set_fixed_time_mode(True)
+        sequence.add_document(doc1)
+        del doc1
+
+        doc_refs = []
+        rss_samples = []
+        for number in xrange(2, document_count + 1):
+            offset = interval * (number - 1)
+            sequence.reference_clock.set_fixed_time(offset)
+            doc = self._generate_document(sequence_number=number, offset=offset)
+            doc_refs.append(weakref.ref(doc))
+            sequence.add_document(doc)
+            del doc
+            if number % 24 == 0:
+                gc.collect()
+                rss_samples.append(self._get_rss())
 
+        gc.collect()
+        self.assertLessEqual(sequence.document_count, 12)
+        alive = [item for item in doc_refs if item() is not None]
+        self.assertLessEqual(len(alive), 12)
+        # Steady state: the second half of the day does not grow the memory footprint noticeably.
+        half = len(rss_samples) // 2
+        self.assertLess(max(rss_samples[half:]) - max(rss_samples[:half]), 10 * 1024)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from datetime import timedelta
+from ebu_tt_live.documents import EBUTT3Document, RelayedDocument
+from ebu_tt_live.documents.relayed import sniff_xml_header, sniff_compact_header
+
+
+header_template = u'''<?xml version="1.0" encoding="UTF-8"?>
+<!-- <tt:tt ebuttp:sequenceIdentifier="Comment" ebuttp:sequenceNumber="0"> -->
+<{tag} {attributes}>
+  <tt:head/>
+</{tag}>'''
+
+
+class TestHeaderSniffing(TestCase):
+
+    def _sniff(self, attributes, tag='tt:tt'):
+        return sniff_xml_header(header_template.format(tag=tag, attributes=attributes).encode('utf-8'))
+
+    def test_sniff_xml_header(self):
+        self.assertEqual(
+            self._sniff('xmlns:ebuttp="urn:ebu:tt:parameters" ebuttp:sequenceIdentifier="Seq1"\n'
+                        '    ebuttp:sequenceNumber="12"'),
+            (u'Seq1', 12)
+        )
+
+    def test_other_prefix_and_quotes(self):
+        self.assertEqual(
+            self._sniff("p:sequenceNumber='3' xmlns:p='urn:ebu:tt:parameters' p:sequenceIdentifier='A &amp; B'",
+                        tag='tt'),
+            (u'A & B', 3)
+        )
+
+    def test_non_ascii_identifier(self):
+        self.assertEqual(
+            self._sniff(u'xmlns:ebuttp="urn:ebu:tt:parameters" ebuttp:sequenceIdentifier="Séquence" '
+                        u'ebuttp:sequenceNumber="1"'),
+            (u'Séquence', 1)
+        )
+
+    def test_header_missing(self):
+        self.assertRaises(ValueError, self._sniff, 'xmlns:ebuttp="urn:ebu:tt:parameters" ebuttp:sequenceNumber="1"')
+        # The prefix is not bound to the parameters namespace
+        self.assertRaises(ValueError, self._sniff,
+                          'xmlns:x="urn:other" x:sequenceIdentifier="Seq1" x:sequenceNumber="1"')
+        self.assertRaises(ValueError, sniff_xml_header, b'not a document')
+        self.assertRaises(ValueError, sniff_xml_header, b'<!-- <tt:tt xmlns:ebuttp="urn:ebu:tt:parameters" '
+                                                        b'ebuttp:sequenceIdentifier="Seq1" ebuttp:sequenceNumber="1">')
+
+    def test_document_header(self):
+        document = EBUTT3Document('clock', 5, 'TestSequence1', 'en-GB', 'local')
+        self.assertEqual(sniff_xml_header(document.get_encoded_xml()), (u'TestSequence1', 5))
+        self.assertEqual(sniff_compact_header(document.get_compact()), (u'TestSequence1', 5))
+
+
+class TestRelayedDocument(TestCase):
+
+    def setUp(self):
+        self.document = EBUTT3Document('clock', 5, 'TestSequence1', 'en-GB', 'local')
+
+    def test_xml_payload(self):
+        payload = self.document.get_encoded_xml()
+        relayed = RelayedDocument.create_from_raw_data(payload, availability_time=timedelta(seconds=1))
+        self.assertEqual(relayed.sequence_identifier, 'TestSequence1')
+        self.assertEqual(relayed.sequence_number, 5)
+        self.assertEqual(relayed.availability_time, timedelta(seconds=1))
+        self.assertFalse(relayed.compact)
+        self.assertIs(relayed.payload, payload)
+        self.assertIs(relayed.get_encoded_xml(), payload)
+        document = relayed.to_document()
+        self.assertIsInstance(document, EBUTT3Document)
+        self.assertEqual(document.availability_time, timedelta(seconds=1))
+
+    def test_compact_payload(self):
+        payload = self.document.get_compact()
+        relayed = RelayedDocument.create_from_raw_data(payload)
+        self.assertTrue(relayed.compact)
+        self.assertIs(relayed.payload, payload)
+        self.assertEqual(relayed.get_xml(), self.document.get_xml())
+        self.assertEqual(relayed.get_encoded_xml(), self.document.get_encoded_xml())
+
+    def test_comparison(self):
+        relayed1 = RelayedDocument.create_from_raw_data(self.document.get_encoded_xml())
+        relayed2 = RelayedDocument.create_from_raw_data(
+            EBUTT3Document('clock', 6, 'TestSequence1', 'en-GB', 'local').get_encoded_xml()
+        )
+        other = RelayedDocument.create_from_raw_data(
+            EBUTT3Document('clock', 6, 'TestSequence2', 'en-GB', 'local').get_encoded_xml()
+        )
+        self.assertTrue(relayed1 < relayed2)
+        self.assertRaises(ValueError, lambda: relayed1 < other)
+
+    def test_invalid_payload(self):
+        self.assertRaises(ValueError, RelayedDocument.create_from_raw_data, b'<tt:tt/>')
+        self.assertRaises(TypeError, RelayedDocument, b'', 'TestSequence1', 1, availability_time=1)
@@ -0,0 +1,268 @@
+from unittest import TestCase
+from datetime import timedelta
+from ebu_tt_live.bindings._ebuttdt import LimitedClockTimingType
+from ebu_tt_live.clocks.local import LocalMachineClock
+from ebu_tt_live.documents.ebutt3 import TimelineUtilMixin, TimingEvent, TimingEventBegin, TimingEventEnd, \
+    EBUTT3DocumentSequence
+from ebu_tt_live.utils import IntervalTree
+from mock import patch
+import math
+import pytest
+import random
+import timeit
+
+
+class TimedElement(object):
+
+    def __init__(self, name, begin, end):
+        self.name = name
+        self.computed_begin_time = begin
+        self.computed_end_time = end
+
+    def __repr__(self):
+        return '<{}: [{}; {}]>'.format(self.name, self.computed_begin_time, self.computed_end_time)
+
+
+class Timeline(TimelineUtilMixin):
+    pass
+
+
+def walk_timeline(timeline, begin=None, end=None):
+    """
+    The reference implementation walking the timeline from its beginning.
+    """
+    affected_elements = []
+    for item in timeline.timeline.irange(maximum=end is not None and TimingEvent(None, end) or None):
+        if isinstance(item, TimingEventBegin):
+            if item.when != end:
+                affected_elements.append(item.element)
+        elif isinstance(item, TimingEventEnd):
+            if begin is not None and item.when <= begin:
+                if item.element in affected_elements:
+                    affected_elements.remove(item.element)
+    return affected_elements
+
+
+class TestIntervalTree(TestCase):
+
+    def test_empty(self):
+        tree = IntervalTree()
+        self.assertEqual(len(tree), 0)
+        self.assertEqual(tree.query(), [])
+        self.assertEqual(tree.query(begin=1, end=2), [])
+
+    def test_insert_remove(self):
+        tree = IntervalTree()
+        key1 = tree.insert(1, 5, 'a')
+        tree.insert(2, None, 'b')
+        key3 = tree.insert(2, 3, 'c')
+        self.assertEqual(len(tree), 3)
+        self.assertEqual(tree.query(), ['a', 'b', 'c'])
+        self.assertEqual(tree.query(begin=3), ['a', 'b'])
+        self.assertEqual(tree.query(end=2), ['a'])
+        self.assertEqual(tree.query(begin=5, end=10), ['b'])
+        tree.remove(key1)
+        tree.remove(key3)
+        self.assertEqual(tree.query(), ['b'])
+        self.assertRaises(KeyError, tree.remove, key1)
+
+    def test_random_against_scan(self):
+        rng = random.Random(42)
+        tree = IntervalTree()
+        intervals = {}
+        for number in range(2000):
+            begin = rng.randint(0, 1000)
+            end = rng.choice([None, begin + rng.randint(0, 50)])
+            intervals[tree.insert(begin, end, number)] = (begin, end, number)
+            if number % 3 == 0:
+                key = rng.choice(list(intervals.keys()))
+                tree.remove(key)
+                del intervals[key]
+        for _ in range(200):
+            begin = rng.randint(0, 1000)
+            end = begin + rng.randint(1, 100)
+            expected = [
+                value for key, (ibegin, iend, value) in sorted(intervals.items())
+                if ibegin < end and (iend is None or iend > begin)
+            ]
+            self.assertEqual(tree.query(begin=begin, end=end), expected)
+
+
+class TestTimelineLookup(TestCase):
+
+    def _fill(self, timeline, elements):
+        for element in elements:
+            timeline.add_to_timeline(element)
+
+    def test_lookup_matches_timeline_walk(self):
+        rng = random.Random(3370)
+        timeline = Timeline()
+        elements = []
+        for number in range(500):
+            begin = timedelta(seconds=rng.randint(0, 600))
+            end = rng.choice([None, begin + timedelta(seconds=rng.randint(0, 20))])
+            elements.append(TimedElement(number, begin, end))
+        self._fill(timeline, elements)
+
+        for _ in range(100):
+            begin = timedelta(seconds=rng.randint(0, 600))
+            end = begin + timedelta(seconds=rng.randint(0, 10))
+            self.assertEqual(
+                timeline.lookup_range_on_timeline(begin=begin, end=end),
+                walk_timeline(timeline, begin=begin, end=end)
+            )
+        self.assertEqual(timeline.lookup_range_on_timeline(), walk_timeline(timeline))
+
+    def test_event_removal(self):
+        timeline = Timeline()
+        element1 = TimedElement(1, timedelta(seconds=1), timedelta(seconds=2))
+        element2 = TimedElement(2, timedelta(seconds=2), timedelta(seconds=10))
+        self._fill(timeline, [element1, element2])
+
+        end_event = timeline.locate_element_end(element2)
+        timeline.remove_timing_event(end_event)
+        end_event.when = timedelta(seconds=5)
+        timeline.add_timing_event(end_event)
+
+        self.assertEqual(timeline.lookup_range_on_timeline(timedelta(seconds=5), timedelta(seconds=6)), [])
+        self.assertEqual(
+            timeline.lookup_range_on_timeline(timedelta(seconds=1), timedelta(seconds=6)),
+            [element1, element2]
+        )
+
+        timeline.remove_timing_event(timeline.locate_element_begin(element1))
+        self.assertEqual(timeline.lookup_range_on_timeline(), [element2])
+
+    def test_zero_length_and_open_ended(self):
+        timeline = Timeline()
+        zero = TimedElement('zero', timedelta(seconds=3), timedelta(seconds=3))
+        endless = TimedElement('endless', timedelta(seconds=1), None)
+        self._fill(timeline, [zero, endless])
+        self.assertEqual(timeline.lookup_range_on_timeline(timedelta(seconds=3), timedelta(seconds=4)), [endless])
+        self.assertEqual(timeline.lookup_range_on_timeline(timedelta(seconds=2), timedelta(seconds=4)), [endless, zero])
+        self.assertEqual(timeline.lookup_range_on_timeline(timedelta(seconds=2), timedelta(seconds=3)), [endless])
+
+
+class TestLocateElement(TestCase):
+
+    def test_locate_events(self):
+        timeline = Timeline()
+        element1 = TimedElement(1, timedelta(seconds=1), timedelta(seconds=2))
+        element2 = TimedElement(2, timedelta(seconds=1), None)
+        timeline.add_to_timeline(element1)
+        timeline.add_to_timeline(element2)
+
+        begin_event = timeline.locate_element_begin(element1)
+        end_event = timeline.locate_element_end(element1)
+        self.assertIsInstance(begin_event, TimingEventBegin)
+        self.assertIsInstance(end_event, TimingEventEnd)
+        self.assertIs(begin_event.element, element1)
+        self.assertIs(end_event.element, element1)
+        self.assertIn(begin_event, timeline.timeline)
+        self.assertIn(end_event, timeline.timeline)
+
+        self.assertIs(timeline.locate_element_begin(element2).element, element2)
+        self.assertRaises(LookupError, timeline.locate_element_end, element2)
+        self.assertRaises(LookupError, timeline.locate_element_begin, TimedElement(3, timedelta(), None))
+
+    def test_locate_follows_mutations(self):
+        timeline = Timeline()
+        element = TimedElement(1, timedelta(seconds=1), timedelta(seconds=2))
+        timeline.add_to_timeline(element)
+
+        old_end = timeline.locate_element_end(element)
+        timeline.remove_timing_event(old_end)
+        self.assertRaises(LookupError, timeline.locate_element_end, element)
+        new_end = TimingEventEnd(element)
+        new_end.when = timedelta(seconds=5)
+        timeline.add_timing_event(new_end)
+        self.assertIs(timeline.locate_element_end(element), new_end)
+
+        timeline.remove_timing_event(timeline.locate_element_begin(element))
+        timeline.remove_timing_event(new_end)
+        self.assertRaises(LookupError, timeline.locate_element_begin, element)
+        self.assertEqual(len(timeline.timeline), 0)
+
+    def test_locate_does_not_scan_timeline(self):
+        timeline = Timeline()
+        elements = [
+            TimedElement(number, timedelta(seconds=number), timedelta(seconds=number + 1)) for number in range(100)
+        ]
+        for element in elements:
+            timeline.add_to_timeline(element)
+        with patch.object(timeline.timeline, 'irange', side_effect=AssertionError('timeline scanned')):
+            for element in elements:
+                self.assertEqual(timeline.locate_element_begin(element).when, element.computed_begin_time)
+                self.assertEqual(timeline.locate_element_end(element).when, element.computed_end_time)
+
+
+class SequenceLookupTest(TestCase):
+    """
+    A channel with a subtitle of 2 seconds every 4 seconds.
+    """
+
+    document_count = None
+
+    def setUp(self):
+        self.sequence = EBUTT3DocumentSequence(
+            sequence_identifier='lookupTesting',
+            reference_clock=LocalMachineClock(),
+            lang='en-GB'
+        )
+        for number in range(self.document_count):
+            document = self.sequence.new_document()
+            document.set_begin(LimitedClockTimingType(timedelta(seconds=4 * number)))
+            document.set_end(LimitedClockTimingType(timedelta(seconds=4 * number + 2)))
+            document.availability_time = timedelta()
+            self.sequence.add_document(document)
+
+    def _second_of(self, number):
+        # A second in the middle of the subtitle of a document
+        return timedelta(seconds=4 * number + 1)
+
+
+class TestSequenceLookup(SequenceLookupTest):
+    """
+    The segments at the end of the channel must be found in the interval index without walking the timeline from its
+    beginning.
+    """
+
+    document_count = 500
+
+    def _visited(self, begin):
+        with patch.object(self.sequence.timeline, 'irange', side_effect=AssertionError('timeline scanned')), \
+                patch.object(self.sequence.interval_index, '_ends_after',
+                             side_effect=IntervalTree._ends_after) as ends_after:
+            segment = self.sequence.extract_segment(begin=begin, end=begin + timedelta(seconds=1))
+        self.assertIsNotNone(segment)
+        return ends_after.call_count
+
+    def test_extract_segment_visits(self):
+        bound = 4 * math.log(self.document_count, 2)
+        for number in [0, self.document_count // 2, self.document_count - 1]:
+            self.assertLess(self._visited(self._second_of(number)), bound)
+
+
+@pytest.mark.benchmark
+class TestSequenceLookupBenchmark(SequenceLookupTest):
+    """
+    A 24 hour channel. Reports the time needed to extract a segment at the beginning and at the end of the day.
+    """
+
+    document_count = 21600
+    repeat = 20
+
+    def _time_extract(self, begin):
+        end = begin + timedelta(seconds=1)
+        return min(timeit.repeat(
+            lambda: self.sequence.extract_segment(begin=begin, end=end),
+            repeat=3,
+            number=self.repeat
+        )) / self.repeat
+
+    def test_benchmark(self):
+        early = self._time_extract(self._second_of(0))
+        late = self._time_extract(self._second_of(self.document_count - 1))
+        print('extract_segment on {} documents: beginning of the day {:.3f}ms, end of the day {:.3f}ms'.format(
+            self.document_count, early * 1000, late * 1000
+        ))
@@ -22,6 +22,15 @@ class Node(object):
             address=hex(id(self))
         )
 
+    @property
+    def pass_through(self):
+        """
+        True if the node relays documents without looking into them. The consumer carriage implementations then
+        pass :class:`<ebu_tt_live.documents.RelayedDocument>` instances to process_document instead of parsing the
+        documents.
+        """
+        return False
+
     @property
     def node_id(self):
         return self._node_id
@@ -1,6 +1,7 @@
 
 from .base import Node
 from ebu_tt_live.documents import EBUTT3DocumentSequence, EBUTTDDocument
+from ebu_tt_live.documents.ebuttd import shift_document
 from ebu_tt_live.documents.converters import EBUTT3EBUTTDConverter
 from ebu_tt_live.strings import DOC_RECEIVED
 from ebu_tt_live.clocks.media import MediaClock
@@ -16,10 +17,13 @@ class SimpleConsumer(Node):
 
     _reference_clock = None
     _sequence = None
+    _retention_policy = None
+    _segment_cache = None
 
-    def __init__(self, node_id, carriage_impl, reference_clock):
+    def __init__(self, node_id, carriage_impl, reference_clock, retention_policy=None):
         super(SimpleConsumer, self).__init__(node_id, carriage_impl)
         self._reference_clock = reference_clock
+        self._retention_policy = retention_policy
 
     def process_document(self, document):
         if self._sequence is None:
@@ -27,7 +31,17 @@ class SimpleConsumer(Node):
             log.info('Creating document sequence from first document {}'.format(
                 document
             ))
-            self._sequence = EBUTT3DocumentSequence.create_from_document(document)
+            sequence_kwargs = {}
+            if self._segment_cache is not None:
+                sequence_kwargs['segment_cache'] = self._segment_cache
+            if self._drives_sequence_clock(document):
+                # The sequence keeps the clock of the node, e.g. a virtual clock driving a faster than real time run
+                sequence_kwargs['reference_clock'] = self._reference_clock
+            self._sequence = EBUTT3DocumentSequence.create_from_document(
+                document,
+                retention_policy=self._retention_policy,
+                **sequence_kwargs
+            )
             self._reference_clock = self._sequence.reference_clock
             if document.availability_time is None:
                 document.availability_time = self._reference_clock.get_time()
@@ -40,6 +54,12 @@ class SimpleConsumer(Node):
         ))
         self._sequence.add_document(document)
 
+    def _drives_sequence_clock(self, document):
+        # The clock of the node can serve as the clock of the sequence if it has the timing of the document
+        if self._reference_clock is None or self._reference_clock.time_base != document.time_base:
+            return False
+        return document.time_base != 'clock' or self._reference_clock.clock_mode == document.clock_mode
+
     @property
     def reference_clock(self):
         return self._reference_clock
@@ -58,14 +78,22 @@ class EBUTTDEncoder(SimpleConsumer):
     _outbound_carriage_impl = None
     _segment_timer = None
     _discard = None
+    _reuse_unchanged = None
+    _previous_segment = None
+    _converted_segments = None
+    _reused_segments = None
 
     def __init__(self, node_id, carriage_impl, outbound_carriage_impl, reference_clock,
-                 segment_length, media_time_zero, segment_timer, discard):
+                 segment_length, media_time_zero, segment_timer, discard, retention_policy=None, segment_cache=None,
+                 reuse_unchanged=False):
         super(EBUTTDEncoder, self).__init__(
             node_id=node_id,
             carriage_impl=carriage_impl,
-            reference_clock=reference_clock
+            reference_clock=reference_clock,
+            retention_policy=retention_policy
         )
+        # Reuses the segments of the documents spanning consecutive segments
+        self._segment_cache = segment_cache
         self._outbound_carriage_impl = outbound_carriage_impl
         # We need clock factory to figure the timesync out
         self._last_segment_end = reference_clock.get_time()
@@ -79,6 +107,10 @@ class EBUTTDEncoder(SimpleConsumer):
         self._default_ebuttd_doc.validate()
         self._segment_timer = segment_timer
         self._discard = discard
+        # Segments showing the same content as the previous one are shifted from it instead of being converted
+        self._reuse_unchanged = reuse_unchanged
+        self._converted_segments = 0
+        self._reused_segments = 0
 
     @property
     def last_segment_end(self):
@@ -88,6 +120,31 @@ class EBUTTDEncoder(SimpleConsumer):
     def segment_length(self):
         return self._segment_length
 
+    @property
+    def segment_cache(self):
+        """
+        The SegmentCache of the encoder if it has one, its hit rate tells how often the segmentation was skipped.
+        """
+        return self._segment_cache
+
+    @property
+    def reuse_unchanged(self):
+        return self._reuse_unchanged
+
+    @property
+    def converted_segments(self):
+        """
+        The number of segments extracted from the sequence and converted.
+        """
+        return self._converted_segments
+
+    @property
+    def reused_segments(self):
+        """
+        The number of segments shifted from the previous one because the content did not change.
+        """
+        return self._reused_segments
+
     def increment_last_segment_end(self, increment_by):
         self._last_segment_end += increment_by
         return self._last_segment_end
@@ -107,17 +164,41 @@ class EBUTTDEncoder(SimpleConsumer):
             return segment_doc
         return None
 
+    def _reuse_previous_segment(self, begin, end, documents):
+        # The previous segment can be shifted if it is right before this one, it was made from the same documents and
+        # neither the documents of the sequence nor the content shown changed since its beginning
+        if self._previous_segment is None:
+            return None
+        previous_begin, previous_end, previous_documents, previous_doc, revision = self._previous_segment
+        if previous_end != begin or revision != self._sequence.revision or previous_documents != documents:
+            return None
+        if self._sequence.has_change_points(previous_begin, end):
+            return None
+        ebuttd_doc = shift_document(previous_doc, begin - previous_begin)
+        self._previous_segment = (begin, end, documents, ebuttd_doc, revision)
+        return ebuttd_doc
+
     def convert_next_segment(self):
         # Figure out begin and end
-        ebutt3_doc = self.get_segment(
-            begin=self.last_segment_end,
-            end=self.last_segment_end + self._segment_length
-        )
-        if ebutt3_doc is not None:
-            ebuttd_bindings = self._ebuttd_converter.convert_element(ebutt3_doc.binding, dataset={})
-            ebuttd_doc = EBUTTDDocument.create_from_raw_binding(ebuttd_bindings)
-            ebuttd_doc.validate()
+        begin = self.last_segment_end
+        end = self.last_segment_end + self._segment_length
+        ebuttd_doc = None
+        documents = None
+        if self._reuse_unchanged and self._sequence is not None:
+            documents = self._sequence.lookup_range_on_timeline(begin=begin, end=end)
+            ebuttd_doc = self._reuse_previous_segment(begin, end, documents)
+        if ebuttd_doc is not None:
+            self._reused_segments += 1
         else:
-            ebuttd_doc = self._default_ebuttd_doc
+            ebutt3_doc = self.get_segment(begin=begin, end=end)
+            if ebutt3_doc is not None:
+                ebuttd_bindings = self._ebuttd_converter.convert_element(ebutt3_doc.binding, dataset={})
+                ebuttd_doc = EBUTTDDocument.create_from_raw_binding(ebuttd_bindings)
+                ebuttd_doc.validate()
+            else:
+                ebuttd_doc = self._default_ebuttd_doc
+            self._converted_segments += 1
+            if documents is not None:
+                self._previous_segment = (begin, end, documents, ebuttd_doc, self._sequence.revision)
         self.increment_last_segment_end(self._segment_length)
         self._outbound_carriage_impl.emit_document(ebuttd_doc)
@@ -6,19 +6,73 @@ log = logging.getLogger(__name__)
 
 
 class DistributingNode(Node):
+    """
+    Passes the documents of the sequences on to the subscribers.
+
+    In pass-through mode the documents are relayed as they were received. The carriage implementation only reads
+    the sequence identifier and the sequence number of the documents, which is enough to route them. The payload of
+    every validation_sample_interval-th document is parsed and validated to catch a broken upstream; a document that
+    fails this validation is not relayed.
+
+    :param pass_through: relay the documents without parsing them
+    :param validation_sample_interval: in pass-through mode, validate every nth document. None disables the
+        validation.
+    """
 
     _reference_clock = None
+    _pass_through = None
+    _validation_sample_interval = None
+    _relayed_count = 0
+    _validated_count = 0
+    _validation_failures = 0
 
-    def __init__(self, node_id, carriage_impl, reference_clock):
+    def __init__(self, node_id, carriage_impl, reference_clock, pass_through=False, validation_sample_interval=None):
+        self._pass_through = pass_through
+        if validation_sample_interval is not None and validation_sample_interval < 1:
+            raise ValueError('validation sample interval must be positive: {}'.format(validation_sample_interval))
+        self._validation_sample_interval = validation_sample_interval
         super(DistributingNode, self).__init__(node_id, carriage_impl)
         self._reference_clock = reference_clock
 
     def process_document(self, document):
+        if self._pass_through:
+            self._relay_document(document)
+            return
         log.info(document)
         log.info(" " + str(document.sequence_identifier) + "_" + str(document.sequence_number))
         log.info(document.get_xml())
         self._carriage_impl.emit_document(document)
 
+    def _relay_document(self, document):
+        self._relayed_count += 1
+        if self._validation_sample_interval is not None and \
+                self._relayed_count % self._validation_sample_interval == 0:
+            self._validated_count += 1
+            try:
+                document.validate()
+            except Exception:
+                self._validation_failures += 1
+                log.exception('Sampled validation of {} failed, the document is not relayed'.format(document))
+                return
+        log.debug('relaying {}'.format(document))
+        self._carriage_impl.emit_document(document)
+
+    @property
+    def pass_through(self):
+        return self._pass_through
+
+    @property
+    def relayed_count(self):
+        return self._relayed_count
+
+    @property
+    def validated_count(self):
+        return self._validated_count
+
+    @property
+    def validation_failures(self):
+        return self._validation_failures
+
     @property
     def reference_clock(self):
         return self._reference_clock
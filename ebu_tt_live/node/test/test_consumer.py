@@ -0,0 +1,202 @@
+from datetime import timedelta
+from unittest import TestCase
+import pytest
+import time
+from mock import MagicMock, patch
+from ebu_tt_live.bindings import tt_type
+from ebu_tt_live.carriage.filesystem import FilesystemConsumerImpl
+from ebu_tt_live.clocks.local import LocalMachineClock
+from ebu_tt_live.clocks.virtual import VirtualClock
+from ebu_tt_live.documents import SegmentCache
+from ebu_tt_live.node.consumer import SimpleConsumer, EBUTTDEncoder
+
+
+document_template = '''<?xml version="1.0" ?>
+<tt:tt ebuttp:sequenceIdentifier="TestSequence1" ebuttp:sequenceNumber="{sequence_number}" ttp:clockMode="local"
+    ttp:timeBase="clock" xml:lang="en-GB" xmlns:ebuttm="urn:ebu:tt:metadata" xmlns:ebuttp="urn:ebu:tt:parameters"
+    xmlns:tt="http://www.w3.org/ns/ttml" xmlns:ttp="http://www.w3.org/ns/ttml#parameter"
+    xmlns:tts="http://www.w3.org/ns/ttml#styling" xmlns:xml="http://www.w3.org/XML/1998/namespace">
+  <tt:head>
+    <tt:metadata>
+      <ebuttm:documentMetadata/>
+    </tt:metadata>
+    <tt:styling>
+      <tt:style xml:id="S1" tts:color="white"/>
+    </tt:styling>
+  </tt:head>
+  <tt:body begin="{begin}s" dur="00:00:03">
+    <tt:div>
+      <tt:p xml:id="ID{sequence_number}" style="S1">Subtitle number <tt:span>{sequence_number}</tt:span></tt:p>
+    </tt:div>
+  </tt:body>
+</tt:tt>'''
+
+
+class TestValidationPasses(TestCase):
+    """
+    Counts the validation passes a document goes through from the carriage to the EBU-TT-D segments.
+    """
+
+    document_count = 20
+
+    def setUp(self):
+        self.data = [
+            [
+                '00:00:{:02d}.0'.format(2 * number),
+                document_template.format(sequence_number=number + 1, begin=2 * number)
+            ] for number in range(self.document_count)
+        ]
+        reference_clock = LocalMachineClock()
+        reference_clock.set_fixed_time(timedelta())
+        reference_clock.set_fixed_time_mode(True)
+        self.carriage = FilesystemConsumerImpl()
+        self.encoder = EBUTTDEncoder(
+            node_id='encoder',
+            carriage_impl=self.carriage,
+            outbound_carriage_impl=MagicMock(),
+            reference_clock=reference_clock,
+            segment_length=1,
+            media_time_zero=timedelta(),
+            segment_timer=lambda node: None,
+            discard=False
+        )
+
+    def test_validation_passes_per_document(self):
+        with patch.object(tt_type, 'validateBinding', autospec=True, side_effect=tt_type.validateBinding) as \
+                validate_binding, \
+                patch.object(tt_type, 'recompute_timing', autospec=True, side_effect=tt_type.recompute_timing) as \
+                recompute_timing:
+            for data in self.data:
+                self.carriage.on_new_data(data)
+            self.assertEqual(validate_binding.call_count, self.document_count)
+            documents = [call[0][0] for call in validate_binding.call_args_list]
+
+            segment_count = 2 * self.document_count
+            for _ in range(segment_count):
+                self.encoder.convert_next_segment()
+
+        # The availability time is known on arrival so a single validation pass computes the timing
+        self.assertEqual(recompute_timing.call_count, 0)
+        # The segmenter does not revalidate the documents of the sequence, only the segments it creates are validated
+        validated = [call[0][0] for call in validate_binding.call_args_list]
+        for document in documents:
+            self.assertEqual(validated.count(document), 1)
+
+
+class TestSequenceClock(TestCase):
+
+    def _receive(self, reference_clock):
+        carriage = FilesystemConsumerImpl()
+        node = SimpleConsumer(node_id='consumer', carriage_impl=carriage, reference_clock=reference_clock)
+        carriage.on_new_data(['10:00:00.0', document_template.format(sequence_number=1, begin=0)])
+        return node
+
+    def test_compatible_clock_is_kept(self):
+        reference_clock = VirtualClock(time_base='clock', clock_mode='local', start_time=timedelta(hours=10))
+        node = self._receive(reference_clock)
+        self.assertIs(node.reference_clock, reference_clock)
+
+    def test_incompatible_clock_is_replaced(self):
+        reference_clock = VirtualClock(time_base='clock', clock_mode='utc', start_time=timedelta(hours=10))
+        node = self._receive(reference_clock)
+        self.assertIsNot(node.reference_clock, reference_clock)
+        self.assertEqual(node.reference_clock.clock_mode, 'local')
+
+
+class TestEncoderSegmentCache(TestCase):
+
+    def _encode(self, segment_cache=None):
+        reference_clock = LocalMachineClock()
+        reference_clock.set_fixed_time(timedelta())
+        reference_clock.set_fixed_time_mode(True)
+        carriage = FilesystemConsumerImpl()
+        outbound_carriage = MagicMock()
+        encoder = EBUTTDEncoder(
+            node_id='encoder',
+            carriage_impl=carriage,
+            outbound_carriage_impl=outbound_carriage,
+            reference_clock=reference_clock,
+            segment_length=1,
+            media_time_zero=timedelta(),
+            segment_timer=lambda node: None,
+            discard=False,
+            segment_cache=segment_cache
+        )
+        # Every document is on for 6 seconds until the next one replaces it
+        for number in range(3):
+            carriage.on_new_data([
+                '00:00:{:02d}.0'.format(6 * number),
+                document_template.format(sequence_number=number + 1, begin=6 * number).replace(
+                    'dur="00:00:03"', 'dur="00:00:07"')
+            ])
+        for _ in range(18):
+            encoder.convert_next_segment()
+        self.assertIs(encoder.segment_cache, segment_cache)
+        return [call[0][0].get_xml() for call in outbound_carriage.emit_document.call_args_list]
+
+    def test_same_segments(self):
+        segment_cache = SegmentCache()
+        self.assertEqual(self._encode(segment_cache=segment_cache), self._encode())
+        # The first segment of every document is extracted, the others are shifted from it
+        self.assertEqual(segment_cache.misses, 3)
+        self.assertEqual(segment_cache.shifted_hits, 15)
+
+
+class TestEncoderReuseUnchanged(TestCase):
+
+    def _encode(self, reuse_unchanged, document_count=3, live=False):
+        reference_clock = LocalMachineClock()
+        reference_clock.set_fixed_time(timedelta())
+        reference_clock.set_fixed_time_mode(True)
+        carriage = FilesystemConsumerImpl()
+        outbound_carriage = MagicMock()
+        encoder = EBUTTDEncoder(
+            node_id='encoder',
+            carriage_impl=carriage,
+            outbound_carriage_impl=outbound_carriage,
+            reference_clock=reference_clock,
+            segment_length=1,
+            media_time_zero=timedelta(),
+            segment_timer=lambda node: None,
+            discard=False,
+            reuse_unchanged=reuse_unchanged
+        )
+        # Every document is on for 3 seconds and followed by 3 seconds without subtitles
+        for number in range(document_count):
+            carriage.on_new_data([
+                '00:00:{:02d}.0'.format(6 * number),
+                document_template.format(sequence_number=number + 1, begin=6 * number)
+            ])
+            if live:
+                # The next document comes in 2 seconds before it begins
+                for _ in range(6 if number else 4):
+                    encoder.convert_next_segment()
+        for _ in range(6 * document_count - encoder.converted_segments - encoder.reused_segments):
+            encoder.convert_next_segment()
+        self.assertEqual(encoder.converted_segments + encoder.reused_segments, 6 * document_count)
+        return encoder, [call[0][0].get_xml() for call in outbound_carriage.emit_document.call_args_list]
+
+    def test_same_segments(self):
+        encoder, segments = self._encode(reuse_unchanged=True)
+        self.assertEqual(segments, self._encode(reuse_unchanged=False)[1])
+        # The segments at the beginning and the end of every document are converted
+        self.assertEqual(encoder.converted_segments, 6)
+        self.assertEqual(encoder.reused_segments, 12)
+
+    def test_same_segments_live(self):
+        encoder, segments = self._encode(reuse_unchanged=True, live=True)
+        self.assertEqual(segments, self._encode(reuse_unchanged=False, live=True)[1])
+        # The segment after a new document came in is converted again
+        self.assertEqual(encoder.converted_segments, 8)
+
+    @pytest.mark.benchmark
+    def test_cpu_per_hour(self):
+        document_count = 30
+        cpu_times = {}
+        for reuse_unchanged in [False, True]:
+            start = time.clock()
+            self._encode(reuse_unchanged=reuse_unchanged, document_count=document_count)
+            cpu_times[reuse_unchanged] = time.clock() - start
+        hours = 6 * document_count / 3600.0
+        print('EBU-TT-D encoding CPU per hour of output: every segment {:.1f}s, reusing unchanged segments '
+              '{:.1f}s'.format(cpu_times[False] / hours, cpu_times[True] / hours))
@@ -1,6 +1,14 @@
 from unittest import TestCase
+from datetime import timedelta
 from mock import MagicMock
 from ebu_tt_live.node.distributing import DistributingNode
+from ebu_tt_live.carriage.twisted import TwistedConsumerImpl, TwistedProducerImpl
+from ebu_tt_live.carriage.forwarder_carriage import ForwarderCarriageImpl
+from ebu_tt_live.documents import EBUTT3Document, RelayedDocument
+from ebu_tt_live.twisted.websocket import BroadcastServerFactory
+import os
+import pytest
+import time
 
 
 class TestDistributingNode(TestCase):
@@ -12,3 +20,89 @@ class TestDistributingNode(TestCase):
         document = MagicMock()
         node.process_document(document)
         carriage.emit_document.assert_called_with(document)
+
+    def test_pass_through(self):
+        carriage = MagicMock()
+        node = DistributingNode('distributing_node', carriage, MagicMock(), pass_through=True)
+        self.assertTrue(node.pass_through)
+        document = MagicMock()
+        node.process_document(document)
+        carriage.emit_document.assert_called_with(document)
+        document.validate.assert_not_called()
+        self.assertEqual(node.relayed_count, 1)
+
+    def test_sampled_validation(self):
+        carriage = MagicMock()
+        node = DistributingNode(
+            'distributing_node', carriage, MagicMock(), pass_through=True, validation_sample_interval=2
+        )
+        valid = RelayedDocument.create_from_raw_data(
+            EBUTT3Document('clock', 1, 'TestSequence1', 'en-GB').get_encoded_xml()
+        )
+        # The header can be read but the document is not valid
+        invalid = RelayedDocument(b'<tt:tt/>', 'TestSequence1', 2)
+        node.process_document(valid)
+        node.process_document(invalid)
+        node.process_document(invalid)
+        node.process_document(valid)
+        self.assertEqual([call[0][0] for call in carriage.emit_document.call_args_list], [valid, invalid, valid])
+        self.assertEqual(node.relayed_count, 4)
+        self.assertEqual(node.validated_count, 2)
+        self.assertEqual(node.validation_failures, 1)
+
+    def test_invalid_sample_interval(self):
+        self.assertRaises(
+            ValueError, DistributingNode, 'distributing_node', MagicMock(), MagicMock(), validation_sample_interval=0
+        )
+
+
+@pytest.mark.benchmark
+class TestRelayBenchmark(TestCase):
+    """
+    Relays the example sequences from a consumer to a websocket subscriber and reports the time and the processor
+    time spent per document with and without parsing.
+    """
+
+    repeat = 2
+
+    def setUp(self):
+        example_sequences_dir = os.path.join(
+            os.path.dirname(__file__), '..', '..', '..', 'testing', 'example-sequences'
+        )
+        self.payloads = []
+        for dir_name in sorted(os.listdir(example_sequences_dir)):
+            dir_path = os.path.join(example_sequences_dir, dir_name)
+            for file_name in sorted(os.listdir(dir_path)):
+                if file_name.endswith('.xml'):
+                    with open(os.path.join(dir_path, file_name), 'rb') as xml_file:
+                        self.payloads.append(xml_file.read())
+
+    def _relay(self, pass_through):
+        server_factory = BroadcastServerFactory(u'ws://localhost:9000')
+        subscriber = MagicMock()
+        subscriber.compact = False
+        reference_clock = MagicMock()
+        reference_clock.get_time.return_value = timedelta()
+        producer_impl = TwistedProducerImpl()
+        producer_impl.register_twisted_producer(MagicMock(emit_data=server_factory.broadcast))
+        carriage = ForwarderCarriageImpl(TwistedConsumerImpl(), producer_impl)
+        node = DistributingNode('distributing_node', carriage, reference_clock, pass_through=pass_through)
+        for payload in self.payloads:
+            # Subscribe to the channel of every document so that every relayed document is sent
+            server_factory.subscribe(subscriber, RelayedDocument.create_from_raw_data(payload).sequence_identifier)
+        start = time.time()
+        start_clock = time.clock()
+        for _ in range(self.repeat):
+            for payload in self.payloads:
+                carriage.on_new_data(payload)
+        count = len(self.payloads) * self.repeat
+        self.assertEqual(subscriber.sendPreparedMessageOnChannel.call_count, count)
+        return (time.time() - start) * 1000 / count, (time.clock() - start_clock) * 1000 / count
+
+    def test_benchmark(self):
+        parsed_latency, parsed_cpu = self._relay(pass_through=False)
+        relayed_latency, relayed_cpu = self._relay(pass_through=True)
+        print('Parsing relay: {:.3f}ms latency, {:.3f}ms CPU per document; '
+              'pass-through relay: {:.3f}ms latency, {:.3f}ms CPU per document'.format(
+                  parsed_latency, parsed_cpu, relayed_latency, relayed_cpu
+              ))
@@ -5,6 +5,9 @@ import yaml
 from nltk.tokenize import PunktSentenceTokenizer, BlanklineTokenizer, WhitespaceTokenizer
 import re
 from twisted.python import log as twisted_log
+from datetime import timedelta
+from ebu_tt_live.documents import RetentionPolicy, SegmentCache
+from ebu_tt_live.carriage.filesystem import timestr_manifest_to_timedelta
 
 
 log = logging.getLogger(__name__)
@@ -21,6 +24,45 @@ def create_loggers(level=logging.INFO):
     logging.basicConfig(level=level, format=log_format)
 
 
+def create_retention_policy(args):
+    """
+    Create the sequence retention policy from the --max-documents, --max-age and --max-bytes command line arguments.
+    :param args: parsed arguments
+    :return: RetentionPolicy or None if no limit was given
+    """
+    if args.max_documents is None and args.max_age is None and args.max_bytes is None:
+        return None
+    return RetentionPolicy(
+        max_documents=args.max_documents,
+        max_age=args.max_age is not None and timedelta(seconds=args.max_age) or None,
+        max_bytes=args.max_bytes
+    )
+
+
+def create_segment_cache(args):
+    """
+    Create the segment cache of an encoder from the --segment-cache command line argument.
+    :param args: parsed arguments
+    :return: SegmentCache or None if no size was given
+    """
+    if not args.segment_cache:
+        return None
+    return SegmentCache(max_size=args.segment_cache)
+
+
+def seek_manifest(fs_reader, args):
+    """
+    Start reading the manifest at the position given by the --start-sequence-number or --start-time command line
+    arguments.
+    :param fs_reader: FilesystemReader
+    :param args: parsed arguments
+    """
+    if args.start_sequence_number is not None:
+        fs_reader.seek_sequence_number(args.start_sequence_number)
+    elif args.start_time is not None:
+        fs_reader.seek_availability_time(timestr_manifest_to_timedelta(args.start_time, 'media'))
+
+
 def parse_config(config, module_name=None):
     import ipdb; ipdb.set_trace()
     if yaml_file.match(config):
@@ -1,14 +1,19 @@
 import logging
 from argparse import ArgumentParser
-from .common import create_loggers
+from .common import create_loggers, create_retention_policy, create_segment_cache, seek_manifest
 
 from ebu_tt_live.node import EBUTTDEncoder
 from ebu_tt_live.clocks.local import LocalMachineClock
-from ebu_tt_live.twisted import TwistedConsumer, BroadcastClientFactory, ClientNodeProtocol
+from ebu_tt_live.clocks.virtual import VirtualClock
+from ebu_tt_live.clocks.scheduler import VirtualScheduler
+from ebu_tt_live.twisted import TwistedConsumer, BroadcastClientFactory, ClientNodeProtocol, ManifestTailer, \
+    TwistedScheduler
 from ebu_tt_live.carriage.twisted import TwistedConsumerImpl
-from ebu_tt_live.carriage.filesystem import FilesystemConsumerImpl, FilesystemReader, SimpleFolderExport
+from ebu_tt_live.carriage.filesystem import FilesystemConsumerImpl, FilesystemReader, SimpleFolderExport, \
+    SegmentedFolderExport
+from ebu_tt_live.carriage.replay import ManifestReplay
 from ebu_tt_live import bindings
-from twisted.internet import task, reactor
+from twisted.internet import reactor
 
 
 log = logging.getLogger('ebu_simple_consumer')
@@ -34,19 +39,32 @@ parser.add_argument('-f', '--tail-f', dest='do_tail',
                     help='Works only with -m, if set the script will wait for new lines to be added to the file once the last line is reached. Exactly like tail -f does.',
                     action="store_true", default=False
                     )
+parser.add_argument('--start-sequence-number', dest='start_sequence_number', type=int, default=None,
+                    help='Works only with -m, start reading at the document with this sequence number')
+parser.add_argument('--start-time', dest='start_time', default=None, metavar='HH:MM:SS.mmm',
+                    help='Works only with -m, start reading at the first document available at this time')
 parser.add_argument('-z', '--clock-at-media-time-zero', dest='media_time_zero',
                     help='This sets the offset value that is used to turn clock time into media time.',
                     default='current', metavar='HH:MM:SS.mmm')
 parser.add_argument('-o', '--output-folder', dest='output_folder', default='./')
-parser.add_argument('-of', '--output-format', dest='output_format', default='xml')
+parser.add_argument('-of', '--output-format', dest='output_format', default='xml',
+                    help='xml for a file per document, archive for rolling segment files')
 parser.add_argument('--proxy', dest='proxy', help='HTTP Proxy server (http:// protocol not needed!)', type=str, metavar='ADDRESS:PORT')
 parser.add_argument('--discard', dest='discard', help='Discard already converted documents', action='store_true', default=False)
+parser.add_argument('--max-documents', dest='max_documents', type=int, default=None,
+                    help='Retention policy: maximum number of documents kept in the sequence')
+parser.add_argument('--max-age', dest='max_age', type=float, default=None,
+                    help='Retention policy: documents that ended more than this many seconds ago are evicted')
+parser.add_argument('--max-bytes', dest='max_bytes', type=int, default=None,
+                    help='Retention policy: maximum cumulative size of the documents kept in the sequence')
+parser.add_argument('--segment-cache', dest='segment_cache', type=int, default=0, metavar='SIZE',
+                    help='Cache this many document segments to reuse them in the following segments')
+parser.add_argument('--reuse-unchanged', dest='reuse_unchanged', action='store_true', default=False,
+                    help='Shift the previous EBU-TT-D segment instead of converting a segment showing the same content')
 
 
 def start_timer(encoder):
-    segment_timer = task.LoopingCall(encoder.convert_next_segment)
-    segment_timer.start(encoder.segment_length.total_seconds(), now=False)
-    return segment_timer
+    return TwistedScheduler(reactor).call_every(encoder.segment_length, encoder.convert_next_segment)
 
 
 def main():
@@ -60,22 +78,39 @@ def main():
     websocket_channel = args.websocket_channel
 
     fs_reader = None
+    replay = None
+    reference_clock = LocalMachineClock()
+    reference_clock.clock_mode = 'local'
+    segment_timer = start_timer
 
     if manifest_path:
         do_tail = args.do_tail
         consumer_impl = FilesystemConsumerImpl()
-        fs_reader = FilesystemReader(manifest_path, consumer_impl, do_tail)
+        if do_tail:
+            fs_reader = FilesystemReader(manifest_path, consumer_impl, do_tail)
+        else:
+            # The recorded documents are encoded as fast as possible against a virtual clock that follows their
+            # availability times, the segmentation runs at the times it would have run live
+            reference_clock = VirtualClock(time_base='clock', clock_mode='local')
+            replay = ManifestReplay(consumer_impl, VirtualScheduler(reference_clock))
+            segment_timer = replay.segment_timer
+            fs_reader = FilesystemReader(manifest_path, replay, do_tail)
+            seek_manifest(fs_reader, args)
+            start_time = fs_reader.peek_availability_time(reference_clock.time_base)
+            if start_time is None:
+                log.info('No document to encode')
+                return
+            reference_clock.advance_to(start_time)
     else:
         consumer_impl = TwistedConsumerImpl()
 
     if args.output_format == 'xml':
         outbound_carriage = SimpleFolderExport(args.output_folder, 'ebuttd-encode-{}.xml')
+    elif args.output_format == 'archive':
+        outbound_carriage = SegmentedFolderExport(args.output_folder, 'ebuttd-encode-{}.xml')
     else:
         raise Exception('Invalid output format: {}'.format(args.output_format))
 
-    reference_clock = LocalMachineClock()
-    reference_clock.clock_mode = 'local'
-
     media_time_zero = \
         args.media_time_zero == 'current' and reference_clock.get_time() \
         or bindings.ebuttdt.LimitedClockTimingType(str(args.media_time_zero)).timedelta
@@ -87,13 +122,31 @@ def main():
         reference_clock=reference_clock,
         segment_length=args.interval,
         media_time_zero=media_time_zero,
-        segment_timer=start_timer,
-        discard=args.discard
+        segment_timer=segment_timer,
+        discard=args.discard,
+        retention_policy=create_retention_policy(args),
+        segment_cache=create_segment_cache(args),
+        reuse_unchanged=args.reuse_unchanged
     )
 
     if manifest_path:
-        fs_reader.resume_reading()
-        # TODO: Do segmentation in filesystem mode. Especially bad is the tail usecase #209
+        if do_tail:
+            seek_manifest(fs_reader, args)
+            # The reactor runs the segmentation timer while the manifest is tailed
+            ManifestTailer(fs_reader).start()
+            reactor.run()
+        else:
+            fs_reader.resume_reading()
+            statistics = replay.finish()
+            if hasattr(outbound_carriage, 'close'):
+                outbound_carriage.close()
+            log.info(statistics)
+            if ebuttd_converter.segment_cache is not None:
+                log.info('Segment cache: {}'.format(ebuttd_converter.segment_cache))
+            if ebuttd_converter.reuse_unchanged:
+                log.info('{} segments converted, {} reused'.format(
+                    ebuttd_converter.converted_segments, ebuttd_converter.reused_segments
+                ))
     else:
         factory_args = {}
         if args.proxy:
@@ -0,0 +1,31 @@
+import logging
+from argparse import ArgumentParser
+from .common import create_loggers
+
+from ebu_tt_live.carriage.manifest_index import ManifestIndex
+
+
+log = logging.getLogger('ebu_manifest_index')
+
+
+parser = ArgumentParser()
+
+parser.add_argument('manifest_paths', metavar='MANIFEST', nargs='+',
+                    help='Manifest files written by the filesystem carriage mechanism')
+parser.add_argument('--update', dest='update',
+                    help='Only index the lines added since the index was last written',
+                    action='store_true', default=False)
+
+
+def main():
+    args = parser.parse_args()
+    create_loggers()
+
+    for manifest_path in args.manifest_paths:
+        if args.update:
+            index = ManifestIndex(manifest_path)
+            index.update()
+        else:
+            index = ManifestIndex.rebuild(manifest_path)
+        log.info('{}: {} lines indexed in {}'.format(manifest_path, len(index), index.index_path))
+        index.close()
@@ -0,0 +1,102 @@
+import logging
+from argparse import ArgumentParser
+from .common import create_loggers, create_retention_policy, create_segment_cache
+
+from ebu_tt_live.node import SimpleConsumer, EBUTTDEncoder
+from ebu_tt_live.clocks.virtual import VirtualClock
+from ebu_tt_live.clocks.scheduler import VirtualScheduler
+from ebu_tt_live.carriage.filesystem import FilesystemConsumerImpl, SimpleFolderExport, SegmentedFolderExport
+from ebu_tt_live.carriage.replay import ManifestReplay, DiscardingProducerImpl, first_availability_time
+
+
+log = logging.getLogger('ebu_replay')
+
+
+parser = ArgumentParser()
+
+parser.add_argument('manifest_paths', metavar='MANIFEST', nargs='+',
+                    help='Manifest files written by the filesystem carriage mechanism, replayed one after the other')
+parser.add_argument('--encoder', dest='encoder',
+                    help='Replay through an EBU-TT-D encoder instead of a simple consumer',
+                    action='store_true', default=False)
+parser.add_argument('-i', '--interval', dest='interval', metavar='INTERVAL',
+                    type=float, default=1.0,
+                    help='Segmentation interval of the encoder')
+parser.add_argument('-o', '--output-folder', dest='output_folder', default=None,
+                    help='Where the encoder writes the segments, they are discarded if not set')
+parser.add_argument('-of', '--output-format', dest='output_format', default='xml',
+                    help='xml for a file per document, archive for rolling segment files')
+parser.add_argument('--discard', dest='discard', help='Discard already converted documents', action='store_true', default=False)
+parser.add_argument('--max-documents', dest='max_documents', type=int, default=None,
+                    help='Retention policy: maximum number of documents kept in the sequence')
+parser.add_argument('--max-age', dest='max_age', type=float, default=None,
+                    help='Retention policy: documents that ended more than this many seconds ago are evicted')
+parser.add_argument('--max-bytes', dest='max_bytes', type=int, default=None,
+                    help='Retention policy: maximum cumulative size of the documents kept in the sequence')
+parser.add_argument('--segment-cache', dest='segment_cache', type=int, default=0, metavar='SIZE',
+                    help='Cache this many document segments to reuse them in the following segments')
+parser.add_argument('--reuse-unchanged', dest='reuse_unchanged', action='store_true', default=False,
+                    help='Shift the previous EBU-TT-D segment instead of converting a segment showing the same content')
+
+
+def create_outbound_carriage(args):
+    if args.output_folder is None:
+        return DiscardingProducerImpl()
+    if args.output_format == 'xml':
+        return SimpleFolderExport(args.output_folder, 'ebuttd-encode-{}.xml')
+    elif args.output_format == 'archive':
+        return SegmentedFolderExport(args.output_folder, 'ebuttd-encode-{}.xml')
+    raise Exception('Invalid output format: {}'.format(args.output_format))
+
+
+def main():
+    args = parser.parse_args()
+    # The nodes log every document, only the outcome of the replay is of interest here
+    create_loggers(level=logging.WARNING)
+    log.setLevel(logging.INFO)
+
+    reference_clock = VirtualClock(time_base='clock', clock_mode='local')
+    start_time = first_availability_time(args.manifest_paths[0], reference_clock.time_base)
+    if start_time is None:
+        log.error('{} has no document'.format(args.manifest_paths[0]))
+        return
+    # The clock follows the manifest from the start, the encoder begins its segments at the first document
+    reference_clock.advance_to(start_time)
+
+    consumer_impl = FilesystemConsumerImpl()
+    replay = ManifestReplay(consumer_impl, VirtualScheduler(reference_clock))
+    outbound_carriage = None
+    if args.encoder:
+        outbound_carriage = create_outbound_carriage(args)
+        node = EBUTTDEncoder(
+            node_id='replay-encoder',
+            carriage_impl=consumer_impl,
+            outbound_carriage_impl=outbound_carriage,
+            reference_clock=reference_clock,
+            segment_length=args.interval,
+            media_time_zero=start_time,
+            segment_timer=replay.segment_timer,
+            discard=args.discard,
+            retention_policy=create_retention_policy(args),
+            segment_cache=create_segment_cache(args),
+            reuse_unchanged=args.reuse_unchanged
+        )
+    else:
+        node = SimpleConsumer(
+            node_id='replay-consumer',
+            carriage_impl=consumer_impl,
+            reference_clock=reference_clock,
+            retention_policy=create_retention_policy(args)
+        )
+
+    for manifest_path in args.manifest_paths:
+        log.info('Replaying {}'.format(manifest_path))
+        replay.replay(manifest_path)
+    statistics = replay.finish()
+    if outbound_carriage is not None and hasattr(outbound_carriage, 'close'):
+        outbound_carriage.close()
+    log.info(statistics)
+    if args.encoder and node.segment_cache is not None:
+        log.info('Segment cache: {}'.format(node.segment_cache))
+    if args.encoder and node.reuse_unchanged:
+        log.info('{} segments converted, {} reused'.format(node.converted_segments, node.reused_segments))
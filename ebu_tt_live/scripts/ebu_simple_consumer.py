@@ -1,10 +1,10 @@
 import logging
 from argparse import ArgumentParser
-from .common import create_loggers
+from .common import create_loggers, create_retention_policy, seek_manifest
 
 from ebu_tt_live.node import SimpleConsumer
 from ebu_tt_live.clocks.local import LocalMachineClock
-from ebu_tt_live.twisted import TwistedConsumer, BroadcastClientFactory, ClientNodeProtocol
+from ebu_tt_live.twisted import TwistedConsumer, BroadcastClientFactory, ClientNodeProtocol, ManifestTailer
 from ebu_tt_live.carriage.twisted import TwistedConsumerImpl
 from ebu_tt_live.carriage.filesystem import FilesystemConsumerImpl, FilesystemReader
 from twisted.internet import reactor
@@ -30,7 +30,22 @@ parser.add_argument('-f', '--tail-f', dest='do_tail',
                     help='Works only with -m, if set the script will wait for new lines to be added to the file once the last line is reached. Exactly like tail -f does.',
                     action="store_true", default=False
                     )
+parser.add_argument('--start-sequence-number', dest='start_sequence_number', type=int, default=None,
+                    help='Works only with -m, start reading at the document with this sequence number')
+parser.add_argument('--start-time', dest='start_time', default=None, metavar='HH:MM:SS.mmm',
+                    help='Works only with -m, start reading at the first document available at this time')
+parser.add_argument('--compression', dest='compression', help='Offer permessage-deflate compression to the server',
+                    action='store_true', default=False)
+parser.add_argument('--compact', dest='compact',
+                    help='Ask the server for documents in the compact binary encoding of the toolkit',
+                    action='store_true', default=False)
 parser.add_argument('--proxy', dest='proxy', help='HTTP Proxy server (http:// protocol not needed!)', type=str, metavar='ADDRESS:PORT')
+parser.add_argument('--max-documents', dest='max_documents', type=int, default=None,
+                    help='Retention policy: maximum number of documents kept in the sequence')
+parser.add_argument('--max-age', dest='max_age', type=float, default=None,
+                    help='Retention policy: documents that ended more than this many seconds ago are evicted')
+parser.add_argument('--max-bytes', dest='max_bytes', type=int, default=None,
+                    help='Retention policy: maximum cumulative size of the documents kept in the sequence')
 
 
 def main():
@@ -57,11 +72,17 @@ def main():
     simple_consumer = SimpleConsumer(
         node_id='simple-consumer',
         carriage_impl=consumer_impl,
-        reference_clock=reference_clock
+        reference_clock=reference_clock,
+        retention_policy=create_retention_policy(args)
     )
 
     if manifest_path:
-        fs_reader.resume_reading()
+        seek_manifest(fs_reader, args)
+        if do_tail:
+            ManifestTailer(fs_reader).start()
+            reactor.run()
+        else:
+            fs_reader.resume_reading()
     else:
         factory_args = {}
         if args.proxy:
@@ -77,6 +98,10 @@ def main():
         )
 
         factory.protocol = ClientNodeProtocol
+        if args.compression:
+            factory.enable_compression()
+        if args.compact:
+            factory.enable_compact_format()
 
         factory.connect()
 
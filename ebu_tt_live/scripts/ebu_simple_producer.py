@@ -10,7 +10,9 @@ from ebu_tt_live.documents import EBUTT3DocumentSequence
 from ebu_tt_live.node import SimpleProducer
 from ebu_tt_live.twisted import BroadcastServerFactory as wsFactory, StreamingServerProtocol, \
     TwistedPullProducer
-from ebu_tt_live.carriage.filesystem import FilesystemProducerImpl
+from ebu_tt_live.carriage.filesystem import FilesystemProducerImpl, ArchiveProducerImpl, FSYNC_POLICIES, \
+    FSYNC_POLICY_NONE
+from ebu_tt_live.carriage.archive import DEFAULT_SEGMENT_SIZE
 from ebu_tt_live.carriage.twisted import TwistedProducerImpl
 
 
@@ -20,11 +22,37 @@ parser.add_argument('--reference-clock', dest='reference_clock',
                     help='content should reference clock times when the content was generated on the server',
                     action='store_true', default=False)
 
+parser.add_argument('--compression', dest='compression',
+                    help='accept permessage-deflate compression offered by the clients',
+                    action='store_true', default=False)
+
+parser.add_argument('--compact', dest='compact',
+                    help='send documents in the compact binary encoding of the toolkit to the clients that ask for it',
+                    action='store_true', default=False)
+
 parser.add_argument('--folder-export', dest='folder_export',
                     help='export xml files to given folder',
                     type=str
                     )
 
+parser.add_argument('--write-behind', dest='write_behind',
+                    help='write the exported files from a worker thread',
+                    action='store_true', default=False)
+
+parser.add_argument('--fsync', dest='fsync_policy',
+                    help='when the exported files are forced to the disk',
+                    choices=FSYNC_POLICIES, default=FSYNC_POLICY_NONE)
+
+parser.add_argument('--archive', dest='archive',
+                    help='append the exported documents to rolling segment files instead of a file per document',
+                    action='store_true', default=False)
+
+parser.add_argument('--segment-size', dest='segment_size', type=int, default=DEFAULT_SEGMENT_SIZE,
+                    help='with --archive, the size in bytes after which a new segment file is started')
+
+parser.add_argument('--segment-duration', dest='segment_duration', type=float, default=None,
+                    help='with --archive, the age in seconds after which a new segment file is started')
+
 
 def main():
     create_loggers()
@@ -58,7 +86,20 @@ def main():
     # This object is used as flexible binding to the carriage mechanism and twisted integrated as dependency injection
     prod_impl = None
     if do_export:
-        prod_impl = FilesystemProducerImpl(parsed_args.folder_export)
+        if parsed_args.archive:
+            prod_impl = ArchiveProducerImpl(
+                parsed_args.folder_export,
+                segment_size=parsed_args.segment_size,
+                segment_duration=parsed_args.segment_duration,
+                write_behind=parsed_args.write_behind,
+                fsync_policy=parsed_args.fsync_policy
+            )
+        else:
+            prod_impl = FilesystemProducerImpl(
+                parsed_args.folder_export,
+                write_behind=parsed_args.write_behind,
+                fsync_policy=parsed_args.fsync_policy
+            )
     else:
         prod_impl = TwistedProducerImpl()
 
@@ -71,10 +112,15 @@ def main():
 
     if do_export:
         prod_impl.resume_producing()
+        prod_impl.close()
     else:
         factory = wsFactory(u"ws://127.0.0.1:9000")
 
         factory.protocol = StreamingServerProtocol
+        if parsed_args.compression:
+            factory.enable_compression()
+        if parsed_args.compact:
+            factory.enable_compact_format()
 
         factory.listen()
 
@@ -6,7 +6,7 @@ from ebu_tt_live.node.distributing import DistributingNode
 from ebu_tt_live.clocks.local import LocalMachineClock
 from ebu_tt_live.twisted import TwistedConsumer, UserInputServerProtocol, UserInputServerFactory, BroadcastServerFactory, TwistedPullProducer, StreamingServerProtocol
 from ebu_tt_live.carriage.forwarder_carriage import ForwarderCarriageImpl
-from ebu_tt_live.carriage.filesystem import FilesystemProducerImpl
+from ebu_tt_live.carriage.filesystem import FilesystemProducerImpl, FSYNC_POLICIES, FSYNC_POLICY_NONE
 from ebu_tt_live.carriage.twisted import TwistedConsumerImpl, TwistedProducerImpl
 from twisted.internet import reactor
 
@@ -21,6 +21,18 @@ parser.add_argument('--folder-export', dest='folder_export',
                     help='export xml files to given folder',
                     type=str
                     )
+parser.add_argument('--pass-through', dest='pass_through',
+                    help='relay the documents without parsing them',
+                    action='store_true', default=False)
+parser.add_argument('--validation-sample-interval', dest='validation_sample_interval',
+                    help='in pass-through mode, validate every nth document',
+                    type=int, default=None)
+parser.add_argument('--write-behind', dest='write_behind',
+                    help='write the exported files from a worker thread',
+                    action='store_true', default=False)
+parser.add_argument('--fsync', dest='fsync_policy',
+                    help='when the exported files are forced to the disk',
+                    choices=FSYNC_POLICIES, default=FSYNC_POLICY_NONE)
 
 
 def main():
@@ -34,7 +46,13 @@ def main():
     sub_consumer_impl = TwistedConsumerImpl()
     sub_prod_impl = None
     if do_export:
-        sub_prod_impl = FilesystemProducerImpl(args.folder_export)
+        sub_prod_impl = FilesystemProducerImpl(
+            args.folder_export,
+            write_behind=args.write_behind,
+            fsync_policy=args.fsync_policy
+        )
+        # Write the documents still waiting for the worker thread
+        reactor.addSystemEventTrigger('before', 'shutdown', sub_prod_impl.close)
     else:
         sub_prod_impl = TwistedProducerImpl()
     carriage_impl = ForwarderCarriageImpl(sub_consumer_impl, sub_prod_impl)
@@ -45,7 +63,9 @@ def main():
     dist_node = DistributingNode(
         node_id='distributing-node',
         carriage_impl=carriage_impl,
-        reference_clock=reference_clock
+        reference_clock=reference_clock,
+        pass_through=args.pass_through,
+        validation_sample_interval=args.validation_sample_interval
     )
 
     # This factory listens for incoming documents from the user input producer.
@@ -2,3 +2,5 @@
 from .base import IBroadcaster
 from node import TwistedPullProducer, TwistedConsumer
 from websocket import BroadcastServerFactory, StreamingServerProtocol, BroadcastClientFactory, ClientNodeProtocol, UserInputServerFactory, UserInputServerProtocol
+from filesystem import ManifestTailer
+from scheduler import TwistedScheduler
@@ -0,0 +1,119 @@
+"""
+This module configures the permessage-deflate websocket extension (RFC 7692) for the factories of the package.
+
+A server that does not take over the compression context between messages compresses every message on its own. A
+message compressed with the same window size and memory level is then the same for every client, so a broadcast
+compresses a document once per channel instead of once per subscriber.
+"""
+
+import struct
+import zlib
+from autobahn.websocket.compress import PerMessageDeflateOffer, PerMessageDeflateOfferAccept, \
+    PerMessageDeflateResponse, PerMessageDeflateResponseAccept, PerMessageDeflate
+from autobahn.websocket.protocol import PreparedMessage
+
+
+def deflate_offer_acceptor(no_context_takeover=True, window_bits=None, mem_level=None):
+    """
+    Create the function accepting the compression offers of the clients of a server factory.
+    :param no_context_takeover: compress each message independently. Required to share compressed messages.
+    :param window_bits: the largest window size the server compresses with, between 9 and 15
+    :param mem_level: the zlib memory level the server compresses with, between 1 and 9
+    :return: function to set as perMessageCompressionAccept protocol option
+    """
+    def accept(offers):
+        for offer in offers:
+            if isinstance(offer, PerMessageDeflateOffer):
+                offer_window_bits = window_bits
+                if offer_window_bits is not None and offer.request_max_window_bits:
+                    offer_window_bits = min(offer_window_bits, offer.request_max_window_bits)
+                return PerMessageDeflateOfferAccept(
+                    offer,
+                    no_context_takeover=no_context_takeover or None,
+                    window_bits=offer_window_bits,
+                    mem_level=mem_level
+                )
+        return None
+    return accept
+
+
+def deflate_offers(no_context_takeover=True, window_bits=None):
+    """
+    Create the compression offers of a client factory.
+    :param no_context_takeover: ask the server to compress each message independently
+    :param window_bits: the largest window size the server may compress with, between 9 and 15
+    :return: list of offers to set as perMessageCompressionOffers protocol option
+    """
+    return [PerMessageDeflateOffer(
+        accept_no_context_takeover=True,
+        accept_max_window_bits=True,
+        request_no_context_takeover=no_context_takeover,
+        request_max_window_bits=window_bits or 0
+    )]
+
+
+def deflate_response_acceptor():
+    """
+    Create the function accepting the compression response of the server to a client factory.
+    :return: function to set as perMessageCompressionAccept protocol option
+    """
+    def accept(response):
+        if isinstance(response, PerMessageDeflateResponse):
+            return PerMessageDeflateResponseAccept(response)
+        return None
+    return accept
+
+
+class SharedDeflateMessage(PreparedMessage):
+    """
+    A prepared message that is compressed at most once for every combination of window size and memory level the
+    clients negotiated. Clients that take over the compression context get the payload compressed by their own
+    connection.
+    """
+
+    _deflated_frames = None
+
+    def __init__(self, payload, isBinary):
+        super(SharedDeflateMessage, self).__init__(payload, isBinary, applyMask=False, doNotCompress=False)
+        self._deflated_frames = {}
+
+    @classmethod
+    def can_share(cls, per_message_compress):
+        """
+        Check if a connection can send the shared compressed message.
+        :param per_message_compress: the compression negotiated on the connection
+        :return: bool
+        """
+        return isinstance(per_message_compress, PerMessageDeflate) and \
+            per_message_compress._is_server and \
+            per_message_compress.server_no_context_takeover
+
+    def deflated_frame(self, window_bits, mem_level):
+        """
+        The websocket frame of the compressed message.
+        :param window_bits:
+        :param mem_level:
+        :return: the frame to send
+        """
+        key = (window_bits, mem_level)
+        frame = self._deflated_frames.get(key)
+        if frame is None:
+            frame = self._deflated_frames[key] = self._frame(self._deflate(window_bits, mem_level))
+        return frame
+
+    def _deflate(self, window_bits, mem_level):
+        # Same as PerMessageDeflate, the trailing empty block of the sync flush is not sent
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -window_bits, mem_level)
+        return (compressor.compress(self.payload) + compressor.flush(zlib.Z_SYNC_FLUSH))[:-4]
+
+    def _frame(self, data):
+        # FIN, RSV1 marking the compressed message and the opcode
+        first_byte = (1 << 7) | (1 << 6) | (2 if self.binary else 1)
+        length = len(data)
+        if length <= 125:
+            header = struct.pack('!BB', first_byte, length)
+        elif length <= 0xFFFF:
+            header = struct.pack('!BBH', first_byte, 126, length)
+        else:
+            header = struct.pack('!BBQ', first_byte, 127, length)
+        return header + data
@@ -0,0 +1,101 @@
+from twisted.internet import task
+from twisted.python.filepath import FilePath
+import logging
+
+
+log = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 0.5
+
+TAIL_MODE_INOTIFY = 'inotify'
+TAIL_MODE_POLLING = 'polling'
+
+
+class ManifestTailer(object):
+    """
+    Reads the lines added to a manifest from the reactor, so the node reading the manifest keeps running its timers.
+    On Linux the manifest is read as soon as inotify reports a change, elsewhere it is polled.
+
+    :param reader: the :py:class:`ebu_tt_live.carriage.filesystem.FilesystemReader` of the manifest
+    :param reactor: the reactor to use, the global reactor by default
+    :param poll_interval: the interval in seconds between two reads when polling
+    :param use_inotify: set to False to poll even if inotify is available
+    """
+
+    _reader = None
+    _reactor = None
+    _poll_interval = None
+    _use_inotify = None
+    _notifier = None
+    _poll_task = None
+
+    def __init__(self, reader, reactor=None, poll_interval=DEFAULT_POLL_INTERVAL, use_inotify=True):
+        if poll_interval <= 0:
+            raise ValueError('Poll interval must be positive: {}'.format(poll_interval))
+        if reactor is None:
+            from twisted.internet import reactor
+        self._reader = reader
+        self._reactor = reactor
+        self._poll_interval = poll_interval
+        self._use_inotify = use_inotify
+
+    @property
+    def mode(self):
+        """
+        TAIL_MODE_INOTIFY or TAIL_MODE_POLLING once started, None otherwise.
+        """
+        if self._notifier is not None:
+            return TAIL_MODE_INOTIFY
+        if self._poll_task is not None:
+            return TAIL_MODE_POLLING
+        return None
+
+    @property
+    def notifier(self):
+        return self._notifier
+
+    def start(self):
+        """
+        Read what the manifest holds already and watch it for new lines.
+        """
+        self.read_available()
+        if self._use_inotify:
+            self._notifier = self._create_notifier()
+        if self._notifier is None:
+            self._poll_task = task.LoopingCall(self.read_available)
+            self._poll_task.clock = self._reactor
+            self._poll_task.start(self._poll_interval, now=False)
+
+    def _create_notifier(self):
+        try:
+            from twisted.internet import inotify
+            notifier = inotify.INotify(self._reactor)
+        except Exception:
+            log.info('inotify is not available, polling {}'.format(self._reader.manifest_path))
+            return None
+        notifier.startReading()
+        notifier.watch(
+            FilePath(self._reader.manifest_path),
+            mask=inotify.IN_MODIFY | inotify.IN_CLOSE_WRITE,
+            callbacks=[self._on_change]
+        )
+        return notifier
+
+    def _on_change(self, ignored, file_path, mask):
+        self.read_available()
+
+    def read_available(self):
+        try:
+            self._reader.read_available()
+        except Exception:
+            # A broken document must not stop the tailing
+            log.exception('Reading {} failed'.format(self._reader.manifest_path))
+
+    def stop(self):
+        if self._notifier is not None:
+            self._notifier.loseConnection()
+            self._notifier = None
+        if self._poll_task is not None:
+            self._poll_task.stop()
+            self._poll_task = None
+        self._reader.close()
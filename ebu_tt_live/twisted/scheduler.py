@@ -0,0 +1,26 @@
+from ebu_tt_live.clocks.scheduler import Scheduler
+from datetime import timedelta
+from twisted.internet import task
+
+
+class TwistedScheduler(Scheduler):
+    """
+    Runs the scheduled calls in real time from the reactor.
+
+    :param reactor: the reactor to use, the global reactor by default
+    """
+
+    _reactor = None
+
+    def __init__(self, reactor=None):
+        if reactor is None:
+            from twisted.internet import reactor
+        self._reactor = reactor
+
+    def call_every(self, interval, function, *args, **kwargs):
+        if isinstance(interval, timedelta):
+            interval = interval.total_seconds()
+        looping_call = task.LoopingCall(function, *args, **kwargs)
+        looping_call.clock = self._reactor
+        looping_call.start(interval, now=False)
+        return looping_call
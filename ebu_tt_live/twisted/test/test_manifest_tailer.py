@@ -0,0 +1,115 @@
+from unittest import TestCase, skipUnless
+from mock import MagicMock
+from ebu_tt_live.carriage.filesystem import FilesystemReader
+from ebu_tt_live.twisted.filesystem import ManifestTailer, TAIL_MODE_INOTIFY, TAIL_MODE_POLLING
+from twisted.internet import task
+import os
+import pytest
+import select
+import shutil
+import sys
+import tempfile
+import time
+
+
+class ManifestTest(TestCase):
+
+    def setUp(self):
+        self.test_dir_path = tempfile.mkdtemp()
+        self.manifest_path = os.path.join(self.test_dir_path, 'manifest_testSeq.txt')
+        self.manifest = open(self.manifest_path, 'w')
+        self.consumer = MagicMock()
+        self.received = []
+        self.consumer.on_new_data.side_effect = lambda data: self.received.append((time.time(), data))
+        self.reader = FilesystemReader(self.manifest_path, self.consumer, True)
+
+    def tearDown(self):
+        self.manifest.close()
+        shutil.rmtree(self.test_dir_path)
+
+    def _append(self, index):
+        with open(os.path.join(self.test_dir_path, 'testSeq_{}.xml'.format(index)), 'w') as f:
+            f.write('document {}'.format(index))
+        self.manifest.write('00:00:{:02d}.000,testSeq_{}.xml\n'.format(index, index))
+        self.manifest.flush()
+        return time.time()
+
+
+class TestPollingTailer(ManifestTest):
+
+    def test_polling(self):
+        clock = task.Clock()
+        self._append(1)
+        tailer = ManifestTailer(self.reader, reactor=clock, use_inotify=False)
+        tailer.start()
+        self.assertEqual(tailer.mode, TAIL_MODE_POLLING)
+        self.assertEqual(len(self.received), 1)
+        self._append(2)
+        clock.advance(0.4)
+        self.assertEqual(len(self.received), 1)
+        clock.advance(0.1)
+        self.assertEqual([data for _, data in self.received], [['00:00:01.000', 'document 1'],
+                                                               ['00:00:02.000', 'document 2']])
+        tailer.stop()
+        self.assertIsNone(tailer.mode)
+        self.assertFalse(clock.getDelayedCalls())
+
+    def test_consumer_failure(self):
+        clock = task.Clock()
+        tailer = ManifestTailer(self.reader, reactor=clock, use_inotify=False)
+        tailer.start()
+        self.consumer.on_new_data.side_effect = ValueError()
+        self._append(1)
+        clock.advance(0.5)
+        self.consumer.on_new_data.side_effect = None
+        self._append(2)
+        clock.advance(0.5)
+        self.assertEqual(self.consumer.on_new_data.call_count, 2)
+        tailer.stop()
+
+    def test_invalid_poll_interval(self):
+        self.assertRaises(ValueError, ManifestTailer, self.reader, reactor=task.Clock(), poll_interval=0)
+
+
+@skipUnless(sys.platform.startswith('linux'), 'inotify is only available on Linux')
+class TestInotifyTailer(ManifestTest):
+    """
+    Drives the inotify file descriptor by hand instead of running the reactor. Every manifest line must be read
+    after a single notification. The benchmark reports the time between the write of a manifest line and the
+    reading of its document.
+    """
+
+    line_count = 50
+
+    def _pump(self, notifier, timeout=1.0):
+        readable, _, _ = select.select([notifier.fileno()], [], [], timeout)
+        if readable:
+            notifier.doRead()
+
+    def _tail(self):
+        tailer = ManifestTailer(self.reader, reactor=MagicMock())
+        tailer.start()
+        self.assertEqual(tailer.mode, TAIL_MODE_INOTIFY)
+        latencies = []
+        for index in range(1, self.line_count + 1):
+            written = self._append(index)
+            self._pump(tailer.notifier)
+            self.assertEqual(len(self.received), index)
+            latencies.append(self.received[-1][0] - written)
+        tailer.stop()
+        self.assertIsNone(tailer.mode)
+        return latencies
+
+    def test_one_read_per_line(self):
+        self._tail()
+        self.assertEqual([data for _, data in self.received], [
+            ['00:00:{:02d}.000'.format(index), 'document {}'.format(index)]
+            for index in range(1, self.line_count + 1)
+        ])
+
+    @pytest.mark.benchmark
+    def test_benchmark(self):
+        latencies = sorted(self._tail())
+        print('inotify tail latency: {:.3f}ms median, {:.3f}ms max over {} lines'.format(
+            latencies[len(latencies) // 2] * 1000, latencies[-1] * 1000, len(latencies)
+        ))
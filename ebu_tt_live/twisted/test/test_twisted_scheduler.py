@@ -0,0 +1,22 @@
+from unittest import TestCase
+from mock import MagicMock
+from datetime import timedelta
+from ebu_tt_live.twisted.scheduler import TwistedScheduler
+from twisted.internet import task
+
+
+class TestTwistedScheduler(TestCase):
+
+    def test_call_every(self):
+        clock = task.Clock()
+        function = MagicMock()
+        call = TwistedScheduler(clock).call_every(timedelta(seconds=2), function, 'argument')
+        clock.advance(1)
+        self.assertEqual(function.call_count, 0)
+        clock.advance(1)
+        clock.advance(2)
+        self.assertEqual(function.call_count, 2)
+        function.assert_called_with('argument')
+        call.stop()
+        clock.advance(10)
+        self.assertEqual(function.call_count, 2)
@@ -0,0 +1,574 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from mock import MagicMock, patch
+from ebu_tt_live.bindings.compact import is_compact
+from ebu_tt_live.documents import EBUTT3Document, RelayedDocument
+from ebu_tt_live.twisted.compression import SharedDeflateMessage
+from ebu_tt_live.twisted.websocket import BroadcastServerFactory, StreamingServerProtocol, BroadcastClientFactory, \
+    ClientNodeProtocol, QUEUE_POLICY_DROP_OLDEST, QUEUE_POLICY_COALESCE, QUEUE_POLICY_DISCONNECT
+from autobahn.websocket.protocol import PreparedMessage
+from twisted.test import iosim
+import os
+import pytest
+import time
+
+
+class TestBroadcastServerFactory(TestCase):
+
+    def setUp(self):
+        self.factory = BroadcastServerFactory(u'ws://localhost:9000')
+
+    def _add_clients(self, count, channel='channel1'):
+        clients = []
+        for number in range(count):
+            client = MagicMock()
+            client.peer = 'client{}'.format(number)
+            client.compact = False
+            self.factory.register(client)
+            if channel is not None:
+                self.factory.subscribe(client, channel)
+            clients.append(client)
+        return clients
+
+    def test_broadcast_prepares_once(self):
+        clients = self._add_clients(100)
+        payload = u'<tt:tt>é</tt:tt>'
+        with patch.object(self.factory, 'prepareMessage', wraps=self.factory.prepareMessage) as prepare_message:
+            self.factory.broadcast('channel1', payload)
+        prepare_message.assert_called_once_with(payload.encode('utf-8'), isBinary=False, doNotCompress=False)
+
+        prepared_messages = set()
+        for client in clients:
+            self.assertEqual(client.sendPreparedMessageOnChannel.call_count, 1)
+            channel, prepared_message = client.sendPreparedMessageOnChannel.call_args[0]
+            self.assertEqual(channel, 'channel1')
+            prepared_messages.add(id(prepared_message))
+        self.assertEqual(len(prepared_messages), 1)
+
+    def test_broadcast_encoded_payload(self):
+        client, = self._add_clients(1)
+        payload = u'<tt:tt>é</tt:tt>'.encode('utf-8')
+        self.factory.broadcast('channel1', payload)
+        prepared_message = client.sendPreparedMessageOnChannel.call_args[0][1]
+        self.assertIsInstance(prepared_message, PreparedMessage)
+        self.assertEqual(prepared_message.payload, payload)
+
+    def test_broadcast_reaches_channel_subscribers_only(self):
+        subscribers = self._add_clients(3, channel='channel1')
+        others = self._add_clients(3, channel='channel2')
+        idle = self._add_clients(3, channel=None)
+        self.factory.broadcast('channel1', u'<tt:tt/>')
+        for client in subscribers:
+            self.assertEqual(client.sendPreparedMessageOnChannel.call_count, 1)
+        for client in others + idle:
+            self.assertFalse(client.sendPreparedMessageOnChannel.called)
+
+    def test_broadcast_without_subscribers(self):
+        self._add_clients(3, channel='channel2')
+        with patch.object(self.factory, 'prepareMessage') as prepare_message:
+            self.factory.broadcast('channel1', u'<tt:tt/>')
+        self.assertFalse(prepare_message.called)
+
+    def test_subscription_index(self):
+        client1, client2 = self._add_clients(2, channel='channel1')
+        self.factory.subscribe(client1, 'channel2')
+        self.assertEqual(self.factory.subscribers('channel1'), frozenset([client1, client2]))
+        self.assertEqual(self.factory.subscribers('channel2'), frozenset([client1]))
+
+        self.factory.unsubscribe(client2, 'channel1')
+        self.assertEqual(self.factory.subscribers('channel1'), frozenset([client1]))
+        # Unsubscribing from a channel that was not subscribed to is harmless
+        self.factory.unsubscribe(client2, 'channel1')
+        self.factory.unsubscribe(client2, 'channel3')
+
+        self.factory.unregister(client1)
+        self.assertEqual(self.factory.subscribers('channel1'), frozenset())
+        self.assertEqual(self.factory.subscribers('channel2'), frozenset())
+        self.assertEqual(self.factory._subscribers, {})
+
+    def test_invalid_queue_configuration(self):
+        self.assertRaises(ValueError, BroadcastServerFactory, u'ws://localhost:9000', queue_size=0)
+        self.assertRaises(ValueError, BroadcastServerFactory, u'ws://localhost:9000', queue_policy='unknown')
+
+
+class TestStreamingServerProtocol(TestCase):
+
+    def _protocol(self, factory=None):
+        protocol = StreamingServerProtocol()
+        protocol.factory = factory or MagicMock()
+        protocol.transport = MagicMock()
+        protocol.peer = 'client'
+        protocol.websocket_protocol_in_use = None
+        protocol.onOpen()
+        return protocol
+
+    def test_registers_as_push_producer(self):
+        protocol = self._protocol()
+        protocol.transport.registerProducer.assert_called_once_with(protocol, True)
+
+    def test_send_prepared_message_on_channel(self):
+        protocol = self._protocol()
+        protocol.onMessage('{"subscribe": "channel1"}', False)
+        prepared_message = MagicMock()
+        with patch.object(protocol, 'sendPreparedMessage') as send_prepared_message:
+            protocol.sendPreparedMessageOnChannel('channel2', prepared_message)
+            self.assertFalse(send_prepared_message.called)
+            protocol.sendPreparedMessageOnChannel('channel1', prepared_message)
+            send_prepared_message.assert_called_once_with(prepared_message)
+
+    def test_subscriptions_update_factory(self):
+        protocol = self._protocol()
+        protocol.onMessage('{"subscribe": "channel1"}', False)
+        protocol.factory.subscribe.assert_called_once_with(protocol, 'channel1')
+        protocol.onMessage('{"unsubscribe": "channel1"}', False)
+        protocol.factory.unsubscribe.assert_called_once_with(protocol, 'channel1')
+        # Not subscribed any more
+        protocol.onMessage('{"unsubscribe": "channel1"}', False)
+        self.assertEqual(protocol.factory.unsubscribe.call_count, 1)
+
+
+class TestSendQueue(TestCase):
+
+    def _protocol(self, queue_policy, queue_size=3):
+        factory = BroadcastServerFactory(u'ws://localhost:9000', queue_size=queue_size, queue_policy=queue_policy)
+        protocol = StreamingServerProtocol()
+        protocol.factory = factory
+        protocol.transport = MagicMock()
+        protocol.peer = 'client'
+        protocol.websocket_protocol_in_use = None
+        protocol.onOpen()
+        protocol.onMessage('{"subscribe": "channel1"}', False)
+        protocol.onMessage('{"subscribe": "channel2"}', False)
+        return protocol
+
+    def _send(self, protocol, messages):
+        with patch.object(protocol, 'sendPreparedMessage') as send_prepared_message:
+            for channel, message in messages:
+                protocol.sendPreparedMessageOnChannel(channel, message)
+        return [call[0][0] for call in send_prepared_message.call_args_list]
+
+    def _resume(self, protocol):
+        with patch.object(protocol, 'sendPreparedMessage') as send_prepared_message:
+            protocol.resumeProducing()
+        return [call[0][0] for call in send_prepared_message.call_args_list]
+
+    def test_not_paused_sends_immediately(self):
+        protocol = self._protocol(QUEUE_POLICY_DROP_OLDEST)
+        self.assertEqual(self._send(protocol, [('channel1', 1), ('channel2', 2)]), [1, 2])
+        self.assertEqual(protocol.queue_depth, 0)
+
+    def test_paused_queues_until_resumed(self):
+        protocol = self._protocol(QUEUE_POLICY_DROP_OLDEST)
+        protocol.pauseProducing()
+        self.assertEqual(self._send(protocol, [('channel1', 1), ('channel2', 2)]), [])
+        self.assertEqual(protocol.queue_depth, 2)
+        self.assertEqual(self._resume(protocol), [1, 2])
+        self.assertEqual(protocol.queue_depth, 0)
+        self.assertEqual(protocol.max_queue_depth, 2)
+
+    def test_resume_stops_when_paused_again(self):
+        protocol = self._protocol(QUEUE_POLICY_DROP_OLDEST)
+        protocol.pauseProducing()
+        self._send(protocol, [('channel1', 1), ('channel1', 2)])
+        with patch.object(protocol, 'sendPreparedMessage', side_effect=lambda message: protocol.pauseProducing()) \
+                as send_prepared_message:
+            protocol.resumeProducing()
+        send_prepared_message.assert_called_once_with(1)
+        self.assertEqual(protocol.queue_depth, 1)
+        # Messages sent while the queue is not empty keep their order
+        self._send(protocol, [('channel1', 3)])
+        self.assertEqual(self._resume(protocol), [2, 3])
+
+    def test_drop_oldest(self):
+        protocol = self._protocol(QUEUE_POLICY_DROP_OLDEST)
+        protocol.pauseProducing()
+        self._send(protocol, [('channel1', 1), ('channel2', 2), ('channel2', 3), ('channel1', 4), ('channel1', 5)])
+        self.assertEqual(protocol.queue_depth, 3)
+        self.assertEqual(protocol.dropped_messages, 2)
+        self.assertEqual(protocol.factory.queue_metrics()['dropped_messages'], 2)
+        self.assertEqual(self._resume(protocol), [3, 4, 5])
+
+    def test_coalesce(self):
+        protocol = self._protocol(QUEUE_POLICY_COALESCE)
+        protocol.pauseProducing()
+        self._send(protocol, [('channel1', 1), ('channel2', 2), ('channel2', 3), ('channel2', 4), ('channel1', 5)])
+        self.assertEqual(protocol.dropped_messages, 3)
+        self.assertEqual(protocol.max_queue_depth, 2)
+        # Only the latest message of every channel is waiting
+        self.assertEqual(self._resume(protocol), [4, 5])
+
+    def test_coalesce_single_channel(self):
+        messages = [('channel1', number) for number in range(1, 6)]
+        protocol = self._protocol(QUEUE_POLICY_DROP_OLDEST)
+        protocol.pauseProducing()
+        self._send(protocol, messages)
+        self.assertEqual(self._resume(protocol), [3, 4, 5])
+        protocol = self._protocol(QUEUE_POLICY_COALESCE)
+        protocol.pauseProducing()
+        self._send(protocol, messages)
+        self.assertEqual(protocol.dropped_messages, 4)
+        self.assertEqual(self._resume(protocol), [5])
+        # A client that keeps up is not affected
+        self.assertEqual(self._send(protocol, messages), [1, 2, 3, 4, 5])
+
+    def test_coalesce_falls_back_to_oldest(self):
+        protocol = self._protocol(QUEUE_POLICY_COALESCE, queue_size=1)
+        protocol.pauseProducing()
+        self._send(protocol, [('channel1', 1), ('channel2', 2)])
+        self.assertEqual(self._resume(protocol), [2])
+
+    def test_disconnect(self):
+        protocol = self._protocol(QUEUE_POLICY_DISCONNECT)
+        protocol.pauseProducing()
+        with patch.object(protocol, 'dropConnection') as drop_connection:
+            self._send(protocol, [('channel1', number) for number in range(4)])
+            drop_connection.assert_called_once_with(abort=True)
+        self.assertEqual(protocol.queue_depth, 0)
+        self.assertEqual(protocol.factory.subscribers('channel1'), frozenset())
+        metrics = protocol.factory.queue_metrics()
+        self.assertEqual(metrics['disconnected_clients'], 1)
+        self.assertEqual(metrics['clients'], 0)
+
+    def test_stop_producing_discards_queue(self):
+        protocol = self._protocol(QUEUE_POLICY_DROP_OLDEST)
+        protocol.pauseProducing()
+        self._send(protocol, [('channel1', 1)])
+        protocol.stopProducing()
+        self.assertEqual(protocol.queue_depth, 0)
+
+
+class ReceivingConsumer(object):
+
+    def __init__(self):
+        self.received = []
+
+    def registerProducer(self, producer, streaming):
+        producer.resumeProducing()
+
+    def write(self, data):
+        self.received.append(data)
+
+
+class ReceivingClientFactory(BroadcastClientFactory):
+
+    protocol = ClientNodeProtocol
+
+    def __init__(self, url, channels):
+        super(ReceivingClientFactory, self).__init__(url, ReceivingConsumer(), channels=channels)
+
+    @property
+    def received(self):
+        return self._consumer.received
+
+
+def connect(server_factory, client_factory):
+    client, server, pump = iosim.connectedServerAndClient(
+        lambda: server_factory.buildProtocol(None),
+        lambda: client_factory.buildProtocol(None),
+        greet=True
+    )
+    pump.flush()
+    return client, server, pump
+
+
+class TestBroadcastClientFactory(TestCase):
+
+    def test_pause_and_resume_connections(self):
+        factory = BroadcastClientFactory(u'ws://localhost:9000', ReceivingConsumer(), channels=['channel1'])
+        protocol = MagicMock()
+        factory.register(protocol)
+        self.assertFalse(protocol.transport.pauseProducing.called)
+        factory.pauseProducing()
+        protocol.transport.pauseProducing.assert_called_once_with()
+        factory.resumeProducing()
+        protocol.transport.resumeProducing.assert_called_once_with()
+
+        factory.pauseProducing()
+        # Connections opened while paused do not read either
+        protocol2 = MagicMock()
+        factory.register(protocol2)
+        protocol2.transport.pauseProducing.assert_called_once_with()
+        factory.unregister(protocol)
+        factory.resumeProducing()
+        protocol2.transport.resumeProducing.assert_called_once_with()
+        self.assertEqual(protocol.transport.resumeProducing.call_count, 1)
+
+
+class TestBroadcastLoad(TestCase):
+    """
+    Many in-process websocket clients spread over many channels. The clients talk to the server through in-memory
+    transports so the whole websocket stack is exercised without sockets.
+    """
+
+    channel_count = 20
+    clients_per_channel = 10
+
+    def setUp(self):
+        self.factory = BroadcastServerFactory(u'ws://localhost:9000', queue_size=10, queue_policy=QUEUE_POLICY_COALESCE)
+        self.factory.protocol = StreamingServerProtocol
+        self.clients = {}
+        self.pumps = []
+        for channel_number in range(self.channel_count):
+            channel = 'channel{}'.format(channel_number)
+            self.clients[channel] = []
+            for _ in range(self.clients_per_channel):
+                client_factory = ReceivingClientFactory(u'ws://localhost:9000', [channel])
+                client, server, pump = connect(self.factory, client_factory)
+                self.clients[channel].append((client_factory, client, pump))
+                self.pumps.append(pump)
+
+    def _flush(self):
+        for pump in self.pumps:
+            pump.flush()
+
+    def test_broadcast_to_channel(self):
+        self.assertEqual(len(self.factory.subscribers('channel0')), self.clients_per_channel)
+        self.factory.broadcast('channel0', u'<tt:tt>é</tt:tt>')
+        self._flush()
+        for channel, clients in self.clients.items():
+            for client_factory, _, _ in clients:
+                if channel == 'channel0':
+                    self.assertEqual(client_factory.received, [u'<tt:tt>é</tt:tt>'.encode('utf-8')])
+                else:
+                    self.assertEqual(client_factory.received, [])
+
+    def test_unsubscribe_and_disconnect(self):
+        client_factory1, client1, pump1 = self.clients['channel1'][0]
+        client_factory2, client2, pump2 = self.clients['channel1'][1]
+        client1.unsubscribeChannel('channel1')
+        pump1.flush()
+        client2.transport.loseConnection()
+        pump2.flush()
+        self.assertEqual(len(self.factory.subscribers('channel1')), self.clients_per_channel - 2)
+
+        self.factory.broadcast('channel1', u'<tt:tt/>')
+        self._flush()
+        self.assertEqual(client_factory1.received, [])
+        self.assertEqual(client_factory2.received, [])
+        for client_factory, _, _ in self.clients['channel1'][2:]:
+            self.assertEqual(client_factory.received, ['<tt:tt/>'])
+
+    def test_broadcast_cost_follows_channel(self):
+        with patch.object(StreamingServerProtocol, 'sendPreparedMessageOnChannel') as send_on_channel:
+            for channel in self.clients:
+                self.factory.broadcast(channel, u'<tt:tt/>')
+        # Every client is visited once per document of its own channel
+        self.assertEqual(send_on_channel.call_count, self.channel_count * self.clients_per_channel)
+
+    @pytest.mark.benchmark
+    def test_benchmark(self):
+        with patch.object(StreamingServerProtocol, 'sendPreparedMessageOnChannel'):
+            start = time.time()
+            for channel in self.clients:
+                self.factory.broadcast(channel, u'<tt:tt/>')
+            elapsed = time.time() - start
+        print('broadcast to {} channels of {} clients each: {:.1f} documents/sec'.format(
+            self.channel_count, self.clients_per_channel, self.channel_count / max(elapsed, 1e-6)
+        ))
+
+    def test_slow_subscriber(self):
+        slow_factory, slow_client, slow_pump = self.clients['channel0'][0]
+        slow_server = slow_pump.server
+        # The transport of the slow subscriber has a full write buffer
+        slow_server.pauseProducing()
+        document_count = 100
+        for number in range(document_count):
+            self.factory.broadcast('channel0', u'<tt:tt>{}</tt:tt>'.format(number))
+            self._flush()
+            self.assertLessEqual(slow_server.queue_depth, self.factory.queue_size)
+
+        # The queue coalesces to the latest document of the sequence
+        metrics = self.factory.queue_metrics()
+        self.assertEqual(metrics['queued_messages'], 1)
+        self.assertEqual(metrics['max_queue_depth'], 1)
+        self.assertEqual(metrics['dropped_messages'], document_count - 1)
+        self.assertEqual(slow_factory.received, [])
+        # The other subscribers are not held back
+        for client_factory, _, _ in self.clients['channel0'][1:]:
+            self.assertEqual(len(client_factory.received), document_count)
+
+        slow_server.resumeProducing()
+        self._flush()
+        self.assertEqual(slow_factory.received, ['<tt:tt>{}</tt:tt>'.format(document_count - 1)])
+        self.assertEqual(self.factory.queue_metrics()['queued_messages'], 0)
+
+
+class TestCompression(TestCase):
+
+    payload = u'<tt:tt>{}</tt:tt>'.format(u'Subtitle é ' * 50)
+
+    def setUp(self):
+        self.factory = BroadcastServerFactory(u'ws://localhost:9000')
+        self.factory.protocol = StreamingServerProtocol
+
+    def _connect(self, no_context_takeover=True, window_bits=None, compression=True):
+        client_factory = ReceivingClientFactory(u'ws://localhost:9000', ['channel1'])
+        if compression:
+            client_factory.enable_compression(no_context_takeover=no_context_takeover, window_bits=window_bits)
+        client, server, pump = connect(self.factory, client_factory)
+        return client_factory, server, pump
+
+    def test_shared_compression(self):
+        self.factory.enable_compression()
+        clients = [self._connect() for _ in range(5)] + [self._connect(window_bits=10)]
+        plain_factory, plain_server, plain_pump = self._connect(compression=False)
+        self.assertIsNone(plain_server._perMessageCompress)
+        for _, server, _ in clients:
+            self.assertTrue(SharedDeflateMessage.can_share(server._perMessageCompress))
+
+        with patch.object(SharedDeflateMessage, '_deflate', autospec=True, side_effect=SharedDeflateMessage._deflate) \
+                as deflate:
+            for _ in range(2):
+                self.factory.broadcast('channel1', self.payload)
+        # Once per document and parameter set
+        self.assertEqual(deflate.call_count, 4)
+        for client_factory, _, pump in clients + [(plain_factory, plain_server, plain_pump)]:
+            pump.flush()
+            self.assertEqual(client_factory.received, [self.payload.encode('utf-8')] * 2)
+
+    def test_context_takeover(self):
+        self.factory.enable_compression(no_context_takeover=False)
+        client_factory, server, pump = self._connect(no_context_takeover=False)
+        self.assertIsNotNone(server._perMessageCompress)
+        self.assertFalse(SharedDeflateMessage.can_share(server._perMessageCompress))
+        with patch.object(SharedDeflateMessage, '_deflate') as deflate:
+            for _ in range(2):
+                self.factory.broadcast('channel1', self.payload)
+        self.assertFalse(deflate.called)
+        pump.flush()
+        self.assertEqual(client_factory.received, [self.payload.encode('utf-8')] * 2)
+
+    def test_not_enabled(self):
+        client_factory, server, pump = self._connect()
+        self.assertIsNone(server._perMessageCompress)
+        self.factory.broadcast('channel1', self.payload)
+        pump.flush()
+        self.assertEqual(client_factory.received, [self.payload.encode('utf-8')])
+
+
+class TestCompactFormat(TestCase):
+
+    def setUp(self):
+        self.factory = BroadcastServerFactory(u'ws://localhost:9000')
+        self.factory.protocol = StreamingServerProtocol
+        self.document = EBUTT3Document(
+            time_base='clock',
+            lang='en-GB',
+            sequence_identifier='channel1',
+            sequence_number=1
+        )
+
+    def _connect(self, compact_format):
+        client_factory = ReceivingClientFactory(u'ws://localhost:9000', ['channel1'])
+        if compact_format:
+            client_factory.enable_compact_format()
+        client, server, pump = connect(self.factory, client_factory)
+        return client_factory, server, pump
+
+    def test_negotiation(self):
+        self.factory.enable_compact_format()
+        compact_factory, compact_server, compact_pump = self._connect(compact_format=True)
+        xml_factory, xml_server, xml_pump = self._connect(compact_format=False)
+        self.assertTrue(compact_server.compact)
+        self.assertFalse(xml_server.compact)
+
+        with patch.object(self.factory, 'prepareMessage', wraps=self.factory.prepareMessage) as prepare_message:
+            self.factory.broadcast('channel1', self.document)
+        self.assertEqual(prepare_message.call_count, 2)
+        compact_pump.flush()
+        xml_pump.flush()
+        self.assertEqual(compact_factory.received, [self.document.get_compact()])
+        self.assertTrue(is_compact(compact_factory.received[0]))
+        self.assertEqual(xml_factory.received, [self.document.get_encoded_xml()])
+
+    def test_xml_fallback(self):
+        client_factory, server, pump = self._connect(compact_format=True)
+        self.assertFalse(server.compact)
+        self.factory.broadcast('channel1', self.document)
+        pump.flush()
+        self.assertEqual(client_factory.received, [self.document.get_encoded_xml()])
+
+    def test_payload_is_not_converted(self):
+        self.factory.enable_compact_format()
+        client_factory, server, pump = self._connect(compact_format=True)
+        self.factory.broadcast('channel1', self.document.get_xml())
+        pump.flush()
+        self.assertEqual(client_factory.received, [self.document.get_encoded_xml()])
+
+    def test_relayed_document(self):
+        self.factory.enable_compact_format()
+        compact_factory, compact_server, compact_pump = self._connect(compact_format=True)
+        xml_factory, xml_server, xml_pump = self._connect(compact_format=False)
+        relayed = RelayedDocument.create_from_raw_data(self.document.get_compact())
+        self.factory.broadcast('channel1', relayed)
+        compact_pump.flush()
+        xml_pump.flush()
+        # The compact payload is passed on to the compact subscriber and converted for the other one
+        self.assertEqual(compact_factory.received, [relayed.payload])
+        self.assertEqual(xml_factory.received, [self.document.get_encoded_xml()])
+
+
+class TestCompressionBandwidth(TestCase):
+    """
+    Broadcasts the example sequences to subscribers with and without compression. Sharing the compression between
+    the subscribers must not change the bytes on the wire. The benchmark reports the bytes and the time spent by the
+    server.
+    """
+
+    client_count = 20
+
+    def setUp(self):
+        example_sequences_dir = os.path.join(
+            os.path.dirname(__file__), '..', '..', '..', 'testing', 'example-sequences'
+        )
+        self.documents = []
+        for dir_name in sorted(os.listdir(example_sequences_dir)):
+            dir_path = os.path.join(example_sequences_dir, dir_name)
+            for file_name in sorted(os.listdir(dir_path)):
+                if file_name.endswith('.xml'):
+                    with open(os.path.join(dir_path, file_name), 'r') as xml_file:
+                        self.documents.append(xml_file.read())
+
+    def _broadcast(self, compression, shared=True):
+        factory = BroadcastServerFactory(u'ws://localhost:9000')
+        factory.protocol = StreamingServerProtocol
+        if compression:
+            factory.enable_compression(shared=shared)
+        clients = []
+        client_factories = []
+        for _ in range(self.client_count):
+            client_factory = ReceivingClientFactory(u'ws://localhost:9000', ['channel1'])
+            client_factory.enable_compression()
+            client_factories.append(client_factory)
+            clients.append(connect(factory, client_factory))
+        sent_before = [server.trafficStats.outgoingOctetsWireLevel for _, server, _ in clients]
+
+        start = time.time()
+        for document in self.documents:
+            factory.broadcast('channel1', document)
+        elapsed = time.time() - start
+
+        sent = sum(server.trafficStats.outgoingOctetsWireLevel for _, server, _ in clients) - sum(sent_before)
+        for _, _, pump in clients:
+            pump.flush()
+        for client_factory in client_factories:
+            self.assertEqual(len(client_factory.received), len(self.documents))
+        return sent, elapsed
+
+    def test_bandwidth(self):
+        plain_bytes, _ = self._broadcast(compression=False)
+        per_client_bytes, _ = self._broadcast(compression=True, shared=False)
+        shared_bytes, _ = self._broadcast(compression=True)
+        self.assertEqual(per_client_bytes, shared_bytes)
+        self.assertLess(shared_bytes, plain_bytes / 2)
+
+    @pytest.mark.benchmark
+    def test_benchmark(self):
+        plain_bytes, plain_time = self._broadcast(compression=False)
+        per_client_bytes, per_client_time = self._broadcast(compression=True, shared=False)
+        shared_bytes, shared_time = self._broadcast(compression=True)
+        print('{} documents to {} clients: plain {} bytes in {:.3f}s, compressed per client {} bytes in {:.3f}s, '
+              'shared compression {} bytes in {:.3f}s'.format(
+                  len(self.documents), self.client_count, plain_bytes, plain_time, per_client_bytes, per_client_time,
+                  shared_bytes, shared_time
+              ))
@@ -5,14 +5,30 @@ from autobahn.twisted.websocket import WebSocketClientProtocol, WebSocketServerF
 from twisted.internet import interfaces
 from zope.interface import implementer
 from logging import getLogger
+from collections import deque
 import json
 
 from .base import IBroadcaster
+from .compression import deflate_offer_acceptor, deflate_offers, deflate_response_acceptor, SharedDeflateMessage
+from ebu_tt_live.documents import SubtitleDocument, EBUTT3Document, RelayedDocument
 
 
 log = getLogger(__name__)
 
 
+# What happens to a message sent to a client whose send queue is full
+QUEUE_POLICY_DROP_OLDEST = 'drop_oldest'
+QUEUE_POLICY_COALESCE = 'coalesce'
+QUEUE_POLICY_DISCONNECT = 'disconnect'
+QUEUE_POLICIES = (QUEUE_POLICY_DROP_OLDEST, QUEUE_POLICY_COALESCE, QUEUE_POLICY_DISCONNECT)
+
+DEFAULT_QUEUE_SIZE = 32
+
+# Websocket subprotocol of the nodes of the toolkit exchanging documents in the compact encoding of the bindings.
+# Peers that do not negotiate it receive XML.
+COMPACT_SUBPROTOCOL = u'ebu-tt-live.compact.1'
+
+
 class UserInputServerProtocol(WebSocketServerProtocol):
     def onOpen(self):
         self.factory.register(self)
@@ -55,6 +71,17 @@ class UserInputServerFactory(WebSocketServerFactory):
     def resumeProducing(self):
         pass
 
+    def enable_compression(self, no_context_takeover=True, window_bits=None, mem_level=None):
+        """
+        Accept permessage-deflate compression offered by the clients.
+        :param no_context_takeover: compress each message independently
+        :param window_bits: the largest window size to compress with
+        :param mem_level: the zlib memory level to compress with
+        """
+        self.setProtocolOptions(perMessageCompressionAccept=deflate_offer_acceptor(
+            no_context_takeover=no_context_takeover, window_bits=window_bits, mem_level=mem_level
+        ))
+
     def register(self, client):
         if client not in self._clients:
             log.info("registered client {}".format(client.peer))
@@ -69,13 +96,36 @@ class UserInputServerFactory(WebSocketServerFactory):
         listenWS(self)
 
 
+@implementer(interfaces.IPushProducer)
 class StreamingServerProtocol(WebSocketServerProtocol):
+    """
+    Sends the documents of the subscribed channels to the client. The protocol registers itself as a push producer
+    with its transport. While the transport is paused because the client does not keep up with the data, messages
+    wait in a send queue bounded by the queue size of the factory. When the queue is full the queue policy of the
+    factory decides between dropping the oldest message and disconnecting the client. The coalescing policy keeps
+    at most one message per channel in the queue, the latest document of the sequence, and drops the oldest
+    message when the queue is still full.
+    """
 
     _channels = None
+    _outbound_queue = None
+    _paused = False
+    _max_queue_depth = 0
+    _dropped_messages = 0
+    _compact = False
+
+    def onConnect(self, request):
+        if self.factory.compact_format and COMPACT_SUBPROTOCOL in request.protocols:
+            return COMPACT_SUBPROTOCOL
+        return None
 
     def onOpen(self):
         self.factory.register(self)
         self._channels = set()
+        self._outbound_queue = deque()
+        self._compact = self.websocket_protocol_in_use == COMPACT_SUBPROTOCOL
+        # The transport pauses us when its write buffer fills up and resumes us once it is drained
+        self.registerProducer(self, True)
 
     def onMessage(self, payload, isBinary):
         if not isBinary:
@@ -84,9 +134,11 @@ class StreamingServerProtocol(WebSocketServerProtocol):
                 if 'subscribe' in data:
                     log.info('{} subscibes to {}'.format(self.peer, data['subscribe']))
                     self._channels.add(data['subscribe'])
+                    self.factory.subscribe(self, data['subscribe'])
                 if 'unsubscribe' in data:
                     log.info('{} unsubscribes from {}'.format(self.peer, data['unsubscribe']))
                     self._channels.remove(data['unsubscribe'])
+                    self.factory.unsubscribe(self, data['unsubscribe'])
             except Exception:
                 pass
 
@@ -105,16 +157,189 @@ class StreamingServerProtocol(WebSocketServerProtocol):
             )
             log.info("message sent to {}".format(self.peer))
 
+    def sendPreparedMessageOnChannel(self, channel, prepared_message):
+        if channel in self._channels:
+            if self._paused or self._outbound_queue:
+                self._enqueue(channel, prepared_message)
+            else:
+                self.sendPreparedMessage(prepared_message)
+                log.info("message sent to {}".format(self.peer))
+
+    def sendPreparedMessage(self, preparedMsg):
+        if isinstance(preparedMsg, SharedDeflateMessage) and SharedDeflateMessage.can_share(self._perMessageCompress):
+            self.sendData(preparedMsg.deflated_frame(
+                self._perMessageCompress.server_max_window_bits, self._perMessageCompress.mem_level
+            ))
+        else:
+            super(StreamingServerProtocol, self).sendPreparedMessage(preparedMsg)
+
+    def _message_dropped(self):
+        self._dropped_messages += 1
+        self.factory.message_dropped(self)
+
+    def _enqueue(self, channel, prepared_message):
+        policy = self.factory.queue_policy
+        if policy == QUEUE_POLICY_COALESCE:
+            # The new document of the sequence replaces the one still waiting
+            for item in self._outbound_queue:
+                if item[0] == channel:
+                    self._outbound_queue.remove(item)
+                    self._message_dropped()
+                    break
+        if len(self._outbound_queue) >= self.factory.queue_size:
+            if policy == QUEUE_POLICY_DISCONNECT:
+                log.warning('send queue of {} is full, disconnecting'.format(self.peer))
+                self._outbound_queue.clear()
+                self.factory.disconnect_slow_client(self)
+                return
+            self._outbound_queue.popleft()
+            self._message_dropped()
+            log.warning('send queue of {} is full, message dropped'.format(self.peer))
+        self._outbound_queue.append((channel, prepared_message))
+        self._max_queue_depth = max(self._max_queue_depth, len(self._outbound_queue))
+
+    def _flush_queue(self):
+        # Sending may pause us again
+        while self._outbound_queue and not self._paused:
+            channel, prepared_message = self._outbound_queue.popleft()
+            self.sendPreparedMessage(prepared_message)
+            log.info("message sent to {}".format(self.peer))
+
+    def pauseProducing(self):
+        self._paused = True
+
+    def resumeProducing(self):
+        self._paused = False
+        self._flush_queue()
+
+    def stopProducing(self):
+        self._paused = True
+        if self._outbound_queue:
+            self._outbound_queue.clear()
+
+    @property
+    def compact(self):
+        """
+        True if the client negotiated the compact encoding of the documents.
+        """
+        return self._compact
+
+    @property
+    def queue_depth(self):
+        if self._outbound_queue is None:
+            return 0
+        return len(self._outbound_queue)
+
+    @property
+    def max_queue_depth(self):
+        return self._max_queue_depth
+
+    @property
+    def dropped_messages(self):
+        return self._dropped_messages
+
 
 @implementer(IBroadcaster, interfaces.IConsumer)
 class BroadcastServerFactory(WebSocketServerFactory):
+    """
+    Broadcasts the documents of a channel to the clients subscribed to that channel. The subscribers are indexed by
+    channel so the cost of a broadcast does not depend on the number of clients subscribed to other channels.
+    """
     _clients = None
+    _subscribers = None
     _producer = None
     _push_producer = None
-
-    def __init__(self, url):
+    _queue_size = None
+    _queue_policy = None
+    _shared_compression = False
+    _compact_format = False
+    _dropped_messages = 0
+    _disconnected_clients = 0
+
+    def __init__(self, url, queue_size=DEFAULT_QUEUE_SIZE, queue_policy=QUEUE_POLICY_DROP_OLDEST):
+        """
+        :param url: the url to listen on
+        :param queue_size: maximum number of messages waiting for a slow client
+        :param queue_policy: one of QUEUE_POLICIES, applied to the messages queued for a slow client
+        """
         super(BroadcastServerFactory, self).__init__(url, protocols=[13])
-        self._clients = []
+        if queue_size < 1:
+            raise ValueError('queue size must be positive: {}'.format(queue_size))
+        if queue_policy not in QUEUE_POLICIES:
+            raise ValueError('unknown queue policy: {}'.format(queue_policy))
+        self._queue_size = queue_size
+        self._queue_policy = queue_policy
+        # client -> channels it subscribed to
+        self._clients = {}
+        # channel -> subscribed clients
+        self._subscribers = {}
+
+    def enable_compression(self, no_context_takeover=True, window_bits=None, mem_level=None, shared=True):
+        """
+        Accept permessage-deflate compression offered by the clients.
+        :param no_context_takeover: compress each message independently
+        :param window_bits: the largest window size to compress with
+        :param mem_level: the zlib memory level to compress with
+        :param shared: compress a broadcast message once for all the clients that negotiated the same parameters
+            without context takeover
+        """
+        self.setProtocolOptions(perMessageCompressionAccept=deflate_offer_acceptor(
+            no_context_takeover=no_context_takeover, window_bits=window_bits, mem_level=mem_level
+        ))
+        self._shared_compression = shared
+
+    def enable_compact_format(self):
+        """
+        Send documents in the compact encoding of the bindings to the clients that negotiate it.
+        """
+        self._compact_format = True
+        if COMPACT_SUBPROTOCOL not in self.protocols:
+            self.protocols = list(self.protocols) + [COMPACT_SUBPROTOCOL]
+
+    @property
+    def compact_format(self):
+        return self._compact_format
+
+    @property
+    def queue_size(self):
+        return self._queue_size
+
+    @property
+    def queue_policy(self):
+        return self._queue_policy
+
+    def queue_metrics(self):
+        """
+        The state of the send queues of the connected clients.
+        :return: dictionary of the metrics
+        """
+        depths = [getattr(client, 'queue_depth', 0) for client in self._clients]
+        return {
+            'clients': len(depths),
+            'queued_messages': sum(depths),
+            'max_queue_depth': max(depths) if depths else 0,
+            'peak_queue_depth': max([getattr(client, 'max_queue_depth', 0) for client in self._clients] or [0]),
+            'dropped_messages': self._dropped_messages,
+            'disconnected_clients': self._disconnected_clients
+        }
+
+    def message_dropped(self, client):
+        """
+        Called by a client that dropped a message because its send queue was full.
+        :param client:
+        :return:
+        """
+        self._dropped_messages += 1
+
+    def disconnect_slow_client(self, client):
+        """
+        Disconnect a client that does not keep up with the data. It does not receive further messages.
+        :param client:
+        :return:
+        """
+        self._disconnected_clients += 1
+        self.unregister(client)
+        client.dropConnection(abort=True)
 
     def registerProducer(self, producer, streaming):
         self._producer = producer
@@ -130,22 +355,92 @@ class BroadcastServerFactory(WebSocketServerFactory):
     def register(self, client):
         if client not in self._clients:
             log.info("registered client {}".format(client.peer))
-            self._clients.append(client)
+            self._clients[client] = set()
 
     def unregister(self, client):
         if client in self._clients:
             log.info("unregistered client {}".format(client.peer))
-            self._clients.remove(client)
+            for channel in list(self._clients[client]):
+                self.unsubscribe(client, channel)
+            del self._clients[client]
+
+    def subscribe(self, client, channel):
+        """
+        Add the client to the subscribers of the channel.
+        :param client:
+        :param channel:
+        :return:
+        """
+        self.register(client)
+        self._clients[client].add(channel)
+        self._subscribers.setdefault(channel, set()).add(client)
+
+    def unsubscribe(self, client, channel):
+        """
+        Remove the client from the subscribers of the channel.
+        :param client:
+        :param channel:
+        :return:
+        """
+        if client in self._clients:
+            self._clients[client].discard(channel)
+        subscribers = self._subscribers.get(channel)
+        if subscribers is None:
+            return
+        subscribers.discard(client)
+        if not subscribers:
+            del self._subscribers[channel]
+
+    def subscribers(self, channel):
+        """
+        The clients subscribed to the channel.
+        :param channel:
+        :return: frozenset of clients
+        """
+        return frozenset(self._subscribers.get(channel, ()))
 
     def pull(self):
         if self._producer:
             self._producer.resumeProducing()
 
     def broadcast(self, channel, msg):
+        """
+        Send a message to the subscribers of the channel.
+        :param channel:
+        :param msg: a document or the payload to send. Documents are sent in the encoding the client negotiated.
+        :return:
+        """
         log.info("broadcasting message...")
 
-        for c in self._clients:
-            c.sendMessageOnChannel(channel, msg.encode("utf-8"), isBinary=False, doNotCompress=False, sync=False)
+        subscribers = self._subscribers.get(channel)
+        if not subscribers:
+            return
+
+        # The message is framed (and compressed) once per encoding and the same frames are sent to every subscriber
+        prepared_messages = {}
+        # Copy the subscribers since sending may end up dropping a connection
+        for c in list(subscribers):
+            prepared_message = prepared_messages.get(c.compact)
+            if prepared_message is None:
+                prepared_message = prepared_messages[c.compact] = self._prepare_message(msg, c.compact)
+            c.sendPreparedMessageOnChannel(channel, prepared_message)
+
+    def _prepare_message(self, msg, compact):
+        is_binary = False
+        if compact and isinstance(msg, EBUTT3Document):
+            msg = msg.get_compact()
+            is_binary = True
+        elif isinstance(msg, RelayedDocument) and (compact or not msg.compact):
+            # Passed on untouched. Clients asking for the compact encoding accept XML as well.
+            is_binary = msg.compact
+            msg = msg.payload
+        elif isinstance(msg, SubtitleDocument):
+            msg = msg.get_encoded_xml()
+        elif isinstance(msg, unicode):
+            msg = msg.encode("utf-8")
+        if self._shared_compression:
+            return SharedDeflateMessage(msg, isBinary=is_binary)
+        return self.prepareMessage(msg, isBinary=is_binary, doNotCompress=False)
 
     def stopFactory(self):
         self.unregisterProducer()
@@ -157,9 +452,14 @@ class BroadcastServerFactory(WebSocketServerFactory):
 class ClientNodeProtocol(WebSocketClientProtocol):
 
     def onOpen(self):
+        self.factory.register(self)
         for channel in self.factory.channels:
             self.subscribeChannel(channel)
 
+    def connectionLost(self, reason):
+        WebSocketClientProtocol.connectionLost(self, reason)
+        self.factory.unregister(self)
+
     def subscribeChannel(self, channel):
         data = {
             'subscribe': channel
@@ -178,10 +478,15 @@ class ClientNodeProtocol(WebSocketClientProtocol):
 
 @implementer(interfaces.IPushProducer)
 class BroadcastClientFactory(WebSocketClientFactory):
+    """
+    Receives documents and writes them to the consumer. While the consumer pauses the factory the connections stop
+    reading so the server sees the backpressure instead of the data piling up in this process.
+    """
 
     _channels = None
     _consumer = None
     _stopped = None
+    _protocols = None
 
     def __init__(self, url, consumer, channels=None, *args, **kwargs):
         super(BroadcastClientFactory, self).__init__(url=url, *args, **kwargs)
@@ -191,9 +496,10 @@ class BroadcastClientFactory(WebSocketClientFactory):
         else:
             self._channels = channels
 
+        self._protocols = []
+        self._stopped = True
         self._consumer = consumer
         self._consumer.registerProducer(self, True)
-        self._stopped = True
 
     @property
     def channels(self):
@@ -203,17 +509,50 @@ class BroadcastClientFactory(WebSocketClientFactory):
     def channels(self, value):
         self._channels = value
 
+    def enable_compression(self, no_context_takeover=True, window_bits=None):
+        """
+        Offer permessage-deflate compression to the server.
+        :param no_context_takeover: ask the server to compress each message independently, which lets it share the
+            compressed messages between its clients
+        :param window_bits: the largest window size the server may compress with
+        """
+        self.setProtocolOptions(
+            perMessageCompressionOffers=deflate_offers(no_context_takeover=no_context_takeover, window_bits=window_bits),
+            perMessageCompressionAccept=deflate_response_acceptor()
+        )
+
+    def enable_compact_format(self):
+        """
+        Ask the server for documents in the compact encoding of the bindings. Servers that do not support it keep
+        sending XML.
+        """
+        self.protocols = [COMPACT_SUBPROTOCOL]
+
+    def register(self, protocol):
+        if protocol not in self._protocols:
+            self._protocols.append(protocol)
+            if self._stopped:
+                protocol.transport.pauseProducing()
+
+    def unregister(self, protocol):
+        if protocol in self._protocols:
+            self._protocols.remove(protocol)
+
     def dataReceived(self, data):
         self._consumer.write(data)
 
     def stopProducing(self):
-        self._stopped = True
+        self.pauseProducing()
 
     def resumeProducing(self):
         self._stopped = False
+        for protocol in self._protocols:
+            protocol.transport.resumeProducing()
 
     def pauseProducing(self):
         self._stopped = True
+        for protocol in self._protocols:
+            protocol.transport.pauseProducing()
 
     def connect(self):
         connectWS(self)
@@ -1,3 +1,5 @@
+import random
+
 
 class ComparableMixin(object):
     """
@@ -49,3 +51,260 @@ class ComparableMixin(object):
         :return:
         """
         pass
+
+
+class _IntervalTreeNode(object):
+    """
+    A node of the :class:`IntervalTree`. The max_end attribute holds the latest end value found in the subtree rooted
+    in this node. None means unbounded (an interval that never ends).
+    """
+
+    __slots__ = ('key', 'begin', 'end', 'value', 'priority', 'left', 'right', 'max_end')
+
+    def __init__(self, key, begin, end, value, priority):
+        self.key = key
+        self.begin = begin
+        self.end = end
+        self.value = value
+        self.priority = priority
+        self.left = None
+        self.right = None
+        self.max_end = end
+
+
+class IntervalTree(object):
+    """
+    Augmented interval tree implemented as a randomized binary search tree (treap). The intervals are ordered by their
+    begin value and the insertion order which makes the in-order traversal chronological and stable. Each node keeps
+    the maximum end value of its subtree so that the range queries can skip the branches that had already ended.
+
+    Insertion and removal cost O(log n), a range query costs O(log n + k) where k is the number of matching intervals.
+    An end value of None means the interval is unbounded.
+    """
+
+    _root = None
+    _counter = None
+    _size = None
+    _random = None
+
+    def __init__(self):
+        self._root = None
+        self._counter = 0
+        self._size = 0
+        # A private generator makes the tree shape deterministic for a given sequence of operations
+        self._random = random.Random(0x3370)
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def _ends_after(end, point):
+        return end is None or end > point
+
+    @classmethod
+    def _max_end(cls, *ends):
+        result = ends[0]
+        for end in ends[1:]:
+            if result is None or end is None:
+                return None
+            if end > result:
+                result = end
+        return result
+
+    @classmethod
+    def _update(cls, node):
+        max_end = node.end
+        if node.left is not None:
+            max_end = cls._max_end(max_end, node.left.max_end)
+        if node.right is not None:
+            max_end = cls._max_end(max_end, node.right.max_end)
+        node.max_end = max_end
+
+    @classmethod
+    def _split(cls, node, key):
+        """
+        Split the subtree in two parts: keys lower than key and keys greater or equal to key.
+        """
+        if node is None:
+            return None, None
+        if node.key < key:
+            node.right, right = cls._split(node.right, key)
+            cls._update(node)
+            return node, right
+        else:
+            left, node.left = cls._split(node.left, key)
+            cls._update(node)
+            return left, node
+
+    @classmethod
+    def _merge(cls, left, right):
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if left.priority > right.priority:
+            left.right = cls._merge(left.right, right)
+            cls._update(left)
+            return left
+        else:
+            right.left = cls._merge(left, right.left)
+            cls._update(right)
+            return right
+
+    def insert(self, begin, end, value):
+        """
+        Add an interval to the tree.
+
+        :param begin: begin of the interval
+        :param end: end of the interval or None if unbounded
+        :param value: payload returned by the queries
+        :return: a key that identifies the interval for removal
+        """
+        self._counter += 1
+        key = (begin, self._counter)
+        node = _IntervalTreeNode(key=key, begin=begin, end=end, value=value, priority=self._random.random())
+        left, right = self._split(self._root, key)
+        self._root = self._merge(self._merge(left, node), right)
+        self._size += 1
+        return key
+
+    def remove(self, key):
+        """
+        Remove the interval identified by key.
+
+        :param key: The key returned by insert
+        :raises KeyError: if the interval is not in the tree
+        """
+        parent = None
+        node = self._root
+        path = []
+        while node is not None and node.key != key:
+            path.append(node)
+            parent = node
+            node = node.left if key < node.key else node.right
+        if node is None:
+            raise KeyError(key)
+        replacement = self._merge(node.left, node.right)
+        if parent is None:
+            self._root = replacement
+        elif parent.left is node:
+            parent.left = replacement
+        else:
+            parent.right = replacement
+        for item in reversed(path):
+            self._update(item)
+        self._size -= 1
+
+    def query(self, begin=None, end=None):
+        """
+        Find the intervals that intersect with the [begin, end) range.
+
+        :param begin: Intervals that ended at or before this point are left out. None means no lower limit.
+        :param end: Intervals that begin at or after this point are left out. None means no upper limit.
+        :return: list of values in chronological order of the interval begins
+        """
+        output = []
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            if node is not None:
+                if begin is not None and not self._ends_after(node.max_end, begin):
+                    # Nothing in this subtree is active in the range
+                    node = None
+                    continue
+                stack.append(node)
+                node = node.left
+                continue
+            node = stack.pop()
+            if end is not None and node.begin >= end:
+                # Everything after this node begins too late
+                break
+            if begin is None or self._ends_after(node.end, begin):
+                output.append(node.value)
+            node = node.right
+        return output
+
+
+class IDAllocator(object):
+    """
+    Hands out the IDs of the elements copied into a document so that they are unique in it. An ID that is still free
+    is kept, a taken one gets a numeric suffix counted per ID: the second x becomes x.1, the third x.2 and so on,
+    skipping the suffixed IDs that are taken too. The IDs are stable for a given order of allocation and never more
+    than one suffix longer than the ID of the element.
+
+    The allocator also qualifies IDs with the sequence number of their document for the segments and remembers the ID
+    every new one was made from. An element whose ID looks like a suffixed one, e.g. x.1, is renamed from its own ID
+    (x.1.1) so that it is never mapped back to the ID of another element.
+    """
+
+    _tp_sequence_id = 'SEQ{sequence_number}.{original_id}'
+
+    _taken = None
+    _counters = None
+    _originals = None
+    _sequence_ids = None
+
+    def __init__(self):
+        self._taken = set()
+        self._counters = {}
+        self._originals = {}
+        self._sequence_ids = {}
+
+    def __contains__(self, elem_id):
+        return elem_id in self._taken
+
+    def __len__(self):
+        return len(self._taken)
+
+    def reserve(self, elem_id):
+        """
+        Mark an ID as taken without checking it, e.g. the IDs of the document merged into.
+        :param elem_id:
+        """
+        self._taken.add(elem_id)
+
+    def allocate(self, elem_id):
+        """
+        Take an ID for an element.
+        :param elem_id: the ID of the element or None
+        :return: the ID itself if it was free, a new ID made from it otherwise
+        """
+        if elem_id is None:
+            return None
+        allocated_id = elem_id
+        if allocated_id in self._taken:
+            counter = self._counters.get(elem_id, 0)
+            while allocated_id in self._taken:
+                counter += 1
+                allocated_id = '{}.{}'.format(elem_id, counter)
+            self._counters[elem_id] = counter
+            self._originals[allocated_id] = elem_id
+        self._taken.add(allocated_id)
+        return allocated_id
+
+    def sequence_id(self, elem_id, sequence_number):
+        """
+        The ID of an element qualified with the sequence number of its document. The ID is not taken, the same element
+        has the same qualified ID in every segment of its document.
+        :param elem_id:
+        :param sequence_number:
+        :return: the qualified ID
+        """
+        key = (sequence_number, elem_id)
+        qualified_id = self._sequence_ids.get(key)
+        if qualified_id is None:
+            qualified_id = self._tp_sequence_id.format(
+                sequence_number=sequence_number,
+                original_id=elem_id
+            )
+            self._sequence_ids[key] = qualified_id
+            self._originals[qualified_id] = elem_id
+        return qualified_id
+
+    def original_id(self, elem_id):
+        """
+        The ID of the element a new one was made for. IDs the allocator did not make are returned as they are.
+        :param elem_id:
+        :return: the original ID
+        """
+        return self._originals.get(elem_id, elem_id)
@@ -49,7 +49,9 @@ setup(
             'ebu-simple-producer = ebu_tt_live.scripts.ebu_simple_producer:main',
             'ebu-user-input-consumer = ebu_tt_live.scripts.ebu_user_input_consumer:main',
             'ebu-user-input-forwarder = ebu_tt_live.scripts.ebu_user_input_forwarder:main',
-            'ebu-ebuttd-encoder = ebu_tt_live.scripts.ebu_ebuttd_encoder:main'
+            'ebu-ebuttd-encoder = ebu_tt_live.scripts.ebu_ebuttd_encoder:main',
+            'ebu-manifest-index = ebu_tt_live.scripts.ebu_manifest_index:main',
+            'ebu-replay = ebu_tt_live.scripts.ebu_replay:main'
         ]
     },
     **extra